@@ -0,0 +1,269 @@
+"""Benchmarks for catalog generation."""
+
+import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from dask.distributed import Client
+
+from esm_catalog_utils.catalog_gen import (
+    EsmcolColumns,
+    _get_esmcat_spec,
+    _to_esm_datastore,
+    case_metadata_to_esm_datastore,
+    cases_metadata_to_esm_datastore,
+    date_ordinals,
+    date_parser,
+    get_nc_paths,
+)
+
+from .synthetic_case import SCALES, get_synthetic_case, get_synthetic_ensemble
+
+# number of workers used by parallel backends
+MAX_WORKERS = 4
+
+COLUMN_NAMES = [
+    "case",
+    "scomp",
+    "component",
+    "path",
+    "stream",
+    "datestring",
+    "frequency",
+    "date_start",
+    "date_end",
+    "varname",
+    "size",
+]
+
+
+def synthetic_rows(
+    n_rows: int,
+) -> Iterator[Tuple[str, str, Dict[str, int], Dict[str, Any], Dict[str, Any]]]:
+    """generate arguments to EsmcolColumns.append for synthetic history files"""
+    case = "case"
+    varname = [f"var{ind}" for ind in range(100)]
+    for ind in range(n_rows):
+        year, month = divmod(ind, 12)
+        datestring = f"{year + 1:04d}-{month + 1:02d}"
+        path = f"/archive/{case}/ocn/hist/{case}.pop.h.{datestring}.nc"
+        path_attrs = {
+            "scomp": "pop",
+            "component": "ocn",
+            "stream": "h",
+            "datestring": datestring,
+        }
+        file_attrs = {
+            "frequency": "month_1",
+            "date_start": datetime.date(year % 9999 + 1, month + 1, 1),
+            "date_end": datetime.date(year % 9999 + 1, month + 1, 28),
+            "varname": varname,
+        }
+        yield path, case, {"size": ind}, path_attrs, file_attrs
+
+
+def build_df_columns(n_rows: int) -> pd.DataFrame:
+    """build DataFrame of synthetic rows with EsmcolColumns"""
+    columns = EsmcolColumns(COLUMN_NAMES)
+    for args in synthetic_rows(n_rows):
+        columns.append(*args)
+    return columns.to_df()
+
+
+def build_df_dicts(n_rows: int) -> pd.DataFrame:
+    """build DataFrame of synthetic rows from a list of per-row dicts"""
+    rows: List[Dict[str, Any]] = []
+    for path, case, stat_values, path_attrs, file_attrs in synthetic_rows(n_rows):
+        row: Dict[str, Any] = {}
+        for key in COLUMN_NAMES:
+            if key == "path":
+                row[key] = path
+            elif key == "case":
+                row[key] = case
+            elif key in stat_values:
+                row[key] = stat_values[key]
+            elif key in path_attrs:
+                row[key] = path_attrs[key]
+            else:
+                row[key] = file_attrs[key]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class RowAssembly:
+    """compare columnar row assembly to assembly from per-row dicts"""
+
+    params = [[10_000, 1_000_000]]
+    param_names = ["n_rows"]
+    timeout = 600
+
+    def time_columns(self, n_rows: int) -> None:
+        build_df_columns(n_rows)
+
+    def time_dicts(self, n_rows: int) -> None:
+        build_df_dicts(n_rows)
+
+    def peakmem_columns(self, n_rows: int) -> None:
+        build_df_columns(n_rows)
+
+    def peakmem_dicts(self, n_rows: int) -> None:
+        build_df_dicts(n_rows)
+
+
+class DateOrdinals:
+    """compare vectorized parsing of date strings to per-entry date_parser"""
+
+    params = [[10_000, 1_000_000]]
+    param_names = ["n_rows"]
+
+    def setup(self, n_rows: int) -> None:
+        start = datetime.date(1, 1, 1).toordinal()
+        self.dates = np.array(
+            [
+                datetime.date.fromordinal(start + ind % 3_000_000).isoformat()
+                for ind in range(n_rows)
+            ],
+            dtype=object,
+        )
+
+    def time_date_ordinals(self, n_rows: int) -> None:
+        date_ordinals(self.dates)
+
+    def time_date_parser(self, n_rows: int) -> None:
+        [date_parser(date) for date in self.dates]
+
+
+class NcPathSearch:
+    """time search for netCDF files in synthetic cases, serially and in parallel"""
+
+    params = [list(SCALES), [1, MAX_WORKERS]]
+    param_names = ["n_files", "max_workers"]
+    timeout = 1200
+
+    def setup(self, n_files: str, max_workers: int) -> None:
+        self.case_metadata = get_synthetic_case(n_files, contents="empty")
+
+    def time_get_nc_paths(self, n_files: str, max_workers: int) -> None:
+        get_nc_paths(
+            self.case_metadata["output_dirs"],
+            self.case_metadata["case"],
+            [],
+            max_workers,
+        )
+
+
+class PathOnlyCatalogGen:
+    """time and peak memory of path-only catalog generation for synthetic cases"""
+
+    params = [list(SCALES)]
+    param_names = ["n_files"]
+    timeout = 1200
+
+    def setup(self, n_files: str) -> None:
+        self.case_metadata = get_synthetic_case(n_files, contents="empty")
+
+    def time_path_only(self, n_files: str) -> None:
+        case_metadata_to_esm_datastore(self.case_metadata, file_parser=None)
+
+    def peakmem_path_only(self, n_files: str) -> None:
+        case_metadata_to_esm_datastore(self.case_metadata, file_parser=None)
+
+
+class CatalogGen:
+    """
+    time and peak memory of full and incremental catalog generation for
+    synthetic cases of netCDF files, with the serial and parallel backends
+    """
+
+    params = [["1e3", "1e4"], ["serial", "processes", "dask"]]
+    param_names = ["n_files", "backend"]
+    timeout = 1200
+
+    def setup_cache(self) -> Dict[str, Tuple[pd.DataFrame, Dict[str, Any]]]:
+        # catalogs used as esm_datastore_in, for each scale
+        catalogs = {}
+        for n_files in self.params[0]:
+            case_metadata = get_synthetic_case(n_files)
+            esm_datastore = case_metadata_to_esm_datastore(case_metadata)
+            catalogs[n_files] = (esm_datastore.df, _get_esmcat_spec(esm_datastore))
+        return catalogs
+
+    def setup(
+        self,
+        catalogs: Dict[str, Tuple[pd.DataFrame, Dict[str, Any]]],
+        n_files: str,
+        backend: str,
+    ) -> None:
+        self.case_metadata = get_synthetic_case(n_files)
+        df, esmcat_spec = catalogs[n_files]
+        self.esm_datastore = _to_esm_datastore(df, esmcat_spec)
+        # catalog missing the last year of files, as if they were written since
+        last_year = df["datestring"].max()[:4]
+        df_old = df[~df["datestring"].str.startswith(last_year)]
+        self.esm_datastore_old = _to_esm_datastore(
+            df_old.reset_index(drop=True), esmcat_spec
+        )
+        self.kwargs: Dict[str, Any] = {
+            "use_dask": backend == "dask",
+            "use_processes": backend == "processes",
+            "max_workers": MAX_WORKERS,
+        }
+        if backend == "dask":
+            # avoid threads because of
+            # https://github.com/Unidata/netcdf4-python/issues/1192
+            self.client = Client(n_workers=MAX_WORKERS, threads_per_worker=1)
+
+    def teardown(
+        self,
+        catalogs: Dict[str, Tuple[pd.DataFrame, Dict[str, Any]]],
+        n_files: str,
+        backend: str,
+    ) -> None:
+        if backend == "dask":
+            self.client.close()
+
+    def time_full(self, catalogs: Any, n_files: str, backend: str) -> None:
+        case_metadata_to_esm_datastore(self.case_metadata, **self.kwargs)
+
+    def peakmem_full(self, catalogs: Any, n_files: str, backend: str) -> None:
+        case_metadata_to_esm_datastore(self.case_metadata, **self.kwargs)
+
+    def time_incremental_unchanged(
+        self, catalogs: Any, n_files: str, backend: str
+    ) -> None:
+        case_metadata_to_esm_datastore(
+            self.case_metadata, esm_datastore_in=self.esm_datastore, **self.kwargs
+        )
+
+    def time_incremental_new_files(
+        self, catalogs: Any, n_files: str, backend: str
+    ) -> None:
+        case_metadata_to_esm_datastore(
+            self.case_metadata, esm_datastore_in=self.esm_datastore_old, **self.kwargs
+        )
+
+
+class EnsembleCatalogGen:
+    """
+    time of catalog generation for a synthetic ensemble, one case at a time
+    and with all cases parsed by a single pool of workers
+    """
+
+    params = [[4, 16]]
+    param_names = ["n_members"]
+    timeout = 1200
+
+    def setup(self, n_members: int) -> None:
+        self.cases_metadata = get_synthetic_ensemble(n_members, "1e3")
+        self.kwargs: Dict[str, Any] = {
+            "use_processes": True,
+            "max_workers": MAX_WORKERS,
+        }
+
+    def time_loop(self, n_members: int) -> None:
+        for case_metadata in self.cases_metadata:
+            case_metadata_to_esm_datastore(case_metadata, **self.kwargs)
+
+    def time_cases(self, n_members: int) -> None:
+        cases_metadata_to_esm_datastore(self.cases_metadata, **self.kwargs)
@@ -0,0 +1,79 @@
+"""Benchmarks for catalog methods."""
+
+import datetime
+import os
+from typing import Any
+
+from esm_catalog_utils import case_metadata_to_esm_datastore, write_references
+from esm_catalog_utils.catalog_gen import _get_esmcat_spec, _to_esm_datastore
+from esm_catalog_utils.catalog_index import CatalogIndex
+from esm_catalog_utils.catalog_methods import catalog_sel_to_df, catalog_sel_to_ds
+
+from .synthetic_case import SCALES, get_synthetic_case, synthetic_esm_datastore
+
+
+class CatalogSel:
+    """time and peak memory of selecting rows from catalogs of synthetic cases"""
+
+    params = [list(SCALES)]
+    param_names = ["n_files"]
+    timeout = 1200
+
+    def setup_cache(self) -> Any:
+        catalogs = {}
+        for n_files in SCALES:
+            case_metadata = get_synthetic_case(n_files, contents="empty")
+            esm_datastore = synthetic_esm_datastore(case_metadata)
+            catalogs[n_files] = (esm_datastore.df, _get_esmcat_spec(esm_datastore))
+        return catalogs
+
+    def setup(self, catalogs: Any, n_files: str) -> None:
+        self.catalog = _to_esm_datastore(*catalogs[n_files])
+        # select a decade from the middle of the run
+        year = SCALES[n_files]["n_years"] // 2
+        self.date_range = [datetime.date(year, 1, 1), datetime.date(year + 10, 1, 1)]
+
+    def time_catalog_index(self, catalogs: Any, n_files: str) -> None:
+        CatalogIndex(self.catalog.df)
+
+    def time_catalog_sel_to_df(self, catalogs: Any, n_files: str) -> None:
+        catalog_sel_to_df(
+            self.catalog, self.date_range, "case", "cam", "h0", "cam_h0_var0"
+        )
+
+    def peakmem_catalog_sel_to_df(self, catalogs: Any, n_files: str) -> None:
+        catalog_sel_to_df(
+            self.catalog, self.date_range, "case", "cam", "h0", "cam_h0_var0"
+        )
+
+
+class CatalogSelToDs:
+    """time of opening Datasets from files, and from references to their data"""
+
+    params = [["files", "references"]]
+    param_names = ["source"]
+    timeout = 1200
+
+    def setup_cache(self) -> Any:
+        case_metadata = get_synthetic_case("1e3")
+        esm_datastore = case_metadata_to_esm_datastore(case_metadata)
+        references_dir = os.path.join(os.getcwd(), "references")
+        write_references(esm_datastore, references_dir)
+        return esm_datastore.df, _get_esmcat_spec(esm_datastore), references_dir
+
+    def setup(self, cache: Any, source: str) -> None:
+        df, spec, references_dir = cache
+        self.catalog = _to_esm_datastore(df, spec)
+        self.references = references_dir if source == "references" else None
+        self.date_range = [datetime.date(1, 1, 1), datetime.date(11, 1, 1)]
+
+    def time_catalog_sel_to_ds(self, cache: Any, source: str) -> None:
+        catalog_sel_to_ds(
+            self.catalog,
+            self.date_range,
+            "case",
+            "cam",
+            "h0",
+            "cam_h0_var0",
+            references=self.references,
+        )
@@ -0,0 +1,43 @@
+"""Benchmarks for reading and writing catalogs."""
+
+import ast
+import os
+from typing import Any
+
+import pandas as pd
+
+from esm_catalog_utils import date_parser, read_catalog_parquet, write_catalog_parquet
+
+from .synthetic_case import SCALES, get_synthetic_case, synthetic_esm_datastore
+
+
+class CatalogRead:
+    """time of reading catalogs of synthetic cases, from CSV and Parquet files"""
+
+    params = [list(SCALES)]
+    param_names = ["n_files"]
+    timeout = 1200
+
+    def setup_cache(self) -> Any:
+        for n_files in self.params[0]:
+            case_metadata = get_synthetic_case(n_files, contents="empty")
+            esm_datastore = synthetic_esm_datastore(case_metadata)
+            name = f"catalog_{n_files}"
+            esm_datastore.serialize(name, directory=os.getcwd(), catalog_type="file")
+            write_catalog_parquet(esm_datastore, name)
+
+    def time_read_csv(self, n_files: str) -> None:
+        pd.read_csv(
+            f"catalog_{n_files}.csv",
+            converters={
+                "varname": ast.literal_eval,
+                "date_start": date_parser,
+                "date_end": date_parser,
+            },
+        )
+
+    def time_read_catalog_parquet(self, n_files: str) -> None:
+        read_catalog_parquet(f"catalog_{n_files}.parquet")
+
+    def time_read_catalog_parquet_columns(self, n_files: str) -> None:
+        read_catalog_parquet(f"catalog_{n_files}.parquet", columns=["path"])
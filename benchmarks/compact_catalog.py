@@ -0,0 +1,32 @@
+"""Benchmarks for compact representation of catalogs."""
+
+from typing import Any
+
+from esm_catalog_utils import compact_catalog
+
+from .synthetic_case import SCALES, get_synthetic_case, synthetic_esm_datastore
+
+
+class CompactCatalog:
+    """size of catalogs of synthetic cases, and time of converting them"""
+
+    params = [list(SCALES), [20, 200]]
+    param_names = ["n_files", "n_vars"]
+    timeout = 1200
+
+    def setup(self, n_files: str, n_vars: int) -> None:
+        case_metadata = get_synthetic_case(n_files, contents="empty")
+        self.esm_datastore = synthetic_esm_datastore(case_metadata, n_vars=n_vars)
+        self.catalog_compact = compact_catalog(self.esm_datastore)
+
+    def time_compact_catalog(self, n_files: str, n_vars: int) -> None:
+        compact_catalog(self.esm_datastore)
+
+    def time_to_esm_datastore(self, n_files: str, n_vars: int) -> None:
+        self.catalog_compact.to_esm_datastore()
+
+    def mem_df(self, n_files: str, n_vars: int) -> Any:
+        return self.esm_datastore.df
+
+    def mem_compact_catalog(self, n_files: str, n_vars: int) -> Any:
+        return self.catalog_compact
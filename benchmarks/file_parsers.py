@@ -0,0 +1,66 @@
+"""Benchmarks for file parsers."""
+
+import os.path
+import tempfile
+from typing import Any, Dict
+
+import netCDF4
+
+from esm_catalog_utils.file_parsers import parse_file_cesm, parse_file_cesm_header
+
+FORMATS = ["NETCDF4", "NETCDF3_64BIT_OFFSET"]
+N_VARS = [400]
+
+
+def write_history_file(path: str, format: Any, n_vars: int) -> None:
+    """write history file with a large header, similar to POP history files"""
+    with netCDF4.Dataset(path, "w", format=format) as ds:
+        ds.time_period_freq = "month_1"
+        ds.createDimension("time", None)
+        ds.createDimension("d2", 2)
+        for dim_name, dim_len in [("z_t", 60), ("nlat", 4), ("nlon", 4)]:
+            ds.createDimension(dim_name, dim_len)
+        time = ds.createVariable("time", "f8", ("time",))
+        time.units = "days since 0001-01-01 00:00:00"
+        time.calendar = "noleap"
+        time.bounds = "time_bound"
+        time_bound = ds.createVariable("time_bound", "f8", ("time", "d2"))
+        for ind in range(n_vars):
+            if ind % 2 == 0:
+                dims: Any = ("time", "z_t", "nlat", "nlon")
+            else:
+                dims = ("time", "nlat", "nlon")
+            var = ds.createVariable(f"VAR{ind}", "f4", dims)
+            var.long_name = f"variable {ind}"
+            var.units = "1"
+            var.grid_loc = "3111"
+            var.cell_methods = "time: mean"
+        time[0] = 15.5
+        time_bound[0, :] = [0.0, 31.0]
+
+
+class FileParsing:
+    """compare per-file latency of parse_file_cesm and parse_file_cesm_header"""
+
+    params = [FORMATS, N_VARS]
+    param_names = ["format", "n_vars"]
+
+    def setup_cache(self) -> Dict[str, str]:
+        tmpdir = tempfile.mkdtemp()
+        paths = {}
+        for format in FORMATS:
+            for n_vars in N_VARS:
+                path = os.path.join(tmpdir, f"{format}_{n_vars}.nc")
+                write_history_file(path, format, n_vars)
+                paths[f"{format}_{n_vars}"] = path
+        return paths
+
+    def time_parse_file_cesm(
+        self, paths: Dict[str, str], format: str, n_vars: int
+    ) -> None:
+        parse_file_cesm(paths[f"{format}_{n_vars}"])
+
+    def time_parse_file_cesm_header(
+        self, paths: Dict[str, str], format: str, n_vars: int
+    ) -> None:
+        parse_file_cesm_header(paths[f"{format}_{n_vars}"])
@@ -0,0 +1,36 @@
+"""Benchmarks for path parsers."""
+
+from typing import List
+
+from esm_catalog_utils.path_parsers import parse_path_cesm, parse_paths_cesm
+
+
+def synthetic_paths(n_paths: int) -> List[str]:
+    """generate paths of synthetic history and timeseries files"""
+    paths = []
+    for ind in range(n_paths):
+        year, month = divmod(ind, 12)
+        if ind % 2 == 0:
+            name = f"case.pop.h.{year + 1:06d}-{month + 1:02d}.nc"
+        else:
+            name = f"case.pop.h.VAR{ind % 100}.{year + 1:06d}01-{year + 1:06d}12.nc"
+        paths.append(f"/archive/case/ocn/proc/tseries/{name}")
+    return paths
+
+
+class PathParsing:
+    """compare parsing paths one at a time to parsing them in a batch"""
+
+    params = [[10_000, 1_000_000]]
+    param_names = ["n_paths"]
+    timeout = 600
+
+    def setup(self, n_paths: int) -> None:
+        self.paths = synthetic_paths(n_paths)
+
+    def time_parse_path_cesm(self, n_paths: int) -> None:
+        for path in self.paths:
+            parse_path_cesm(path, "case")
+
+    def time_parse_paths_cesm(self, n_paths: int) -> None:
+        parse_paths_cesm(self.paths, "case")
@@ -0,0 +1,231 @@
+"""Synthetic CESM-like case directory trees for benchmarks."""
+
+import datetime
+import os
+import os.path
+import tempfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+import netCDF4
+import pandas as pd
+
+from esm_catalog_utils.catalog_gen import (
+    _get_esmcat_spec,
+    _to_esm_datastore,
+    case_metadata_to_esm_datastore,
+)
+
+# (component, scomp) pairs of synthetic case, in the order they are used
+COMPONENTS = [
+    ("atm", "cam"),
+    ("lnd", "clm2"),
+    ("ocn", "pop"),
+    ("ice", "cice"),
+    ("rof", "mosart"),
+    ("glc", "cism"),
+    ("wav", "ww3"),
+    ("cpl", "cpl"),
+    ("ocn", "mom6"),
+    ("rof", "rtm"),
+]
+
+# dimensions of synthetic cases, keyed by approximate number of files
+# every stream is monthly, so the number of files is
+#     n_components * n_streams * 12 * n_years
+SCALES: Dict[str, Dict[str, int]] = {
+    "1e3": {"n_components": 2, "n_streams": 4, "n_years": 10},
+    "1e4": {"n_components": 4, "n_streams": 5, "n_years": 42},
+    "1e5": {"n_components": 5, "n_streams": 10, "n_years": 167},
+    "1e6": {"n_components": 10, "n_streams": 10, "n_years": 834},
+}
+
+# days in each month of the noleap calendar
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def iter_synthetic_files(
+    n_components: int, n_streams: int, n_years: int
+) -> Iterator[Tuple[str, str, str, int, int]]:
+    """yield (component, scomp, stream, year, month) of files in synthetic case"""
+    for component, scomp in COMPONENTS[:n_components]:
+        for stream_ind in range(n_streams):
+            for year in range(1, n_years + 1):
+                for month in range(1, 13):
+                    yield component, scomp, f"h{stream_ind}", year, month
+
+
+def synthetic_fname(case: str, scomp: str, stream: str, year: int, month: int) -> str:
+    """return filename of a synthetic history file"""
+    return f"{case}.{scomp}.{stream}.{year:04d}-{month:02d}.nc"
+
+
+def write_synthetic_case(
+    root_dir: str,
+    case: str = "case",
+    n_components: int = 2,
+    n_streams: int = 4,
+    n_years: int = 10,
+    n_vars: int = 20,
+    contents: str = "netcdf",
+) -> Dict[str, Any]:
+    """
+    write a synthetic case of monthly history files, in CESM's archive layout
+    contents is "netcdf", for netCDF files that can be parsed, or "empty", for
+    empty files, which suffice for benchmarking path-only operations
+    return case metadata of the synthetic case
+    """
+    output_dirs: List[str] = []
+    for component, _ in COMPONENTS[:n_components]:
+        output_dir = os.path.join(root_dir, component, "hist")
+        if output_dir not in output_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            output_dirs.append(output_dir)
+
+    for component, scomp, stream, year, month in iter_synthetic_files(
+        n_components, n_streams, n_years
+    ):
+        fname = synthetic_fname(case, scomp, stream, year, month)
+        path = os.path.join(root_dir, component, "hist", fname)
+        if contents == "netcdf":
+            varnames = [f"{scomp}_{stream}_var{ind}" for ind in range(n_vars)]
+            write_history_file(path, year, month, varnames)
+        elif contents == "empty":
+            open(path, "w").close()
+        else:
+            raise ValueError(f"unknown contents {contents}")
+
+    return {"case": case, "output_dirs": output_dirs}
+
+
+def get_synthetic_case(scale: str, contents: str = "netcdf") -> Dict[str, Any]:
+    """
+    return case metadata of synthetic case of scale, writing it if necessary
+    cases are written under the system's temporary directory, and are reused
+    by subsequent benchmarks, because writing large cases is slow
+    """
+    root_dir = os.path.join(
+        tempfile.gettempdir(), "esm_catalog_utils_benchmarks", f"{contents}_{scale}"
+    )
+    # marker file is written after the case is complete
+    marker_path = os.path.join(root_dir, "complete")
+    case_metadata = {
+        "case": "case",
+        "output_dirs": sorted(
+            {
+                os.path.join(root_dir, component, "hist")
+                for component, _ in COMPONENTS[: SCALES[scale]["n_components"]]
+            }
+        ),
+    }
+    if not os.path.exists(marker_path):
+        dims = SCALES[scale]
+        write_synthetic_case(
+            root_dir,
+            n_components=dims["n_components"],
+            n_streams=dims["n_streams"],
+            n_years=dims["n_years"],
+            contents=contents,
+        )
+        open(marker_path, "w").close()
+    return case_metadata
+
+
+def get_synthetic_ensemble(
+    n_members: int, scale: str, contents: str = "netcdf"
+) -> List[Dict[str, Any]]:
+    """
+    return case metadata of members of a synthetic ensemble, each a synthetic
+    case of scale, writing them if necessary
+    """
+    cases_metadata = []
+    for member in range(n_members):
+        case = f"ens.{member:03d}"
+        root_dir = os.path.join(
+            tempfile.gettempdir(),
+            "esm_catalog_utils_benchmarks",
+            f"{contents}_{scale}_ensemble",
+            case,
+        )
+        marker_path = os.path.join(root_dir, "complete")
+        if not os.path.exists(marker_path):
+            dims = SCALES[scale]
+            write_synthetic_case(
+                root_dir,
+                case=case,
+                n_components=dims["n_components"],
+                n_streams=dims["n_streams"],
+                n_years=dims["n_years"],
+                contents=contents,
+            )
+            open(marker_path, "w").close()
+        cases_metadata.append(
+            {
+                "case": case,
+                "output_dirs": sorted(
+                    os.path.join(root_dir, component, "hist")
+                    for component in {
+                        component
+                        for component, _ in COMPONENTS[: SCALES[scale]["n_components"]]
+                    }
+                ),
+            }
+        )
+    return cases_metadata
+
+
+def write_history_file(path: str, year: int, month: int, varnames: List[str]) -> None:
+    """write small monthly history file, in the 64-bit offset format"""
+    days_start = 365 * (year - 1) + sum(DAYS_IN_MONTH[: month - 1])
+    days_end = days_start + DAYS_IN_MONTH[month - 1]
+    with netCDF4.Dataset(path, "w", format="NETCDF3_64BIT_OFFSET") as ds:
+        ds.time_period_freq = "month_1"
+        ds.createDimension("time", None)
+        ds.createDimension("d2", 2)
+        ds.createDimension("lat", 2)
+        ds.createDimension("lon", 2)
+        time = ds.createVariable("time", "f8", ("time",))
+        time.units = "days since 0001-01-01 00:00:00"
+        time.calendar = "noleap"
+        time.bounds = "time_bounds"
+        time_bounds = ds.createVariable("time_bounds", "f8", ("time", "d2"))
+        for varname in varnames:
+            var = ds.createVariable(varname, "f4", ("time", "lat", "lon"))
+            var.long_name = varname
+            var.units = "1"
+        time[0] = 0.5 * (days_start + days_end)
+        time_bounds[0, :] = [days_start, days_end]
+
+
+def synthetic_esm_datastore(case_metadata: Dict[str, Any], n_vars: int = 20) -> Any:
+    """
+    return esm_datastore of a synthetic case written with contents="empty"
+    entries derived from file contents are filled in from datestrings, so that
+    large catalogs can be generated without writing netCDF files
+    """
+    esm_datastore = case_metadata_to_esm_datastore(case_metadata, file_parser=None)
+    df = esm_datastore.df.copy()
+    year_month = df["datestring"].str.split("-", expand=True).astype(int)
+    date_start = [
+        datetime.date(year, month, 1)
+        for year, month in zip(year_month[0], year_month[1])
+    ]
+    date_end = [
+        datetime.date(year + month // 12, month % 12 + 1, 1)
+        for year, month in zip(year_month[0], year_month[1])
+    ]
+    df["frequency"] = "month_1"
+    df["date_start"] = pd.Series(date_start, index=df.index, dtype=object)
+    df["date_end"] = pd.Series(date_end, index=df.index, dtype=object)
+    varnames = {
+        key: [f"{key[0]}_{key[1]}_var{ind}" for ind in range(n_vars)]
+        for key in df.groupby(["scomp", "stream"]).groups
+    }
+    df["varname"] = pd.Series(
+        [
+            list(varnames[key])
+            for key in zip(df["scomp"].to_numpy(), df["stream"].to_numpy())
+        ],
+        index=df.index,
+        dtype=object,
+    )
+    return _to_esm_datastore(df, _get_esmcat_spec(esm_datastore))
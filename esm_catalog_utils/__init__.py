@@ -3,10 +3,31 @@ from esm_catalog_utils.caseroot_to_case_metadata import (
     caseroot_to_case_metadata,
     query_from_caseroot,
 )
-from esm_catalog_utils.catalog_gen import case_metadata_to_esm_datastore, date_parser
+from esm_catalog_utils.catalog_gen import (
+    case_metadata_to_esm_datastore,
+    cases_metadata_to_esm_datastore,
+    date_ordinals,
+    date_parser,
+    fill_file_attrs,
+)
 from esm_catalog_utils.catalog_gen_helpers import (
     caseroot_to_esm_datastore,
+    caseroots_to_esm_datastore,
     directory_to_esm_datastore,
 )
-from esm_catalog_utils.file_parsers import parse_file_cesm
-from esm_catalog_utils.path_parsers import parse_path_cesm
+from esm_catalog_utils.catalog_index import write_varname_index
+from esm_catalog_utils.catalog_parquet import (
+    read_catalog_parquet,
+    write_catalog_parquet,
+)
+from esm_catalog_utils.compact_catalog import (
+    CompactCatalog,
+    case_metadata_to_compact_catalog,
+    compact_catalog,
+)
+from esm_catalog_utils.dataset_cache import DatasetCache
+from esm_catalog_utils.file_parsers import parse_file_cesm, parse_file_cesm_header
+from esm_catalog_utils.instrumentation import BuildReport
+from esm_catalog_utils.parse_cache import ParseCache
+from esm_catalog_utils.path_parsers import parse_path_cesm, parse_paths_cesm
+from esm_catalog_utils.references import write_references
@@ -0,0 +1,23 @@
+"""Classification of values in catalog columns, shared by catalog serializers."""
+
+import datetime
+from typing import Any
+
+import pandas as pd
+
+
+def is_date_column(series: pd.Series) -> bool:
+    """Return whether non-missing entries are dates, and there is at least one."""
+    n_dates = 0
+    for value in series:
+        if is_missing(value):
+            continue
+        if not isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
+            return False
+        n_dates += 1
+    return n_dates > 0
+
+
+def is_missing(value: Any) -> bool:
+    """Return whether value is None or NaN."""
+    return value is None or (isinstance(value, float) and value != value)
@@ -0,0 +1,36 @@
+"""Imports of optional dependencies, with messages naming what needs them."""
+
+import importlib
+from types import ModuleType
+
+
+def import_optional(name: str, extra: str) -> ModuleType:
+    """
+    Import an optional dependency.
+
+    Parameters
+    ----------
+    name : str
+        Name of module being imported, e.g., ``"pyarrow.parquet"``.
+    extra : str
+        Name of the package extra that installs the dependency, e.g.,
+        ``"parquet"``.
+
+    Returns
+    -------
+    module
+
+    Raises
+    ------
+    ImportError
+        If the module, or a module it imports, is not installed. The message
+        names the missing module and the extra that installs it.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as exc:
+        missing = exc.name or name.partition(".")[0]
+        raise ImportError(
+            f"{missing} is required for {extra} support in esm_catalog_utils,"
+            f" install it with `pip install esm_catalog_utils[{extra}]`"
+        ) from exc
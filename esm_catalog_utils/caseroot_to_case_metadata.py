@@ -39,6 +39,10 @@ def caseroot_to_case_metadata(caseroot: Union[str, PathLike]) -> Dict[str, Any]:
     - "case": Name of case in `caseroot`.
     - "output_dirs": List of directories where output from `case` is located.
 
+    Values of CIME XML variables are read directly from the env_*.xml files
+    in `caseroot`, which are parsed once and cached. ``./xmlquery`` is only
+    run for values that cannot be determined from the files.
+
     Parameters
     ----------
     caseroot : str or path-like
@@ -1,18 +1,72 @@
+import array
+import copy
 import datetime
+import multiprocessing
 import os
 import os.path
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from os import PathLike
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import intake_esm
+import numpy as np
 import pandas as pd
-from dask import compute, delayed
+from dask import compute, delayed, persist
 from intake_esm import esm_datastore
 from packaging import version
 
+from .datestring_inference import (
+    infer_stream_file_attrs,
+    parse_datestring,
+    sample_indices,
+)
 from .file_parsers import parse_file_cesm
+from .instrumentation import BuildProgress, BuildReport, recording
+from .parse_cache import CachedFileParser, ParseCache
 from .path_parsers import parse_path_cesm
 
+_T = TypeVar("_T")
+
+# upper bound on number of paths per task when chunksize is chosen automatically
+_MAX_AUTO_CHUNKSIZE = 1000
+
+# columns derived from os.stat, and the corresponding os.stat_result attributes
+_STAT_COLUMNS = {"size": "st_size", "mtime": "st_mtime_ns", "inode": "st_ino"}
+
+# ordinal of missing dates, returned by date_ordinals
+DATE_ORDINAL_MISSING = np.iinfo(np.int64).min
+
+# ordinal of 1970-01-01, the epoch of numpy.datetime64
+_UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# days in year before 1st day of each month, indexed by month, in non-leap years
+_DAYS_BEFORE_MONTH = np.array(
+    [0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+)
+
+# days in each month, indexed by month, in leap years
+_MAX_DAYS_IN_MONTH = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
 
 def case_metadata_to_esm_datastore(
     case_metadata: Dict[str, Any],
@@ -20,9 +74,18 @@ def case_metadata_to_esm_datastore(
     path_parser: Callable[
         [Union[str, PathLike], str], Dict[str, str]
     ] = parse_path_cesm,
-    file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]] = parse_file_cesm,
+    file_parser: Optional[
+        Callable[[Union[str, PathLike]], Dict[str, Any]]
+    ] = parse_file_cesm,
     esm_datastore_in: Optional[esm_datastore] = None,
     use_dask: bool = False,
+    parse_cache: Optional[Union[ParseCache, str, PathLike]] = None,
+    track_mtime: bool = False,
+    use_processes: bool = False,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    report_callback: Optional[Callable[[BuildReport], None]] = None,
+    references_directory: Optional[Union[str, PathLike]] = None,
 ) -> esm_datastore:
     """
     Generate `esm_datastore
@@ -43,157 +106,1346 @@ def case_metadata_to_esm_datastore(
         Function that returns a dictionary of attributes derived from pathnames
         of files in `output_dirs`. These attributes are included in
         columns of the DataFrame of the returned esm_datastore.
-    file_parser : callable, optional
+    file_parser : callable or None, optional
         Function that returns a dictionary of attributes derived from the
         contents of files in output_dirs. These attributes are included in
-        columns of the DataFrame of the returned esm_datastore.
+        columns of the DataFrame of the returned esm_datastore. If None, then
+        files are not opened, and entries of columns that are not derived from
+        pathnames or ``os.stat`` are None. These entries can be filled in later
+        with :py:func:`fill_file_attrs`.
     esm_datastore_in : esm_datastore, optional
-        If provided, then return an esm_datastore object with entries
-        appended to `esm_datastore_in`. The paths determined from
+        If provided, then return an esm_datastore object with entries of
+        `esm_datastore_in` updated. The paths determined from
         `case_metadata` are checked for existence in `esm_datastore_in`'s
         DataFrame df. If the path is present in df and the file's size
         differs from its size in `esm_datastore_in`, then the entry for
-        that path is recreated. A `ValueError` is raised if df does not
-        have an size column.
+        that path is recreated in place. If df has mtime or inode columns,
+        then the file's modification time and inode are compared also.
+        Entries for paths that are not present in df are appended. Entries
+        for files in `output_dirs` that no longer exist are removed. If a
+        path occurs in more than one row of df, then only its last row is
+        kept. A `ValueError` is raised if df does not have an size column.
     use_dask : bool, optional
         If True, the parsing of file contents is performed in parallel
-        using ``dask.delayed``. Default is False.
+        using ``dask.delayed``, with each task parsing a chunk of files.
+        Default is False.
+    parse_cache : ParseCache or str or path-like, optional
+        If provided, results of `file_parser` are looked up in, and stored in,
+        this cache. Files whose size and modification time are unchanged since
+        their results were stored are not reopened. A str or path-like value is
+        the path of the cache's database file. Least recently used entries in
+        excess of the cache's `max_entries` are evicted once the files have
+        been parsed.
+    track_mtime : bool, optional
+        If True, then the DataFrame of the returned esm_datastore has columns
+        mtime and inode, the modification time in nanoseconds and inode of
+        files. Passing the returned esm_datastore as `esm_datastore_in` in
+        later calls then detects files that were rewritten without changing
+        size. Ignored if `esm_datastore_in` is provided. Default is False.
+    use_processes : bool, optional
+        If True, the parsing of file contents is performed in parallel using
+        a ``concurrent.futures.ProcessPoolExecutor``, which does not require a
+        dask cluster. `path_parser` and `file_parser` must be picklable.
+        Cannot be combined with `use_dask`. Default is False.
+    max_workers : int, optional
+        Number of worker processes used if `use_processes` is True. Default
+        is the number of CPUs.
+    chunksize : int, optional
+        Number of files parsed in each task if `use_dask` or `use_processes`
+        is True. By default, it is chosen from the number of files found and
+        the number of workers.
+    report_callback : callable, optional
+        If provided, the time spent in phases of catalog generation, and in
+        parsing each file, is recorded in a
+        :py:class:`~esm_catalog_utils.BuildReport`, which this is called with
+        once the esm_datastore has been generated. For instance, passing the
+        ``append`` method of a list collects the report in the list.
+    references_directory : str or path-like, optional
+        If provided, kerchunk references to the data of each group of
+        aggregatable rows are written to this directory with
+        :py:func:`~esm_catalog_utils.write_references`, so that
+        ``catalog_methods.catalog_sel_to_ds`` can open selections as virtual
+        Zarr Datasets. Requires kerchunk. Groups whose references cannot be
+        generated are recorded in the report if `report_callback` is
+        provided, and raise a ValueError otherwise.
 
     Returns
     -------
     esm_datastore
+
+    Notes
+    -----
+    Files are parsed as they are found, while the search of `output_dirs` is
+    still in progress. Rows of the DataFrame of the returned esm_datastore
+    are sorted by path, independent of the order in which files are found.
     """
 
+    if use_dask and use_processes:
+        raise ValueError("use_dask and use_processes cannot both be True")
+
     verb = "generating" if esm_datastore_in is None else "appending"
     print(f"{verb} esm_datastore for {case_metadata['case']}")
 
     # If esm_datastore_in is provided then
     #   ensure that it has a size column
-    #   create path:size dictionary for determining if rows are up to date
+    #   drop duplicated paths, keeping the last row, which is the most recent
+    #   one in catalogs that rows were appended to
+    #   create path:stat dictionary for determining if rows are up to date
     #   use esmcat_spec from it
     if esm_datastore_in is not None:
         if "size" not in esm_datastore_in.df.columns:
             raise ValueError(
                 "no size column in DataFrame from provided esm_datastore_in"
             )
-        paths_in_sizes = esm_datastore_in.df.set_index("path")["size"].to_dict()
-        if version.Version(intake_esm.__version__) < version.Version("2022.9.18"):
-            esmcat_spec = esm_datastore_in.esmcol_data
+        esmcat_data_in = esm_datastore_in.df.drop_duplicates(
+            "path", keep="last", ignore_index=True
+        )
+        stat_columns = [key for key in _STAT_COLUMNS if key in esmcat_data_in.columns]
+        paths_in_stats = esmcat_data_in.set_index("path")[stat_columns].to_dict("index")
+        esmcat_spec = _get_esmcat_spec(esm_datastore_in)
+    else:
+        paths_in_stats = {}
+        esmcat_spec = _default_esmcat_spec(track_mtime)
+
+    column_names = [attribute["column_name"] for attribute in esmcat_spec["attributes"]]
+
+    if parse_cache is not None and file_parser is not None:
+        file_parser = _wrap_file_parser(file_parser, parse_cache)
+
+    # create DataFrame of new rows for catalog
+    # paths are parsed as they are discovered, overlapping directory scanning
+    # with parsing, and rows are sorted by path afterwards
+
+    report = None if report_callback is None else BuildReport()
+    case: str = case_metadata["case"]
+    cases_esmcat_data, cases_paths_found = _gen_cases_esmcat_data(
+        column_names,
+        [case_metadata],
+        exclude_dirs,
+        path_parser,
+        file_parser,
+        paths_in_stats,
+        use_dask=use_dask,
+        use_processes=use_processes,
+        max_workers=max_workers,
+        chunksize=chunksize,
+        report=report,
+    )
+    _evict_parse_cache(file_parser)
+    esmcat_data_new = cases_esmcat_data[0]
+    paths_found = cases_paths_found[0]
+    time_start = time.perf_counter()
+
+    if esm_datastore_in is not None:
+        esmcat_data, counts = _update_esmcat_data(
+            esmcat_data_in,
+            esmcat_data_new,
+            set(paths_found),
+            case,
+            case_metadata["output_dirs"],
+        )
+        print(
+            f"added {counts['added']}, changed {counts['changed']}, "
+            f"removed {counts['removed']} entries"
+        )
+    else:
+        esmcat_data = esmcat_data_new
+    if report is not None:
+        time_start = _record_wall_time(report, "update", time_start)
+
+    esm_datastore_out = _to_esm_datastore(esmcat_data, esmcat_spec)
+    if report is not None:
+        time_start = _record_wall_time(report, "esm_datastore", time_start)
+
+    if references_directory is not None:
+        _write_references([esm_datastore_out], references_directory, report)
+        if report is not None:
+            _record_wall_time(report, "references", time_start)
+
+    if report_callback is not None and report is not None:
+        report_callback(report)
+
+    return esm_datastore_out
+
+
+def cases_metadata_to_esm_datastore(
+    cases_metadata: List[Dict[str, Any]],
+    combine: bool = True,
+    exclude_dirs: List[str] = ["rest"],
+    path_parser: Callable[
+        [Union[str, PathLike], str], Dict[str, str]
+    ] = parse_path_cesm,
+    file_parser: Optional[
+        Callable[[Union[str, PathLike]], Dict[str, Any]]
+    ] = parse_file_cesm,
+    use_dask: bool = False,
+    parse_cache: Optional[Union[ParseCache, str, PathLike]] = None,
+    track_mtime: bool = False,
+    use_processes: bool = False,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    report_callback: Optional[Callable[[BuildReport], None]] = None,
+    progress_callback: Optional[Callable[[BuildProgress], None]] = None,
+    references_directory: Optional[Union[str, PathLike]] = None,
+) -> Union[esm_datastore, Dict[str, esm_datastore]]:
+    """
+    Generate `esm_datastore
+    <https://intake-esm.readthedocs.io/en/stable/reference/api.html>`_
+    objects for files of multiple cases, e.g., members of an ensemble.
+
+    With `use_dask` or `use_processes`, the output directories of all cases
+    are searched concurrently, and files of all cases are parsed by a single
+    pool of workers, as they are found. Chunks of files from different cases
+    are parsed by whichever workers are free, so the load is balanced across
+    cases.
+
+    Parameters
+    ----------
+    cases_metadata : list of dict
+        Dictionaries of case metadata, as described in
+        :py:func:`case_metadata_to_esm_datastore`. Names of cases must be
+        unique.
+    combine : bool, optional
+        If True, return a single esm_datastore with rows of all cases.
+        Otherwise, return an esm_datastore for each case. Default is True.
+    exclude_dirs, path_parser, file_parser : optional
+        See :py:func:`case_metadata_to_esm_datastore`.
+    use_dask, parse_cache, track_mtime, use_processes : optional
+        See :py:func:`case_metadata_to_esm_datastore`.
+    max_workers, chunksize : int, optional
+        See :py:func:`case_metadata_to_esm_datastore`. Chunks only contain
+        files of a single case.
+    report_callback : callable, optional
+        See :py:func:`case_metadata_to_esm_datastore`. A single report is
+        recorded for all cases.
+    progress_callback : callable, optional
+        If provided, this is called with a
+        :py:class:`~esm_catalog_utils.instrumentation.BuildProgress` each time
+        a chunk of files has been parsed, with counts of files over all
+        cases. With `use_dask`, it is called once parsing is complete.
+    references_directory : str or path-like, optional
+        See :py:func:`case_metadata_to_esm_datastore`. References of all
+        cases are written to this directory.
+
+    Returns
+    -------
+    esm_datastore or dict of esm_datastore
+        If `combine` is True, esm_datastore with rows of each case, in the
+        order of `cases_metadata`, sorted by path within each case.
+        Otherwise, dictionary of esm_datastore of each case, keyed by name of
+        case.
+
+    See Also
+    --------
+    case_metadata_to_esm_datastore
+    """
+
+    if use_dask and use_processes:
+        raise ValueError("use_dask and use_processes cannot both be True")
+    cases = [case_metadata["case"] for case_metadata in cases_metadata]
+    if len(set(cases)) < len(cases):
+        raise ValueError("names of cases must be unique")
+
+    print(f"generating esm_datastore for {len(cases)} cases")
+
+    esmcat_spec = _default_esmcat_spec(track_mtime)
+    column_names = [attribute["column_name"] for attribute in esmcat_spec["attributes"]]
+
+    if parse_cache is not None and file_parser is not None:
+        file_parser = _wrap_file_parser(file_parser, parse_cache)
+
+    report = None if report_callback is None else BuildReport()
+    cases_esmcat_data, _ = _gen_cases_esmcat_data(
+        column_names,
+        cases_metadata,
+        exclude_dirs,
+        path_parser,
+        file_parser,
+        {},
+        use_dask=use_dask,
+        use_processes=use_processes,
+        max_workers=max_workers,
+        chunksize=chunksize,
+        report=report,
+        progress_callback=progress_callback,
+    )
+    _evict_parse_cache(file_parser)
+    time_start = time.perf_counter()
+
+    esm_datastore_out: Union[esm_datastore, Dict[str, esm_datastore]]
+    if combine:
+        dfs = [df for df in cases_esmcat_data if len(df) > 0]
+        if dfs:
+            esmcat_data = _concat_esmcat_data(dfs).reset_index(drop=True)
         else:
-            esmcat_spec = esm_datastore_in.esmcat.dict()
+            esmcat_data = pd.DataFrame(columns=column_names)
+        esm_datastore_out = _to_esm_datastore(esmcat_data, esmcat_spec)
     else:
-        paths_in_sizes = {}
-        esmcat_spec = {
-            "esmcat_version": "0.1.0",
-            "id": "sample",
-            "description": "This is a very basic sample ESM collection.",
-            "attributes": [
-                {"column_name": "case"},
-                {"column_name": "scomp"},  # specific component name, used in filenames
-                {"column_name": "component"},  # generic component name
-                {"column_name": "path"},  # path for asset/file
-                {"column_name": "stream"},  # name of stream that this asset/file is in
-                {"column_name": "datestring"},  # datestring portion of filename
-                {"column_name": "frequency"},  # frequency of output
-                {"column_name": "date_start"},  # date portion of initial time in file
-                {"column_name": "date_end"},  # date portion of end time in file
-                {"column_name": "varname"},  # name(s) of variables in file
-                {"column_name": "size"},  # size of file
+        esm_datastore_out = {
+            case: _to_esm_datastore(esmcat_data, copy.deepcopy(esmcat_spec))
+            for case, esmcat_data in zip(cases, cases_esmcat_data)
+        }
+    if report is not None:
+        time_start = _record_wall_time(report, "esm_datastore", time_start)
+
+    if references_directory is not None:
+        _write_references(
+            (
+                list(esm_datastore_out.values())
+                if isinstance(esm_datastore_out, dict)
+                else [esm_datastore_out]
+            ),
+            references_directory,
+            report,
+        )
+        if report is not None:
+            _record_wall_time(report, "references", time_start)
+
+    if report_callback is not None and report is not None:
+        report_callback(report)
+
+    return esm_datastore_out
+
+
+def _default_esmcat_spec(track_mtime: bool) -> Dict[str, Any]:
+    """Return esmcat spec of catalogs generated from scratch."""
+    esmcat_spec: Dict[str, Any] = {
+        "esmcat_version": "0.1.0",
+        "id": "sample",
+        "description": "This is a very basic sample ESM collection.",
+        "attributes": [
+            {"column_name": "case"},
+            {"column_name": "scomp"},  # specific component name, used in filenames
+            {"column_name": "component"},  # generic component name
+            {"column_name": "path"},  # path for asset/file
+            {"column_name": "stream"},  # name of stream that this asset/file is in
+            {"column_name": "datestring"},  # datestring portion of filename
+            {"column_name": "frequency"},  # frequency of output
+            {"column_name": "date_start"},  # date portion of initial time in file
+            {"column_name": "date_end"},  # date portion of end time in file
+            {"column_name": "varname"},  # name(s) of variables in file
+            {"column_name": "size"},  # size of file
+        ],
+        "assets": {"column_name": "path", "format": "netcdf"},
+        "aggregation_control": {
+            "variable_column_name": "varname",
+            # columns whose entries must agree for rows to be aggregatable
+            "groupby_attrs": [
+                "case",
+                "scomp",
+                "component",
+                "stream",
+                "frequency",
             ],
-            "assets": {"column_name": "path", "format": "netcdf"},
-            "aggregation_control": {
-                "variable_column_name": "varname",
-                # columns whose entries must agree for rows to be aggregatable
-                "groupby_attrs": [
-                    "case",
-                    "scomp",
-                    "component",
-                    "stream",
-                    "frequency",
-                ],
-                "aggregations": [
-                    {"type": "union", "attribute_name": "varname"},
-                    {
-                        "type": "join_existing",
-                        "attribute_name": "datestring",
-                        "options": {
-                            "dim": "time",
-                            "coords": "minimal",
-                            "compat": "override",
-                        },
+            "aggregations": [
+                {"type": "union", "attribute_name": "varname"},
+                {
+                    "type": "join_existing",
+                    "attribute_name": "datestring",
+                    "options": {
+                        "dim": "time",
+                        "coords": "minimal",
+                        "compat": "override",
                     },
-                ],
-            },
-        }
+                },
+            ],
+        },
+    }
+    if track_mtime:
+        esmcat_spec["attributes"].extend(
+            [
+                {"column_name": "mtime"},  # modification time of file, in ns
+                {"column_name": "inode"},  # inode of file
+            ]
+        )
+    return esmcat_spec
 
-    column_names = [attribute["column_name"] for attribute in esmcat_spec["attributes"]]
 
-    # create list of new rows for catalog
+def _gen_cases_esmcat_data(
+    column_names: List[str],
+    cases_metadata: List[Dict[str, Any]],
+    exclude_dirs: List[str],
+    path_parser: Callable[[Union[str, PathLike], str], Dict[str, str]],
+    file_parser: Optional[Callable[[Union[str, PathLike]], Dict[str, Any]]],
+    paths_in_stats: Dict[str, Dict[str, int]],
+    use_dask: bool,
+    use_processes: bool,
+    max_workers: Optional[int],
+    chunksize: Optional[int],
+    report: Optional[BuildReport],
+    progress_callback: Optional[Callable[[BuildProgress], None]] = None,
+) -> Tuple[List[pd.DataFrame], List[List[str]]]:
+    """
+    Generate DataFrames of catalog rows for files of cases.
+
+    Files are parsed as they are found. With `use_dask` or `use_processes`,
+    the directories of all cases are searched concurrently, and chunks of
+    files of all cases are parsed by a single pool of workers. Otherwise,
+    cases are processed one after another.
 
-    esmcat_data_rows = []
-    case: str = case_metadata["case"]
-    paths = get_nc_paths(case_metadata["output_dirs"], case, exclude_dirs)
+    Returns
+    -------
+    tuple of (list of pandas.DataFrame, list of list of str)
+        DataFrame of rows of each case, sorted by path, and paths of files
+        found for each case. If `report` is provided, the time spent is
+        recorded in it.
+    """
+    chunk_func = gen_esmcol_df if report is None else _gen_esmcol_df_with_report
+    time_start = time.perf_counter()
+
+    cases = [case_metadata["case"] for case_metadata in cases_metadata]
+    paths_found: List[Tuple[int, str]] = []
+    n_parsed = 0
+
+    def record_progress(case_ind: int, n_paths: int, scan_complete: bool) -> None:
+        """count parsed paths, and pass progress to progress_callback"""
+        nonlocal n_parsed
+        n_parsed += n_paths
+        if progress_callback is not None:
+            progress_callback(
+                BuildProgress(
+                    cases[case_ind], n_parsed, len(paths_found), scan_complete
+                )
+            )
+
+    # results of chunks, with index of case of each chunk
+    results: List[Tuple[int, Any]] = []
+    if use_dask or use_processes:
+        tagged_paths = _record_paths(
+            _iter_cases_nc_paths(
+                [
+                    (case_metadata["output_dirs"], case_metadata["case"])
+                    for case_metadata in cases_metadata
+                ],
+                exclude_dirs,
+            ),
+            paths_found,
+            report,
+        )
     if use_dask:
-        for path in paths:
-            path_in_size = paths_in_sizes.get(path, -1)
-            row = delayed(gen_esmcol_row)(
-                column_names, path, case, path_parser, file_parser, path_in_size
+        # with a distributed client, persist each task when it is created, so
+        # that parsing starts before the directory scan is complete; without
+        # one, persist would compute each task when it is created, so compute
+        # all tasks together once the scan is complete
+        use_persist = _dask_client() is not None
+        tasks: List[Any] = []
+        chunks_info = []
+        for case_ind, chunk in _iter_case_chunks(
+            tagged_paths, chunksize, _dask_n_workers()
+        ):
+            task = delayed(chunk_func)(
+                column_names,
+                chunk,
+                cases[case_ind],
+                path_parser,
+                file_parser,
+                _subset_dict(paths_in_stats, chunk),
             )
-            esmcat_data_rows.append(row)
-        esmcat_data_rows = list(compute(*esmcat_data_rows))
+            tasks.extend(persist(task) if use_persist else [task])
+            chunks_info.append((case_ind, len(chunk)))
+        for (case_ind, n_paths), result in zip(chunks_info, compute(*tasks)):
+            results.append((case_ind, result))
+            record_progress(case_ind, n_paths, True)
+    elif use_processes:
+        # submit chunks of paths as they are found, and collect results in
+        # submission order once all chunks have been submitted
+        n_workers = max_workers or os.cpu_count() or 1
+        futures = []
+        pending: Dict[Future, Tuple[int, int]] = {}
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for case_ind, chunk in _iter_case_chunks(
+                tagged_paths, chunksize, n_workers
+            ):
+                future = executor.submit(
+                    chunk_func,
+                    column_names,
+                    chunk,
+                    cases[case_ind],
+                    path_parser,
+                    file_parser,
+                    _subset_dict(paths_in_stats, chunk),
+                )
+                futures.append((case_ind, future))
+                if progress_callback is not None:
+                    # report chunks that completed while files are being found
+                    pending[future] = (case_ind, len(chunk))
+                    for done_future in [key for key in pending if key.done()]:
+                        record_progress(*pending.pop(done_future), False)
+            for done_future in as_completed(pending):
+                record_progress(*pending[done_future], True)
+            results = [(case_ind, future.result()) for case_ind, future in futures]
     else:
-        for path in paths:
-            path_in_size = paths_in_sizes.get(path, -1)
-            row = gen_esmcol_row(
-                column_names, path, case, path_parser, file_parser, path_in_size
+        for case_ind, case_metadata in enumerate(cases_metadata):
+            n_found = len(paths_found)
+            tagged_paths = _record_paths(
+                (
+                    (case_ind, path)
+                    for path in iter_nc_paths(
+                        case_metadata["output_dirs"], cases[case_ind], exclude_dirs
+                    )
+                ),
+                paths_found,
+                report,
+            )
+            result = chunk_func(
+                column_names,
+                (path for _, path in tagged_paths),
+                cases[case_ind],
+                path_parser,
+                file_parser,
+                paths_in_stats,
             )
-            esmcat_data_rows.append(row)
+            results.append((case_ind, result))
+            record_progress(
+                case_ind,
+                len(paths_found) - n_found,
+                case_ind == len(cases_metadata) - 1,
+            )
+    if report is not None:
+        # merge reports from chunks, which may be from other processes
+        for _, (_, chunk_report) in results:
+            report.merge(chunk_report)
+        results = [(case_ind, df) for case_ind, (df, _) in results]
+        time_start = _record_wall_time(report, "scan_and_parse", time_start)
 
-    if esm_datastore_in is not None:
-        # drop empty rows (these occur for up to date rows in esm_datastore_in)
-        esmcat_data_rows = [row for row in esmcat_data_rows if row is not None]
-        esmcat_data = pd.concat([esm_datastore_in.df, pd.DataFrame(esmcat_data_rows)])
+    cases_dfs: List[List[pd.DataFrame]] = [[] for _ in cases_metadata]
+    for case_ind, df in results:
+        if len(df) > 0:
+            cases_dfs[case_ind].append(df)
+    cases_esmcat_data = [
+        (
+            _concat_esmcat_data(dfs).sort_values("path", ignore_index=True)
+            if dfs
+            else pd.DataFrame(columns=column_names)
+        )
+        for dfs in cases_dfs
+    ]
+    if report is not None:
+        _record_wall_time(report, "concat", time_start)
+
+    cases_paths_found: List[List[str]] = [[] for _ in cases_metadata]
+    for case_ind, path in paths_found:
+        cases_paths_found[case_ind].append(path)
+    return cases_esmcat_data, cases_paths_found
+
+
+def fill_file_attrs(
+    esm_datastore_in: esm_datastore,
+    file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]] = parse_file_cesm,
+    columns: Optional[List[str]] = None,
+    parse_cache: Optional[Union[ParseCache, str, PathLike]] = None,
+    use_processes: bool = False,
+    max_workers: Optional[int] = None,
+    infer_from_datestrings: bool = False,
+    sample_size: int = 4,
+) -> esm_datastore:
+    """
+    Fill in entries of an esm_datastore that are derived from file contents.
+
+    This completes catalogs generated by
+    :py:func:`case_metadata_to_esm_datastore` with ``file_parser=None``.
+    Only files for rows with missing entries are opened, so applying this to
+    the result of a search of such a catalog only opens the selected files.
+
+    Parameters
+    ----------
+    esm_datastore_in : esm_datastore
+        Catalog whose missing entries are filled in. It is not modified.
+    file_parser : callable, optional
+        Function that returns a dictionary of attributes derived from the
+        contents of a file.
+    columns : list of str, optional
+        Columns whose null entries indicate rows that need to be filled in.
+        Default is all columns.
+    parse_cache : ParseCache or str or path-like, optional
+        If provided, results of `file_parser` are looked up in, and stored in,
+        this cache. See :py:func:`case_metadata_to_esm_datastore`.
+    use_processes : bool, optional
+        If True, files are parsed in parallel using a
+        ``concurrent.futures.ProcessPoolExecutor``. Default is False.
+    max_workers : int, optional
+        Number of worker processes used if `use_processes` is True. Default
+        is the number of CPUs.
+    infer_from_datestrings : bool, optional
+        If True, then for each stream of history files, i.e., rows with the
+        same case, scomp, and stream, and a datestring of a single date, only
+        `sample_size` files are parsed. Entries for the other files are
+        inferred from the sampled files and the datestrings of the stream,
+        with :py:func:`~esm_catalog_utils.datestring_inference.infer_stream_file_attrs`.
+        If the inferred entries disagree with a sampled file, then all files
+        in the stream are parsed. Default is False.
+    sample_size : int, optional
+        Number of files parsed per stream if `infer_from_datestrings` is True.
+        The first and last files of each stream are always parsed.
+
+    Returns
+    -------
+    esm_datastore
+        Catalog with null entries of rows that needed to be filled in replaced
+        by values returned by `file_parser`. Entries that are not null are
+        left unchanged.
+    """
+
+    esmcat_data_in = esm_datastore_in.df
+    if columns is None:
+        columns = list(esmcat_data_in.columns)
+    rows = esmcat_data_in[columns].isna().any(axis=1).to_numpy().nonzero()[0]
+    paths = esmcat_data_in["path"].to_numpy()
+
+    if parse_cache is not None:
+        file_parser = _wrap_file_parser(file_parser, parse_cache)
+
+    def parse_rows(rows_to_parse: List[int]) -> None:
+        """parse files for rows, storing results in rows_attrs"""
+        file_attrs = _parse_files(
+            file_parser, paths[rows_to_parse].tolist(), use_processes, max_workers
+        )
+        rows_attrs.update(zip(rows_to_parse, file_attrs))
+
+    rows_attrs: Dict[int, Dict[str, Any]] = {}
+    if infer_from_datestrings:
+        streams = [
+            stream_rows
+            for stream_rows in _group_rows_by_stream(esmcat_data_in, rows)
+            if len(stream_rows) > sample_size
+        ]
+        streams_samples = [
+            sample_indices(len(stream_rows), sample_size) for stream_rows in streams
+        ]
+        parse_rows(
+            [
+                stream_rows[ind]
+                for stream_rows, samples in zip(streams, streams_samples)
+                for ind in samples
+            ]
+        )
+        datestrings = esmcat_data_in["datestring"].to_numpy()
+        n_inferred = 0
+        for stream_rows, samples in zip(streams, streams_samples):
+            inferred_attrs = infer_stream_file_attrs(
+                datestrings[stream_rows].tolist(),
+                {ind: rows_attrs[stream_rows[ind]] for ind in samples},
+            )
+            if inferred_attrs is not None:
+                for row, attrs in zip(stream_rows, inferred_attrs):
+                    if row not in rows_attrs:
+                        rows_attrs[row] = attrs
+                        n_inferred += 1
+        print(f"inferred entries for {n_inferred} of {len(rows)} files")
+    parse_rows([int(row) for row in rows if row not in rows_attrs])
+    _evict_parse_cache(file_parser)
+
+    esmcat_data = esmcat_data_in.copy()
+    for key in esmcat_data.columns:
+        if not any(key in attrs for attrs in rows_attrs.values()):
+            continue
+        values = esmcat_data[key].to_numpy(dtype=object, copy=True)
+        isna = esmcat_data[key].isna().to_numpy()
+        for row, attrs in rows_attrs.items():
+            if isna[row] and key in attrs:
+                values[row] = attrs[key]
+        if isinstance(esmcat_data[key].dtype, pd.CategoricalDtype):
+            esmcat_data[key] = pd.Categorical(values)
+        else:
+            esmcat_data[key] = values
+
+    return _to_esm_datastore(esmcat_data, _get_esmcat_spec(esm_datastore_in))
+
+
+def _parse_files(
+    file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]],
+    paths: List[str],
+    use_processes: bool,
+    max_workers: Optional[int],
+) -> List[Dict[str, Any]]:
+    """Return results of `file_parser` for `paths`, optionally in parallel."""
+    if not (use_processes and paths):
+        return [file_parser(path) for path in paths]
+    n_workers = max_workers or os.cpu_count() or 1
+    chunksize = min(max(1, len(paths) // (4 * n_workers)), _MAX_AUTO_CHUNKSIZE)
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return list(executor.map(file_parser, paths, chunksize=chunksize))
+
+
+def _group_rows_by_stream(
+    esmcat_data: pd.DataFrame, rows: Iterable[int]
+) -> List[List[int]]:
+    """
+    Group rows of catalog DataFrame by stream.
+
+    Only rows whose datestring is of a single date are grouped. Rows in each
+    group are sorted by datestring.
+    """
+    if "datestring" not in esmcat_data.columns:
+        return []
+    keys = [key for key in ["case", "scomp", "stream"] if key in esmcat_data.columns]
+    keys_values = esmcat_data[keys].to_numpy()
+    datestrings = esmcat_data["datestring"].to_numpy()
+    streams: Dict[Tuple, List[int]] = {}
+    for row in rows:
+        datestring = datestrings[row]
+        if isinstance(datestring, str) and parse_datestring(datestring) is not None:
+            streams.setdefault(tuple(keys_values[row]), []).append(int(row))
+    return [
+        sorted(stream_rows, key=lambda row: datestrings[row])
+        for stream_rows in streams.values()
+    ]
+
+
+def _get_esmcat_spec(esm_datastore_in: esm_datastore) -> Dict[str, Any]:
+    """Return esmcat spec of an esm_datastore, as a dictionary."""
+    # CompactCatalog stores its spec as a dictionary
+    # attributes of esm_datastore are not probed with getattr, as that looks up
+    # catalog entries
+    if not isinstance(esm_datastore_in, esm_datastore):
+        return esm_datastore_in.esmcat_spec
+    if version.Version(intake_esm.__version__) < version.Version("2022.9.18"):
+        return esm_datastore_in.esmcol_data
     else:
-        esmcat_data = pd.DataFrame(esmcat_data_rows)
+        return esm_datastore_in.esmcat.dict()
 
+
+def _to_esm_datastore(
+    esmcat_data: pd.DataFrame, esmcat_spec: Dict[str, Any]
+) -> esm_datastore:
+    """Return esm_datastore from catalog DataFrame and esmcat spec."""
     if version.Version(intake_esm.__version__) < version.Version("2022.9.18"):
         return esm_datastore(esmcat_data, esmcat_spec)
     else:
         return esm_datastore({"df": esmcat_data, "esmcat": esmcat_spec})
 
 
+def _wrap_file_parser(
+    file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]],
+    parse_cache: Union[ParseCache, str, PathLike],
+) -> Callable[[Union[str, PathLike]], Dict[str, Any]]:
+    """Return file parser that looks up results in `parse_cache`."""
+    if not isinstance(parse_cache, ParseCache):
+        parse_cache = ParseCache(parse_cache)
+    return parse_cache.wrap(file_parser)
+
+
+def _write_references(
+    esm_datastores: List[esm_datastore],
+    directory: Union[str, PathLike],
+    report: Optional[BuildReport],
+) -> None:
+    """Write references of generated catalogs, see write_references."""
+    # imported here, because references imports this module
+    from .references import write_references
+
+    for esm_datastore_out in esm_datastores:
+        write_references(esm_datastore_out, directory, report=report)
+
+
+def _evict_parse_cache(file_parser: Optional[Callable]) -> None:
+    """Evict excess entries from the cache that `file_parser` uses, if any."""
+    if isinstance(file_parser, CachedFileParser):
+        file_parser.cache.evict()
+
+
 def get_nc_paths(
-    dir_list: List[Union[str, PathLike]], case: str, exclude_dirs: List[str]
+    dir_list: List[Union[str, PathLike]],
+    case: str,
+    exclude_dirs: List[str],
+    max_workers: Optional[int] = None,
 ) -> List[str]:
     """
     Get paths of netCDF output files in directories and their subdirectories.
 
+    Directories are scanned concurrently with ``os.scandir``, using a pool of
+    threads that fans out over subdirectories as they are encountered.
+
     Parameters
     ----------
-    column_names : list of str or path-like
+    dir_list : list of str or path-like
         Directories to be searched.
     case : str
         Name of case that generated files being searched for.
         Only files whose names start with case are returned.
     exclude_dirs : list of str
-        Directories to exclude from the search.
+        Files in directories whose basename is in `exclude_dirs` are excluded
+        from the search. Subdirectories of such directories are still searched.
+    max_workers : int, optional
+        Maximum number of threads used to scan directories. Default is the
+        ``concurrent.futures.ThreadPoolExecutor`` default.
 
     Returns
     -------
     list of str
-        List of files that were found.
+        Sorted list of files that were found.
+    """
+
+    return sorted(iter_nc_paths(dir_list, case, exclude_dirs, max_workers))
+
+
+def iter_nc_paths(
+    dir_list: List[Union[str, PathLike]],
+    case: str,
+    exclude_dirs: List[str],
+    max_workers: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Iterate over paths of netCDF output files in directories and their
+    subdirectories.
+
+    Paths are yielded as soon as the directory containing them has been
+    scanned, while other directories are still being scanned, so callers
+    can process paths before the search is complete. Paths are not yielded
+    in sorted order.
+
+    Parameters
+    ----------
+    dir_list : list of str or path-like
+        Directories to be searched.
+    case : str
+        Name of case that generated files being searched for.
+        Only files whose names start with case are returned.
+    exclude_dirs : list of str
+        Files in directories whose basename is in `exclude_dirs` are excluded
+        from the search. Subdirectories of such directories are still searched.
+    max_workers : int, optional
+        Maximum number of threads used to scan directories. Default is the
+        ``concurrent.futures.ThreadPoolExecutor`` default.
+
+    Yields
+    ------
+    str
+        Path of file that was found.
+
+    See Also
+    --------
+    get_nc_paths
+    """
+
+    for _, path in _iter_cases_nc_paths([(dir_list, case)], exclude_dirs, max_workers):
+        yield path
+
+
+def _iter_cases_nc_paths(
+    cases_dirs: List[Tuple[List[Union[str, PathLike]], str]],
+    exclude_dirs: List[str],
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Iterate over paths of netCDF output files of cases.
+
+    Directories of all cases are scanned by a single pool of threads. See
+    :py:func:`iter_nc_paths`.
+
+    Parameters
+    ----------
+    cases_dirs : list of tuple of (list of str or path-like, str)
+        Directories to be searched, and name of case, of each case.
+    exclude_dirs : list of str
+        See :py:func:`iter_nc_paths`.
+    max_workers : int, optional
+        See :py:func:`iter_nc_paths`.
+
+    Yields
+    ------
+    tuple of (int, str)
+        Index of case in `cases_dirs`, and path of file that was found.
+    """
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # case index of each pending scan
+        pending = {
+            executor.submit(
+                _scan_dir, str(dir).rstrip(os.sep), case, exclude_dirs
+            ): case_ind
+            for case_ind, (dir_list, case) in enumerate(cases_dirs)
+            for dir in dir_list
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                case_ind = pending.pop(future)
+                case = cases_dirs[case_ind][1]
+                dir_paths, subdirs = future.result()
+                # submit subdirectories before yielding, so that scanning
+                # continues while the caller processes dir_paths
+                for subdir in subdirs:
+                    subdir_future = executor.submit(
+                        _scan_dir, subdir, case, exclude_dirs
+                    )
+                    pending[subdir_future] = case_ind
+                for path in dir_paths:
+                    yield case_ind, path
+
+
+def _scan_dir(
+    dirname: str, case: str, exclude_dirs: List[str]
+) -> Tuple[List[str], List[str]]:
     """
+    Scan a single directory for netCDF output files and subdirectories.
 
-    paths = []
-    for dir in dir_list:
-        for root, dirs, files in os.walk(str(dir).rstrip(os.sep)):
-            if os.path.basename(root) in exclude_dirs:
+    Entries are classified the same way that ``os.walk`` classifies them, so
+    symbolic links to directories are not descended into, and directories
+    that cannot be read are silently skipped.
+
+    Parameters
+    ----------
+    dirname : str
+        Directory being scanned.
+    case : str
+        Name of case that generated files being searched for.
+    exclude_dirs : list of str
+        If the basename of `dirname` is in `exclude_dirs`, then no files from
+        `dirname` are returned.
+
+    Returns
+    -------
+    tuple of (list of str, list of str)
+        Paths of files in `dirname` that were found, and subdirectories of
+        `dirname` to be scanned.
+    """
+
+    paths: List[str] = []
+    subdirs: List[str] = []
+    keep_files = os.path.basename(dirname) not in exclude_dirs
+    try:
+        with os.scandir(dirname) as entries_iter:
+            entries = list(entries_iter)
+    except OSError:
+        return paths, subdirs
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            try:
+                is_symlink = entry.is_symlink()
+            except OSError:
+                is_symlink = False
+            if not is_symlink:
+                subdirs.append(entry.path)
+        elif keep_files and entry.name.startswith(case) and entry.name.endswith(".nc"):
+            paths.append(entry.path)
+    return paths, subdirs
+
+
+def _iter_case_chunks(
+    tagged_paths: Iterable[Tuple[int, str]], chunksize: Optional[int], n_workers: int
+) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Group paths into chunks that are parsed in a single task.
+
+    Each chunk contains paths of a single case.
+
+    Parameters
+    ----------
+    tagged_paths : iterable of tuple of (int, str)
+        Index of case, and path, of paths being grouped.
+    chunksize : int or None
+        Number of paths per chunk. If None, the number of paths per chunk is
+        the number of paths seen so far, over all cases, divided by
+        4 * `n_workers`, bounded between 1 and _MAX_AUTO_CHUNKSIZE. So initial
+        chunks are small, to start all workers promptly, and chunks grow as
+        more paths are found.
+    n_workers : int
+        Number of workers that chunks are distributed to.
+
+    Yields
+    ------
+    tuple of (int, list of str)
+        Index of case, and chunk of paths.
+    """
+
+    chunks: Dict[int, List[str]] = {}
+    for n_seen, (case_ind, path) in enumerate(tagged_paths, start=1):
+        chunk = chunks.setdefault(case_ind, [])
+        chunk.append(path)
+        if chunksize is None:
+            target = min(max(1, n_seen // (4 * n_workers)), _MAX_AUTO_CHUNKSIZE)
+        else:
+            target = chunksize
+        if len(chunk) >= target:
+            yield case_ind, chunks.pop(case_ind)
+    yield from chunks.items()
+
+
+def _record_paths(
+    paths: Iterable[_T], paths_found: List[_T], report: Optional[BuildReport] = None
+) -> Iterator[_T]:
+    """
+    Yield paths from `paths`, appending them to `paths_found`.
+
+    If `report` is provided, time spent waiting for paths is added to its
+    "scan" wall time.
+    """
+    if report is None:
+        for path in paths:
+            paths_found.append(path)
+            yield path
+        return
+    paths_iter = iter(paths)
+    while True:
+        time_start = time.perf_counter()
+        path_or_none = next(paths_iter, None)
+        report.wall_times["scan"] += time.perf_counter() - time_start
+        if path_or_none is None:
+            return
+        paths_found.append(path_or_none)
+        yield path_or_none
+
+
+def _record_wall_time(report: BuildReport, name: str, time_start: float) -> float:
+    """Add wall time since `time_start` to `report`, and return current time."""
+    time_end = time.perf_counter()
+    report.wall_times[name] += time_end - time_start
+    return time_end
+
+
+def _subset_dict(paths_dict: Dict[str, Any], paths: List[str]) -> Dict[str, Any]:
+    """Return subset of `paths_dict` for keys in `paths`."""
+    return {path: paths_dict[path] for path in paths if path in paths_dict}
+
+
+def _dask_client() -> Any:
+    """
+    Return the current dask distributed client.
+
+    If distributed is not installed, or no client has been created, then
+    return None.
+    """
+    try:
+        from distributed import get_client
+
+        return get_client()
+    except (ImportError, ValueError):
+        return None
+
+
+def _dask_n_workers() -> int:
+    """
+    Return number of threads in the current dask distributed cluster.
+
+    If distributed is not installed, or no client has been created, then
+    return the number of CPUs.
+    """
+    client = _dask_client()
+    if client is None:
+        return os.cpu_count() or 1
+    return sum(client.nthreads().values())
+
+
+def gen_esmcol_df(
+    column_names: List[str],
+    paths: Iterable[str],
+    case: str,
+    path_parser: Callable[[Union[str, PathLike], str], Dict[str, str]],
+    file_parser: Optional[Callable[[Union[str, PathLike]], Dict[str, Any]]],
+    paths_in_stat: Dict[str, Dict[str, int]],
+    report: Optional[BuildReport] = None,
+) -> pd.DataFrame:
+    """
+    Generate DataFrame of esmcol rows from files.
+
+    Parameters
+    ----------
+    column_names : list of str
+        Names of columns in esmcol, and of columns of returned DataFrame.
+    paths : iterable of str
+        Paths of files that esmcol rows are being generated from.
+    case : str
+        Name of case that generated `paths`.
+    path_parser : callable
+        Function to separate a file path into components.
+    file_parser : callable or None
+        Function to extract specific quantities/metadata from a file.
+        If None, files are not opened, and entries of columns that are not
+        derived from paths or ``os.stat`` are None.
+    paths_in_stat : dict
+        Cached values of columns derived from ``os.stat``, keyed by path.
+        See :py:func:`gen_esmcol_row`.
+    report : BuildReport, optional
+        If provided, time spent generating rows is recorded in this report.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with rows generated by :py:func:`append_esmcol_row` for
+        each path in `paths`. Paths for which no row is generated are omitted.
+    """
+    columns = EsmcolColumns(column_names, fill_missing=file_parser is None)
+    if report is None:
+        for path in paths:
+            append_esmcol_row(
+                columns,
+                path,
+                case,
+                path_parser,
+                file_parser,
+                paths_in_stat.get(path, {}),
+            )
+        return columns.to_df()
+
+    # time spent outside of the parsers is attributed to the stat phase
+    parsers_time_start = report.phase_times["path_parser"]
+    parsers_time_start += report.phase_times["file_parser"]
+    path_parser = _timed(path_parser, report, "path_parser")
+    if file_parser is not None:
+        file_parser = _timed(file_parser, report, "file_parser")
+    rows_time = 0.0
+    with recording(report):
+        for path in paths:
+            time_start = time.perf_counter()
+            append_esmcol_row(
+                columns,
+                path,
+                case,
+                path_parser,
+                file_parser,
+                paths_in_stat.get(path, {}),
+            )
+            report.file_times[path] = time.perf_counter() - time_start
+            rows_time += report.file_times[path]
+    parsers_time = report.phase_times["path_parser"] + report.phase_times["file_parser"]
+    report.phase_times["stat"] += rows_time - (parsers_time - parsers_time_start)
+    return columns.to_df()
+
+
+def _gen_esmcol_df_with_report(*args: Any) -> Tuple[pd.DataFrame, BuildReport]:
+    """
+    Call :py:func:`gen_esmcol_df`, returning a report of the time spent.
+
+    This is used in parallel workers, where a report that is passed in cannot
+    be modified.
+    """
+    report = BuildReport()
+    column_names, paths, case, path_parser, file_parser, paths_in_stat = args
+    df = gen_esmcol_df(
+        column_names, paths, case, path_parser, file_parser, paths_in_stat, report
+    )
+    return df, report
+
+
+def _timed(func: Callable, report: BuildReport, name: str) -> Callable:
+    """Return wrapper of `func` that adds time spent in it to a phase of report."""
+
+    def timed_func(*args: Any) -> Any:
+        time_start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            report.phase_times[name] += time.perf_counter() - time_start
+
+    return timed_func
+
+
+class EsmcolColumns:
+    """
+    Columnar accumulator of esmcol rows.
+
+    Rows are appended directly into per-column lists, instead of being kept
+    as a dictionary per row. Values of columns in `categorical_columns`, which are
+    expected to have few unique values, are stored as integer codes into a
+    table of unique values while rows are accumulated. Codes are decoded in
+    :py:meth:`to_df` and :py:meth:`row`, so the values, and dtypes of the
+    DataFrame, are those of rows generated by :py:func:`gen_esmcol_row`.
+
+    Parameters
+    ----------
+    column_names : list of str
+        Names of columns in esmcol.
+    categorical_columns : iterable of str, optional
+        Names of columns whose values are stored as integer codes.
+    fill_missing : bool, optional
+        If True, values of columns that are missing from appended rows are
+        None. Otherwise, a `ValueError` is raised. Default is False.
+    """
+
+    def __init__(
+        self,
+        column_names: List[str],
+        categorical_columns: Iterable[str] = (
+            "case",
+            "scomp",
+            "component",
+            "stream",
+            "frequency",
+        ),
+        fill_missing: bool = False,
+    ):
+        self.column_names = column_names
+        self.fill_missing = fill_missing
+        self._values: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, array.array] = {}
+        self._categories: Dict[str, Dict[Any, int]] = {}
+        for key in column_names:
+            if key in categorical_columns:
+                self._codes[key] = array.array("i")
+                self._categories[key] = {}
+            else:
+                self._values[key] = []
+        # bound append methods, to reduce per-row overhead in append
+        self._values_appenders = [
+            (key, values.append)
+            for key, values in self._values.items()
+            if key not in ("path", "case")
+        ]
+        self._codes_appenders = [
+            (key, codes.append, self._categories[key])
+            for key, codes in self._codes.items()
+            if key not in ("path", "case")
+        ]
+        self._path_append = self._appender("path")
+        self._case_append = self._appender("case")
+        # columns whose values are looked up in the dictionaries passed to append
+        self._lookup_keys = [key for key in column_names if key not in ("path", "case")]
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _appender(self, key: str) -> Optional[Callable[[Any], None]]:
+        """Return function that appends a value to column `key`, if it exists."""
+        if key in self._values:
+            return self._values[key].append
+        if key in self._codes:
+            codes_append = self._codes[key].append
+            categories = self._categories[key]
+            return lambda value: codes_append(
+                categories.setdefault(value, len(categories))
+            )
+        return None
+
+    def append(
+        self,
+        path: str,
+        case: str,
+        stat_values: Dict[str, int],
+        path_attrs: Dict[str, Any],
+        file_attrs: Dict[str, Any],
+    ) -> None:
+        """
+        Append a row.
+
+        Values are taken, in order of precedence, from `path`, `case`,
+        `stat_values`, `path_attrs`, and `file_attrs`.
+
+        Parameters
+        ----------
+        path : str
+            Path of file that row is generated from.
+        case : str
+            Name of case that generated `path`.
+        stat_values : dict
+            Values of columns derived from ``os.stat``.
+        path_attrs, file_attrs : dict
+            Attributes returned by path and file parsers for `path`.
+
+        Raises
+        ------
+        ValueError
+            If a column is not in any of the dictionaries, and `fill_missing`
+            is False. Nothing is appended in this case.
+        """
+        # keys are checked before anything is appended, so rows are complete
+        for key in self._lookup_keys:
+            if key in stat_values or key in path_attrs or key in file_attrs:
                 continue
-            for file in files:
-                if file.startswith(case) and file.endswith(".nc"):
-                    paths.append(os.path.join(root, file))
-    paths.sort()
-    return paths
+            if not self.fill_missing:
+                raise ValueError(f"unknown column name {key} for {path}")
+            file_attrs = {**dict.fromkeys(self._lookup_keys), **file_attrs}
+            break
+
+        if self._path_append is not None:
+            self._path_append(path)
+        if self._case_append is not None:
+            self._case_append(case)
+        for key, values_append in self._values_appenders:
+            if key in stat_values:
+                values_append(stat_values[key])
+            elif key in path_attrs:
+                values_append(path_attrs[key])
+            else:
+                values_append(file_attrs[key])
+        for key, codes_append, categories in self._codes_appenders:
+            if key in stat_values:
+                value = stat_values[key]
+            elif key in path_attrs:
+                value = path_attrs[key]
+            else:
+                value = file_attrs[key]
+            codes_append(categories.setdefault(value, len(categories)))
+        self._len += 1
+
+    def row(self, ind: int) -> Dict[str, Any]:
+        """
+        Return an accumulated row.
+
+        Parameters
+        ----------
+        ind : int
+            Position of row.
+
+        Returns
+        -------
+        dict
+            Values of the row, keyed by column name, in the order of
+            `column_names`.
+        """
+        row = {}
+        for key in self.column_names:
+            if key in self._codes:
+                row[key] = list(self._categories[key])[self._codes[key][ind]]
+            else:
+                row[key] = self._values[key][ind]
+        return row
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Return DataFrame of accumulated rows.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with a column for each name in `column_names`. Columns
+            in `categorical_columns` are decoded into lists of their values,
+            so their dtypes are inferred as for other columns.
+        """
+        data: Dict[str, Any] = {}
+        for key in self.column_names:
+            if key in self._codes:
+                categories = np.empty(len(self._categories[key]), dtype=object)
+                categories[:] = list(self._categories[key])
+                codes = np.frombuffer(self._codes[key], dtype=np.int32)
+                data[key] = categories[codes].tolist()
+            else:
+                data[key] = self._values[key]
+        return pd.DataFrame(data, columns=self.column_names)
+
+
+def _concat_esmcat_data(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate catalog DataFrames, with union of categories of categorical columns.
+
+    Without this, categorical columns whose categories differ between
+    DataFrames are concatenated into object columns. Categories are sorted
+    when possible, so that they do not depend on how rows were split between
+    DataFrames.
+    """
+    # empty DataFrames are omitted, as their columns have dtype object
+    dfs = [df for df in dfs if len(df) > 0] or dfs[:1]
+    for key in dfs[0].columns:
+        if not all(isinstance(df[key].dtype, pd.CategoricalDtype) for df in dfs):
+            continue
+        categories = pd.api.types.union_categoricals(
+            [df[key].array for df in dfs]
+        ).categories
+        try:
+            categories = categories.sort_values()
+        except TypeError:
+            pass
+        dfs = [df.assign(**{key: df[key].cat.set_categories(categories)}) for df in dfs]
+    return pd.concat(dfs)
 
 
 def gen_esmcol_row(
@@ -201,8 +1453,8 @@ def gen_esmcol_row(
     path: Union[str, PathLike],
     case: str,
     path_parser: Callable[[Union[str, PathLike], str], Dict[str, str]],
-    file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]],
-    path_in_size: int,
+    file_parser: Optional[Callable[[Union[str, PathLike]], Dict[str, Any]]],
+    path_in_stat: Dict[str, int],
 ) -> Union[Dict[str, Any], None]:
     """
     Generate esmcol row from a file.
@@ -217,41 +1469,149 @@ def gen_esmcol_row(
         Name of case that generated `path`.
     path_parser : callable
         Function to separate a file path into components.
-    file_parser : callable
+    file_parser : callable or None
         Function to extract specific quantities/metadata from a file.
-    path_in_size : int
-        Cached value of size of file, or -1. If the same of the file
-        `path` is equal to this value, then return None.
+        If None, the file is not opened, and entries of columns that are not
+        derived from the path or ``os.stat`` are None.
+    path_in_stat : dict
+        Cached values of columns derived from ``os.stat``, i.e., size, mtime,
+        and inode, of file. If these are all equal to the current values for
+        the file `path`, then return None. If empty, a row is always
+        generated.
 
     Returns
     -------
     dict
         Dictionary of esmcol row entries, for each column in `column_names`.
     """
+    columns = EsmcolColumns(
+        column_names, categorical_columns=(), fill_missing=file_parser is None
+    )
+    if not append_esmcol_row(
+        columns, str(path), case, path_parser, file_parser, path_in_stat
+    ):
+        return None
+    return columns.row(0)
+
+
+def append_esmcol_row(
+    columns: EsmcolColumns,
+    path: str,
+    case: str,
+    path_parser: Callable[[Union[str, PathLike], str], Dict[str, str]],
+    file_parser: Optional[Callable[[Union[str, PathLike]], Dict[str, Any]]],
+    path_in_stat: Dict[str, int],
+) -> bool:
+    """
+    Generate esmcol row from a file, and append it to columns.
 
-    # return None if path_in_size is equal to size of file specified by path,
+    This is the columnar form of :py:func:`gen_esmcol_row`, which avoids
+    creating a dictionary per row.
+
+    Parameters
+    ----------
+    columns : EsmcolColumns
+        Accumulator that generated row is appended to.
+    path : str
+        Path of file that esmcol row is being generated from.
+    case, path_parser, file_parser, path_in_stat
+        See :py:func:`gen_esmcol_row`.
+
+    Returns
+    -------
+    bool
+        True if a row was appended to `columns`, False otherwise.
+    """
+
+    # return False if path_in_stat is equal to stat values of file specified by path,
     # i.e., row in esm_datastore_in in case_metadata_to_esm_datastore is up to date
-    size = os.stat(path).st_size
-    if path_in_size == size:
-        return None
+    stat_result = os.stat(path)
+    stat_values = {
+        key: getattr(stat_result, attr) for key, attr in _STAT_COLUMNS.items()
+    }
+    if path_in_stat and all(
+        stat_values[key] == value for key, value in path_in_stat.items()
+    ):
+        return False
 
-    path_attrs = path_parser(path, case)
-    file_attrs = file_parser(path)
-    row: Dict[str, Any] = {}
-    for key in column_names:
-        if key == "path":
-            row[key] = path
-        elif key == "case":
-            row[key] = case
-        elif key == "size":
-            row[key] = size
-        elif key in path_attrs:
-            row[key] = path_attrs[key]
-        elif key in file_attrs:
-            row[key] = file_attrs[key]
-        else:
-            raise ValueError(f"unknown column name {key} for {path}")
-    return row
+    file_attrs = {} if file_parser is None else file_parser(path)
+    columns.append(path, case, stat_values, path_parser(path, case), file_attrs)
+    return True
+
+
+def _update_esmcat_data(
+    esmcat_data_in: pd.DataFrame,
+    esmcat_data_new: pd.DataFrame,
+    paths_found: Set[str],
+    case: str,
+    output_dirs: List[Union[str, PathLike]],
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Update catalog DataFrame with new rows, and remove rows for deleted files.
+
+    Parameters
+    ----------
+    esmcat_data_in : pandas.DataFrame
+        DataFrame being updated. It is not modified.
+    esmcat_data_new : pandas.DataFrame
+        New rows. Rows whose path is in `esmcat_data_in` replace the row
+        with that path, other rows are appended.
+    paths_found : set of str
+        Paths that were found in `output_dirs`.
+    case : str
+        Name of case that generated paths in `paths_found`.
+    output_dirs : list of str or path-like
+        Directories that were searched. Rows of `esmcat_data_in` for `case`
+        in these directories are removed if their path is not in
+        `paths_found` and no longer exists.
+
+    Returns
+    -------
+    tuple of (pandas.DataFrame, dict)
+        Updated DataFrame, and dictionary with the number of rows that were
+        added, changed, and removed.
+    """
+
+    paths_in = esmcat_data_in["path"]
+
+    # determine rows for files in output_dirs that no longer exist
+    prefixes = tuple(str(dir).rstrip(os.sep) + os.sep for dir in output_dirs)
+    removed_mask = paths_in.str.startswith(prefixes).to_numpy(dtype=bool, copy=True)
+    if "case" in esmcat_data_in.columns:
+        removed_mask &= (esmcat_data_in["case"] == case).to_numpy(dtype=bool)
+    for ind in removed_mask.nonzero()[0]:
+        path = str(paths_in.iat[int(ind)])
+        removed_mask[ind] = path not in paths_found and not os.path.exists(path)
+
+    pos = pd.Index(paths_in).get_indexer(esmcat_data_new["path"])
+    changed_mask = pos >= 0
+    counts = {
+        "added": int((~changed_mask).sum()),
+        "changed": int(changed_mask.sum()),
+        "removed": int(removed_mask.sum()),
+    }
+    if counts == {"added": 0, "changed": 0, "removed": 0}:
+        return esmcat_data_in, counts
+
+    esmcat_data = esmcat_data_in.copy()
+    # add categories of new rows to categorical columns, so that changed rows
+    # can be set in place
+    for key in esmcat_data.columns:
+        if isinstance(esmcat_data[key].dtype, pd.CategoricalDtype):
+            categories = pd.Index(esmcat_data_new[key].dropna().unique())
+            esmcat_data[key] = esmcat_data[key].cat.add_categories(
+                categories.difference(esmcat_data[key].cat.categories)
+            )
+    if counts["changed"] > 0:
+        for col_ind, key in enumerate(esmcat_data.columns):
+            esmcat_data.iloc[pos[changed_mask], col_ind] = esmcat_data_new[
+                key
+            ].to_numpy()[changed_mask]
+    if counts["removed"] > 0:
+        esmcat_data = esmcat_data[~removed_mask]
+    if counts["added"] > 0:
+        esmcat_data = _concat_esmcat_data([esmcat_data, esmcat_data_new[~changed_mask]])
+    return esmcat_data.reset_index(drop=True), counts
 
 
 def date_parser(value: str) -> Union[datetime.date, None]:
@@ -275,3 +1635,130 @@ def date_parser(value: str) -> Union[datetime.date, None]:
         return None
     else:
         return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def date_ordinals(values: Any) -> np.ndarray:
+    """
+    Convert dates to ordinals, vectorized.
+
+    Ordinals are days in the proleptic Gregorian calendar, as returned by
+    ``datetime.date.toordinal``, i.e., 0001-01-01 is 1. Strings of the form
+    ``YYYY-MM-DD``, which is how dates are written to catalog csv files, are
+    converted with numpy operations on their characters, without creating
+    date objects. Years can have any number of digits, including years that
+    ``datetime.date`` and ``numpy.datetime64[ns]`` cannot represent.
+
+    Parameters
+    ----------
+    values : array-like
+        Date strings, ``datetime.date`` objects, including
+        ``pandas.Timestamp`` objects, or ``numpy.datetime64`` values. None,
+        NaN, and NaT are missing.
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 ordinals of `values`, with ``DATE_ORDINAL_MISSING`` for
+        missing values.
+
+    Raises
+    ------
+    ValueError
+        If a string is not a valid date.
+    TypeError
+        If a value is of another type.
+    """
+    if getattr(getattr(values, "dtype", None), "kind", None) == "M":
+        days = np.asarray(values).astype("datetime64[D]")
+        ordinals = days.astype(np.int64) + _UNIX_EPOCH_ORDINAL
+        ordinals[np.isnat(days)] = DATE_ORDINAL_MISSING
+        return ordinals
+
+    values = np.asarray(values, dtype=object)
+    ordinals = np.full(len(values), DATE_ORDINAL_MISSING, dtype=np.int64)
+    if len(values) == 0:
+        return ordinals
+
+    # fixed-width strings are converted from their characters
+    is_str = np.fromiter(
+        (type(value) is str and len(value) == 10 for value in values),
+        dtype=bool,
+        count=len(values),
+    )
+    if is_str.any():
+        try:
+            chars = values[is_str].astype("S10")
+        except UnicodeEncodeError:
+            is_str[:] = False
+        else:
+            codes = chars.view(np.uint8).reshape(-1, 10).astype(np.int64)
+            digits = codes - ord("0")
+            is_date = (
+                (codes[:, 4] == ord("-"))
+                & (codes[:, 7] == ord("-"))
+                & ((digits[:, [0, 1, 2, 3, 5, 6, 8, 9]] >= 0).all(axis=1))
+                & ((digits[:, [0, 1, 2, 3, 5, 6, 8, 9]] <= 9).all(axis=1))
+            )
+            ordinals[np.flatnonzero(is_str)[is_date]] = _ymd_to_ordinals(
+                digits[is_date, 0:4] @ np.array([1000, 100, 10, 1]),
+                digits[is_date, 5:7] @ np.array([10, 1]),
+                digits[is_date, 8:10] @ np.array([10, 1]),
+            )
+            is_str[np.flatnonzero(is_str)[~is_date]] = False
+
+    # remaining values are converted individually
+    for ind in np.flatnonzero(~is_str):
+        ordinals[ind] = _date_ordinal(values[ind])
+    return ordinals
+
+
+def _ymd_to_ordinals(
+    year: np.ndarray, month: np.ndarray, day: np.ndarray
+) -> np.ndarray:
+    """Return proleptic Gregorian ordinals of dates."""
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    valid = (month >= 1) & (month <= 12)
+    valid[valid] &= (day[valid] >= 1) & (
+        day[valid]
+        <= _MAX_DAYS_IN_MONTH[month[valid]] - ((month[valid] == 2) & ~is_leap[valid])
+    )
+    if not valid.all():
+        ind = np.flatnonzero(~valid)[0]
+        raise ValueError(f"invalid date {year[ind]}-{month[ind]}-{day[ind]}")
+    prev_year = year - 1
+    return (
+        365 * prev_year
+        + prev_year // 4
+        - prev_year // 100
+        + prev_year // 400
+        + _DAYS_BEFORE_MONTH[month]
+        + ((month > 2) & is_leap)
+        + day
+    )
+
+
+def _date_ordinal(value: Any) -> int:
+    """Return proleptic Gregorian ordinal of a date, see date_ordinals."""
+    # NaT is an instance of datetime.date, so it is checked for first
+    if value is None or value is pd.NaT:
+        return int(DATE_ORDINAL_MISSING)
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    if isinstance(value, np.datetime64):
+        if np.isnat(value):
+            return int(DATE_ORDINAL_MISSING)
+        days = value.astype("datetime64[D]").astype(np.int64)
+        return int(days) + _UNIX_EPOCH_ORDINAL
+    if isinstance(value, (float, np.floating)) and np.isnan(value):
+        return int(DATE_ORDINAL_MISSING)
+    if not isinstance(value, str):
+        raise TypeError(f"date {value!r} of unsupported type {type(value).__name__}")
+    year, sep_1, remainder = value.partition("-")
+    month, sep_2, day = remainder.partition("-")
+    if not (sep_1 and sep_2 and year.isdigit() and month.isdigit() and day.isdigit()):
+        raise ValueError(f"invalid date {value!r}")
+    return int(
+        _ymd_to_ordinals(
+            np.array([int(year)]), np.array([int(month)]), np.array([int(day)])
+        )[0]
+    )
@@ -2,12 +2,15 @@
 
 import os.path
 from os import PathLike
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 
 from intake_esm import esm_datastore
 
 from .caseroot_to_case_metadata import caseroot_to_case_metadata
-from .catalog_gen import case_metadata_to_esm_datastore
+from .catalog_gen import (
+    case_metadata_to_esm_datastore,
+    cases_metadata_to_esm_datastore,
+)
 
 
 def directory_to_esm_datastore(
@@ -82,3 +85,39 @@ def caseroot_to_esm_datastore(
 
     case_metadata = caseroot_to_case_metadata(caseroot)
     return case_metadata_to_esm_datastore(case_metadata, **kwargs)
+
+
+def caseroots_to_esm_datastore(
+    caseroots: List[Union[str, PathLike]], **kwargs
+) -> Union[esm_datastore, Dict[str, esm_datastore]]:
+    """
+    Generate `esm_datastore
+    <https://intake-esm.readthedocs.io/en/stable/reference/api.html>`_
+    objects for files generated by multiple cases, e.g., members of an
+    ensemble.
+
+    Parameters
+    ----------
+    caseroots : list of str or path-like
+        Caseroot directories of cases that generated files.
+    **kwargs : dict, optional
+        Additional keyword arguments passed on to
+        :py:func:`cases_metadata_to_esm_datastore`.
+
+    Returns
+    -------
+    esm_datastore or dict of esm_datastore
+        See :py:func:`cases_metadata_to_esm_datastore`.
+
+    See Also
+    --------
+    cases_metadata_to_esm_datastore
+
+    Notes
+    -----
+    Passes created dictionaries of case metadata to
+    :py:func:`cases_metadata_to_esm_datastore`.
+    """
+
+    cases_metadata = [caseroot_to_case_metadata(caseroot) for caseroot in caseroots]
+    return cases_metadata_to_esm_datastore(cases_metadata, **kwargs)
@@ -0,0 +1,618 @@
+"""Index of catalog rows, for selecting rows without scanning the catalog."""
+
+import datetime
+import hashlib
+import itertools
+import os
+import os.path
+import weakref
+from os import PathLike
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .catalog_gen import DATE_ORDINAL_MISSING, date_ordinals
+from .compact_catalog import CompactCatalog
+
+# weak references to catalogs, and their indexes, keyed by id of catalog
+# catalogs are not used as keys of a WeakKeyDictionary, because hashing an
+# esm_datastore formats its DataFrame
+_catalog_indexes: Dict[int, Tuple[weakref.ref, "CatalogIndex"]] = {}
+
+# ordinal of missing dates
+_MISSING = DATE_ORDINAL_MISSING
+
+# suffix of files that varname indexes are written to
+_VARNAME_INDEX_SUFFIX = ".varname_index.npz"
+
+# extensions of compressed catalog csv files, see esm_datastore.serialize
+_COMPRESSION_EXTENSIONS = [".gz", ".bz2", ".zip", ".xz"]
+
+
+class VarnameIndex:
+    """
+    Inverted index from varnames to the catalog rows that contain them.
+
+    For each varname, the integer positions of rows whose varname entry
+    contains it are stored as a sorted slice of a single array, so the index
+    is compact and can be written to, and read from, a ``.npz`` file.
+
+    Parameters
+    ----------
+    varnames : numpy.ndarray
+        Sorted array of varnames in catalog.
+    offsets : numpy.ndarray
+        Rows of ``varnames[ind]`` are ``rows[offsets[ind]:offsets[ind+1]]``.
+    rows : numpy.ndarray
+        Concatenated sorted row positions of each varname.
+    """
+
+    def __init__(
+        self, varnames: np.ndarray, offsets: np.ndarray, rows: np.ndarray
+    ) -> None:
+        self.varnames = varnames
+        self.offsets = offsets
+        self.rows = rows
+        self._varname_ids = {varname: ind for ind, varname in enumerate(varnames)}
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "VarnameIndex":
+        """
+        Build index from varname column of catalog DataFrame.
+
+        Entries of the varname column are lists of varnames, as in catalogs of
+        history files, or a single varname, as in catalogs of timeseries
+        files. Other entries, e.g., missing values, contain no varnames.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Catalog DataFrame.
+
+        Returns
+        -------
+        VarnameIndex
+        """
+        entries = [_varname_list(entry) for entry in df["varname"]]
+        lengths = np.fromiter(map(len, entries), dtype=np.int64, count=len(entries))
+        codes, varnames = pd.factorize(
+            np.array(list(itertools.chain.from_iterable(entries)), dtype=object),
+            sort=True,
+        )
+        rows: np.ndarray = np.repeat(
+            np.arange(len(entries), dtype=_row_dtype(len(df))), lengths
+        )
+        return cls._from_codes(codes, varnames, rows)
+
+    @classmethod
+    def from_compact(cls, catalog: CompactCatalog) -> "VarnameIndex":
+        """
+        Build index from varname column of compact catalog.
+
+        The index is built from the stored codes of the varname column,
+        without expanding its entries.
+
+        Parameters
+        ----------
+        catalog : CompactCatalog
+            Compact catalog.
+
+        Returns
+        -------
+        VarnameIndex
+        """
+        names, codes, offsets = catalog.variable_codes("varname")
+        order = np.argsort(names, kind="stable")
+        ranks = np.empty(len(names), dtype=np.int64)
+        ranks[order] = np.arange(len(names))
+        rows: np.ndarray = np.repeat(
+            np.arange(len(catalog), dtype=_row_dtype(len(catalog))), np.diff(offsets)
+        )
+        return cls._from_codes(ranks[codes], names[order], rows)
+
+    @classmethod
+    def _from_codes(
+        cls, codes: np.ndarray, varnames: Any, rows: np.ndarray
+    ) -> "VarnameIndex":
+        """
+        Build index from codes into sorted varnames, and sorted rows of codes.
+        """
+        # rows are already sorted, so a stable sort by varname keeps them sorted
+        order = np.argsort(codes, kind="stable")
+        codes, rows = codes[order], rows[order]
+        # drop varnames that are repeated within an entry
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows = codes[keep], rows[keep]
+        offsets = np.zeros(len(varnames) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(varnames)), out=offsets[1:])
+        return cls(np.asarray(varnames, dtype=str), offsets, rows)
+
+    @classmethod
+    def read(cls, path: Union[str, PathLike], df: pd.DataFrame) -> "VarnameIndex":
+        """
+        Read index written by :py:meth:`write`.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Path of ``.npz`` file that index was written to.
+        df : pandas.DataFrame
+            Catalog DataFrame that index is for.
+
+        Returns
+        -------
+        VarnameIndex
+
+        Raises
+        ------
+        ValueError
+            If the index was written for a catalog with different paths,
+            varnames, or sizes.
+        """
+        with np.load(path, allow_pickle=False) as npz:
+            if "catalog_hash" not in npz.files or str(
+                npz["catalog_hash"]
+            ) != _catalog_hash(df):
+                raise ValueError(f"varname index {path} does not match catalog")
+            return cls(npz["varnames"], npz["offsets"], npz["rows"])
+
+    def write(self, path: Union[str, PathLike], df: pd.DataFrame) -> None:
+        """
+        Write index to a ``.npz`` file.
+
+        A hash of the catalog's paths, varnames, and sizes, if present, is also
+        written, so that an index is not read for a different catalog, or for
+        a catalog whose varnames have since changed.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Path of ``.npz`` file being written.
+        df : pandas.DataFrame
+            Catalog DataFrame that index is for.
+        """
+        # write to an open file, so that np.savez does not append .npz to path
+        with open(path, "wb") as fptr:
+            np.savez(
+                fptr,
+                varnames=self.varnames,
+                offsets=self.offsets,
+                rows=self.rows,
+                catalog_hash=np.array(_catalog_hash(df)),
+            )
+
+    def rows_of(self, varname: str) -> np.ndarray:
+        """
+        Return sorted positions of rows containing varname.
+
+        Parameters
+        ----------
+        varname : str
+            Varname being looked up.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        ind = self._varname_ids.get(varname)
+        if ind is None:
+            return self.rows[:0]
+        return self.rows[self.offsets[ind] : self.offsets[ind + 1]]
+
+
+class CatalogIndex:
+    """
+    Index of catalog rows, for repeated selection of rows from a catalog.
+
+    Rows are grouped by (case, scomp, stream). Within each group, rows are
+    sorted by date, and rows whose date_start and date_end are equal, e.g.,
+    MOM6's static stream, are placed after other rows. Rows containing each
+    varname are found with a :py:class:`VarnameIndex`. Building the index
+    costs one pass over the catalog, and each selection costs roughly the
+    number of selected rows.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Catalog DataFrame, with columns "case", "scomp", "stream",
+        "date_start", "date_end", and "varname".
+    varname_index : VarnameIndex, optional
+        Inverted varname index of `df`, e.g., one that was read from a file.
+        By default, it is built from `df`.
+
+    Attributes
+    ----------
+    df : pandas.DataFrame or None
+        Catalog DataFrame. None for indexes built with :py:meth:`from_compact`.
+    """
+
+    def __init__(
+        self, df: pd.DataFrame, varname_index: Optional[VarnameIndex] = None
+    ) -> None:
+        self.df: Optional[pd.DataFrame] = df
+        self._fingerprint: Optional[str] = None
+        if varname_index is None:
+            varname_index = VarnameIndex.from_df(df)
+        groups = df.groupby(
+            ["case", "scomp", "stream"], observed=True, sort=False
+        ).indices
+        self._build(
+            _to_ordinals(df["date_start"]),
+            _to_ordinals(df["date_end"]),
+            groups,
+            varname_index,
+        )
+
+    @classmethod
+    def from_compact(cls, catalog: CompactCatalog) -> "CatalogIndex":
+        """
+        Build index of a compact catalog, from its stored columns.
+
+        Groups are found from the codes of the "case", "scomp", and "stream"
+        columns, dates from the stored ordinals, and varnames from the codes
+        of the varname column, so the catalog is not expanded.
+
+        Parameters
+        ----------
+        catalog : CompactCatalog
+            Compact catalog.
+
+        Returns
+        -------
+        CatalogIndex
+        """
+        try:
+            varname_index = VarnameIndex.from_compact(catalog)
+        except ValueError:
+            # varname column is not stored as codes
+            varname_index = VarnameIndex.from_df(
+                pd.DataFrame({"varname": catalog.column("varname")})
+            )
+        catalog_index = cls.__new__(cls)
+        catalog_index.df = None
+        catalog_index._fingerprint = catalog.fingerprint
+        keys = ["case", "scomp", "stream"]
+        groups = (
+            pd.DataFrame({key: catalog.categorical(key) for key in keys})
+            .groupby(keys, observed=True, sort=False)
+            .indices
+        )
+        catalog_index._build(
+            _compact_ordinals(catalog, "date_start"),
+            _compact_ordinals(catalog, "date_end"),
+            groups,
+            varname_index,
+        )
+        return catalog_index
+
+    def _build(
+        self,
+        date_start: np.ndarray,
+        date_end: np.ndarray,
+        groups: Dict[Any, Any],
+        varname_index: VarnameIndex,
+    ) -> None:
+        """Build index from date ordinals, group positions, and varname index."""
+        self.varname_index = varname_index
+        n_rows = len(date_start)
+        valid = (date_start != _MISSING) & (date_end != _MISSING)
+        is_static = valid & (date_start == date_end)
+
+        # order rows by group, then non-static rows by date_start, then static
+        # rows, recording where each group's non-static and static rows are
+        order_list: List[np.ndarray] = []
+        self._segments: Dict[Any, Tuple[int, int, int]] = {}
+        seg_start = 0
+        self._groups: Dict[Any, np.ndarray] = {
+            key: np.asarray(positions) for key, positions in groups.items()
+        }
+        for key, positions in self._groups.items():
+            positions = positions[valid[positions]]
+            static = positions[is_static[positions]]
+            ranged = positions[~is_static[positions]]
+            ranged = ranged[np.argsort(date_start[ranged], kind="stable")]
+            order_list.extend([ranged, static])
+            seg_mid = seg_start + len(ranged)
+            seg_end = seg_mid + len(static)
+            self._segments[key] = (seg_start, seg_mid, seg_end)
+            seg_start = seg_end
+        self._order: np.ndarray = np.concatenate(
+            order_list + [np.empty(0, np.int64)]
+        ).astype(_row_dtype(n_rows))
+        self._date_start = date_start[self._order]
+        self._date_end = date_end[self._order]
+        # running maximum of date_end within each group is sorted, so rows
+        # ending after a date can be found with a binary search, even if date
+        # ranges overlap
+        self._date_end_max = self._date_end.copy()
+        for seg_start, seg_mid, _ in self._segments.values():
+            np.maximum.accumulate(
+                self._date_end_max[seg_start:seg_mid],
+                out=self._date_end_max[seg_start:seg_mid],
+            )
+
+        # sorted positions, in the order above, of rows containing each varname
+        inverse = np.full(n_rows, -1, dtype=self._order.dtype)
+        inverse[self._order] = np.arange(len(self._order), dtype=self._order.dtype)
+        n_varnames = len(varname_index.varnames)
+        var_ids = np.repeat(np.arange(n_varnames), np.diff(varname_index.offsets))
+        rows = inverse[varname_index.rows]
+        keep = rows >= 0
+        var_ids, rows = var_ids[keep], rows[keep]
+        self._varname_rows = rows[np.lexsort((rows, var_ids))]
+        self._varname_offsets = np.zeros(n_varnames + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(var_ids, minlength=n_varnames), out=self._varname_offsets[1:]
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of the catalog's contents.
+
+        The hash is of the columns "path", "date_start", and "date_end", and
+        of columns derived from ``os.stat``, e.g., "size", if present. It is
+        computed when first accessed.
+        """
+        if self._fingerprint is None:
+            assert self.df is not None
+            columns = [
+                key
+                for key in ["path", "date_start", "date_end", "size", "mtime", "inode"]
+                if key in self.df.columns
+            ]
+            hashes = pd.util.hash_pandas_object(self.df[columns], index=False)
+            self._fingerprint = hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+        return self._fingerprint
+
+    def group_positions(self, case: str, scomp: str, stream: str) -> np.ndarray:
+        """
+        Return positions of all rows matching case, scomp, and stream.
+
+        Parameters
+        ----------
+        case, scomp, stream : str
+            Values of corresponding columns of rows.
+
+        Returns
+        -------
+        numpy.ndarray
+            Integer positions of rows, in catalog order.
+        """
+        return self._groups.get((case, scomp, stream), np.empty(0, dtype=np.int64))
+
+    def select(
+        self,
+        date_range: Tuple[Union[datetime.date, str], Union[datetime.date, str]],
+        case: str,
+        scomp: str,
+        stream: str,
+        varname: str,
+    ) -> np.ndarray:
+        """
+        Return positions of selected rows, in catalog order.
+
+        Rows are selected if they match `case`, `scomp`, and `stream`, contain
+        `varname`, and either overlap `date_range` or have equal date_start
+        and date_end.
+
+        Parameters
+        ----------
+        date_range : tuple of datetime.date or str
+            Start and end of selected dates. Rows overlap if their date_start
+            is before the end, and their date_end is after the start.
+        case, scomp, stream, varname : str
+            Values of corresponding columns of selected rows.
+
+        Returns
+        -------
+        numpy.ndarray
+            Integer positions of selected rows, for use with ``df.iloc``.
+        """
+        segment = self._segments.get((case, scomp, stream))
+        var_id = self.varname_index._varname_ids.get(varname)
+        if segment is None or var_id is None:
+            return np.empty(0, dtype=np.int64)
+        seg_start, seg_mid, seg_end = segment
+        date_lo, date_hi = date_ordinals(list(date_range)).tolist()
+
+        rows = self._varname_rows[
+            self._varname_offsets[var_id] : self._varname_offsets[var_id + 1]
+        ]
+        # rows before ind_hi start before date_hi,
+        # rows from ind_lo on have a preceding row ending after date_lo
+        ind_hi = seg_start + np.searchsorted(
+            self._date_start[seg_start:seg_mid], date_hi, side="left"
+        )
+        ind_lo = seg_start + np.searchsorted(
+            self._date_end_max[seg_start:seg_mid], date_lo, side="right"
+        )
+        bounds = np.searchsorted(rows, np.array([ind_lo, ind_hi, seg_mid, seg_end]))
+        ranged = rows[bounds[0] : bounds[1]]
+        ranged = ranged[self._date_end[ranged] > date_lo]
+        static = rows[bounds[2] : bounds[3]]
+        positions = self._order[np.concatenate([ranged, static])].astype(np.int64)
+        positions.sort()
+        return positions
+
+
+def get_catalog_index(catalog: Any) -> CatalogIndex:
+    """
+    Return index of catalog rows, building it if necessary.
+
+    The index is built once per catalog, and is rebuilt if the catalog's
+    DataFrame is replaced. Modifying the DataFrame in place is not detected.
+    If the catalog was read from a csv file, and a varname index written by
+    :py:func:`~esm_catalog_utils.write_varname_index` is next to it, then
+    the varname index is read instead of being built. Indexes of compact
+    catalogs are built from their stored columns.
+
+    Parameters
+    ----------
+    catalog : esm_datastore or CompactCatalog
+        Catalog being indexed.
+
+    Returns
+    -------
+    CatalogIndex
+    """
+    df = None if isinstance(catalog, CompactCatalog) else catalog.df
+    key = id(catalog)
+    entry = _catalog_indexes.get(key)
+    if entry is not None and entry[0]() is catalog and entry[1].df is df:
+        return entry[1]
+    if df is None:
+        catalog_index = CatalogIndex.from_compact(catalog)
+    else:
+        catalog_index = CatalogIndex(df, _read_adjacent_varname_index(catalog, df))
+    catalog_ref = weakref.ref(catalog, lambda _: _catalog_indexes.pop(key, None))
+    _catalog_indexes[key] = (catalog_ref, catalog_index)
+    return catalog_index
+
+
+def catalog_rows(catalog: Any, positions: np.ndarray) -> pd.DataFrame:
+    """
+    Return rows of catalog at positions, e.g., positions selected by its index.
+
+    Parameters
+    ----------
+    catalog : esm_datastore or CompactCatalog
+        Catalog that rows are from.
+    positions : numpy.ndarray
+        Integer positions of rows.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of catalog, in the standard form.
+    """
+    if isinstance(catalog, CompactCatalog):
+        return catalog.take(positions)
+    return catalog.df.iloc[positions]
+
+
+def write_varname_index(
+    catalog: Any, name: str, directory: Optional[Union[str, PathLike]] = None
+) -> str:
+    """
+    Write inverted varname index of catalog next to the serialized catalog.
+
+    The index is written to ``{directory}/{name}.varname_index.npz``, where
+    `name` and `directory` are the arguments passed to the catalog's
+    ``serialize`` method. When the catalog is read from the serialized files,
+    e.g., with :py:func:`intake.open_esm_datastore`, the index is read on
+    the first call to ``catalog_sel_to_df`` or ``catalog_sel_to_ds``,
+    instead of being built from the catalog's varname column.
+
+    Parameters
+    ----------
+    catalog : esm_datastore
+        Catalog whose varname index is written.
+    name : str
+        Name of serialized catalog.
+    directory : str or path-like, optional
+        Directory of serialized catalog. Default is the current directory.
+
+    Returns
+    -------
+    str
+        Path of written index.
+    """
+    if directory is None:
+        directory = os.getcwd()
+    path = os.path.join(directory, f"{name}{_VARNAME_INDEX_SUFFIX}")
+    get_catalog_index(catalog).varname_index.write(path, catalog.df)
+    return path
+
+
+def varname_index_path(catalog_file: str) -> str:
+    """
+    Return path of varname index that is next to a catalog csv file.
+
+    Parameters
+    ----------
+    catalog_file : str
+        Path, or local URL, of catalog csv file.
+
+    Returns
+    -------
+    str
+    """
+    if catalog_file.startswith("file://"):
+        catalog_file = catalog_file[len("file://") :]
+    root, ext = os.path.splitext(catalog_file)
+    if ext in _COMPRESSION_EXTENSIONS:
+        root, ext = os.path.splitext(root)
+    return f"{root}{_VARNAME_INDEX_SUFFIX}"
+
+
+def _read_adjacent_varname_index(
+    catalog: Any, df: pd.DataFrame
+) -> Optional[VarnameIndex]:
+    """
+    Return varname index next to the catalog's csv file, if there is one.
+
+    None if the catalog was not read from a csv file, if there is no index
+    next to it, or if the index does not match the catalog, in which case the
+    index is rebuilt from the catalog.
+    """
+    esmcat = getattr(catalog, "esmcat", None)
+    if esmcat is not None:
+        catalog_file = getattr(esmcat, "catalog_file", None)
+    else:
+        catalog_file = getattr(catalog, "esmcol_data", {}).get("catalog_file")
+    if not catalog_file:
+        return None
+    path = varname_index_path(str(catalog_file))
+    if not os.path.exists(path):
+        return None
+    try:
+        return VarnameIndex.read(path, df)
+    except ValueError:
+        return None
+
+
+def _varname_list(entry: Any) -> List[str]:
+    """Return list of varnames in a varname entry of a catalog."""
+    if isinstance(entry, str):
+        return [entry]
+    if isinstance(entry, (list, tuple, np.ndarray)):
+        return list(entry)
+    return []
+
+
+def _catalog_hash(df: pd.DataFrame) -> str:
+    """
+    Return hash of paths, varnames, and sizes of catalog, to match indexes to
+    catalogs.
+
+    Varname entries are hashed as lists, so that entries read from csv files,
+    which are tuples, hash equal to the generated lists.
+    """
+    sha256 = hashlib.sha256("\0".join(df["path"]).encode())
+    for entry in df["varname"]:
+        sha256.update(("\1" + "\0".join(_varname_list(entry))).encode())
+    if "size" in df.columns:
+        sizes = pd.to_numeric(df["size"]).to_numpy(dtype=np.float64)
+        sha256.update(sizes.tobytes())
+    return sha256.hexdigest()
+
+
+def _row_dtype(n_rows: int) -> type:
+    """Return integer dtype for positions of rows of a catalog with n_rows."""
+    return np.int32 if n_rows < np.iinfo(np.int32).max else np.int64
+
+
+def _to_ordinals(dates: pd.Series) -> np.ndarray:
+    """Return ordinals of dates, with _MISSING for missing dates."""
+    return date_ordinals(dates.to_numpy(dtype=object))
+
+
+def _compact_ordinals(catalog: CompactCatalog, column: str) -> np.ndarray:
+    """Return ordinals of dates of compact catalog, using stored ordinals."""
+    try:
+        return catalog.date_ordinals(column)
+    except ValueError:
+        return _to_ordinals(catalog.column(column))
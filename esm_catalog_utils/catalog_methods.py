@@ -1,59 +1,180 @@
+import numpy as np
 import xarray as xr
 
+from .catalog_index import catalog_rows, get_catalog_index
+from .dataset_cache import file_stats, selection_key
 from .postprocess import open_mfdataset_kwargs, postprocess
+from .references import catalog_references_path, open_references
+
+# attribute that encodings of each file are stored in while opening files
+_ENCODINGS_ATTR = "_esm_catalog_utils_encodings"
 
 
 def catalog_sel_to_df(catalog, date_range, case, scomp, stream, varname):
-    """create dataframe from catalog specific to other args"""
-    df = catalog.df
-    # The date_start==date_end conditional in the following conditional is to
-    # ensure that MOM6's static stream always gets propagated if present.
+    """
+    create dataframe from catalog specific to other args
+    varname can be a list of varnames, selecting rows containing any of them
+    catalog can be an esm_datastore or a CompactCatalog
+    """
+    # Rows whose date_start==date_end are selected independent of date_range,
+    # to ensure that MOM6's static stream always gets propagated if present.
     # This is needed for grid metrics.
     # There might be other ways to accomplish this.
-    date_mask = (
-        (df["date_start"] < date_range[1]) & (df["date_end"] > date_range[0])
-    ) | (df["date_start"] == df["date_end"])
-    df = df[date_mask]
-    df = df[df["case"] == case]
-    df = df[df["scomp"] == scomp]
-    df = df[df["stream"] == stream]
-    inds = [ind for ind, varnames in enumerate(df["varname"]) if varname in varnames]
-    if len(inds) == 0:
+    # Rows are selected with an index of the catalog, which is built on the
+    # first call for each catalog, so that repeated calls are fast.
+    catalog_index = get_catalog_index(catalog)
+    if isinstance(varname, str):
+        positions = catalog_index.select(date_range, case, scomp, stream, varname)
+    else:
+        positions = np.unique(
+            np.concatenate(
+                [np.empty(0, dtype=np.int64)]
+                + [
+                    catalog_index.select(date_range, case, scomp, stream, name)
+                    for name in varname
+                ]
+            )
+        )
+    if len(positions) == 0:
         return None
-    return df.iloc[inds]
+    return catalog_rows(catalog, positions)
 
 
-def catalog_sel_to_ds(catalog, date_range, case, scomp, stream, varname):
-    """create Dataset from catalog specific to other args"""
+def catalog_sel_to_ds(
+    catalog,
+    date_range,
+    case,
+    scomp,
+    stream,
+    varname,
+    dataset_cache=None,
+    references=None,
+):
+    """
+    create Dataset from catalog specific to other args
+    varname can be a list of varnames, in which case the union of files
+    containing them is opened once, and the Dataset contains all of them
+    if dataset_cache, a DatasetCache, is provided, Datasets are reused from it
+    if references, a directory written to by write_references, is provided,
+    the Dataset is opened from the references of the files, if they exist
+    """
+    if dataset_cache is not None:
+        key = selection_key(catalog, date_range, case, scomp, stream, varname)
+        ds = dataset_cache.get(key)
+        if ds is not None:
+            return ds
     df = catalog_sel_to_df(catalog, date_range, case, scomp, stream, varname)
     if df is None:
         return None
+    paths = df["path"].to_list()
+    if dataset_cache is not None:
+        stats = file_stats(paths)
+    ds = None
+    if references is not None:
+        ds = _references_to_ds(catalog, df, case, scomp, references)
+    if ds is None:
+        ds = _df_to_ds(catalog, df, case, scomp)
+    if dataset_cache is not None:
+        dataset_cache.put(key, paths, ds, stats)
+    return ds
+
+
+def catalog_sel_to_ds_dict(
+    catalog,
+    date_range,
+    case,
+    scomp,
+    stream,
+    varnames,
+    dataset_cache=None,
+    references=None,
+):
+    """
+    create dict of Datasets, keyed by varname, from catalog specific to other args
+    files are opened once for all varnames, see catalog_sel_to_ds
+    each Dataset excludes the other requested varnames
+    varnames not found in the catalog are mapped to None
+    """
+    ds = catalog_sel_to_ds(
+        catalog, date_range, case, scomp, stream, varnames, dataset_cache, references
+    )
+    ds_dict = {}
+    for varname in varnames:
+        if ds is None or varname not in ds.data_vars:
+            ds_dict[varname] = None
+            continue
+        others = [name for name in varnames if name != varname and name in ds]
+        ds_dict[varname] = ds.drop_vars(others)
+    return ds_dict
+
+
+def _df_to_ds(catalog, df, case, scomp):
+    """create Dataset from files in rows of df"""
     print(f"generating ds, len(df)={len(df)}")
     paths = df["path"].to_list()
     kwargs = {
         "compat": "override",
         "data_vars": "minimal",
         "coords": "minimal",
+        "combine_attrs": "override",
         "parallel": True,
+        "preprocess": _store_encodings,
     }
     kwargs.update(open_mfdataset_kwargs(scomp))
     print("calling open_mfdataset")
     ds = xr.open_mfdataset(paths, **kwargs)
+
+    # copy metadata not propagated by open_mfdataset from 1st file
+    # attrs are propagated from the 1st file, so its encodings were stored there
+    encodings = ds.attrs.pop(_ENCODINGS_ATTR)
+    for key in ["unlimited_dims"]:
+        if key in encodings["ds"]:
+            ds.encoding[key] = encodings["ds"][key]
+    # with multiple varnames, the 1st file might not contain all of them
+    for var, encoding in encodings["vars"].items():
+        if var in ds.variables:
+            ds[var].encoding = encoding
+
     print("calling postprocess")
     ds = postprocess(ds, scomp, catalog=catalog, case=case)
 
-    if True:
-        print("copying metadata from first file")
-        # copy metadata not propagated by open_mfdataset from 1st file
-        kwargs = open_mfdataset_kwargs(scomp)
-        ds0 = xr.open_dataset(paths[0], **kwargs)
-        ds0 = postprocess(ds0, scomp, catalog=catalog, case=case)
-        ds.attrs = ds0.attrs
-        for key in ["unlimited_dims"]:
-            if key in ds0.encoding:
-                ds.encoding[key] = ds0.encoding[key]
-        ds["time"].encoding = ds0["time"].encoding
-        for var in ds.data_vars:
-            ds[var].encoding = ds0[var].encoding
+    return ds
+
 
+def _references_to_ds(catalog, df, case, scomp, references):
+    """
+    create Dataset from references of files in rows of df
+    return None if the rows are not in one group with up to date references
+    """
+    path = catalog_references_path(catalog, references, df)
+    if path is None:
+        return None
+    print(f"opening references, len(df)={len(df)}")
+    drop_variables = open_mfdataset_kwargs(scomp).get("drop_variables")
+    try:
+        ds = open_references(path, df["path"].to_list(), drop_variables)
+    except ValueError as exc:
+        print(f"not using references: {exc}")
+        return None
+
+    print("calling postprocess")
+    ds = postprocess(ds, scomp, catalog=catalog, case=case)
+
+    return ds
+
+
+def _store_encodings(ds):
+    """
+    preprocess function for open_mfdataset, storing encodings of ds in its attrs
+    this avoids reopening the 1st file to get encodings after open_mfdataset
+    """
+    # only encodings of data_vars and time are propagated, as they were when the
+    # 1st file was reopened, so coordinates keep encodings from open_mfdataset
+    varnames = list(ds.data_vars)
+    if "time" in ds.variables:
+        varnames.append("time")
+    ds.attrs[_ENCODINGS_ATTR] = {
+        "ds": dict(ds.encoding),
+        "vars": {var: dict(ds[var].encoding) for var in varnames},
+    }
     return ds
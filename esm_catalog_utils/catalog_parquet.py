@@ -0,0 +1,207 @@
+"""Parquet serialization of catalogs, with typed columns."""
+
+import json
+import os
+from os import PathLike
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from intake_esm.core import esm_datastore
+
+from ._column_values import is_date_column, is_missing
+from ._optional_imports import import_optional
+from .catalog_gen import _get_esmcat_spec, _to_esm_datastore
+
+# key of schema metadata with the esmcat spec, and how columns are stored
+_METADATA_KEY = b"esm_catalog_utils"
+
+_PARQUET_SUFFIX = ".parquet"
+
+
+def write_catalog_parquet(
+    catalog: esm_datastore, name: str, directory: Optional[Union[str, PathLike]] = None
+) -> str:
+    """
+    Write catalog to a Parquet file.
+
+    The catalog's esmcat spec is stored in the file's metadata, so the file
+    is all that is needed to read the catalog with
+    :py:func:`read_catalog_parquet`. Columns are stored with types that do
+    not need to be parsed when the catalog is read. Entries of the catalog's
+    variable column are stored as lists of strings if any entry is a list,
+    in which case string entries are stored as lists of length one.
+    Otherwise, they are stored as strings. Columns of dates are stored as
+    dates, and categorical columns and columns of the catalog's
+    ``groupby_attrs`` are dictionary encoded.
+
+    Requires pyarrow, which is installed with the ``parquet`` extra, i.e.,
+    ``pip install esm_catalog_utils[parquet]``.
+
+    Parameters
+    ----------
+    catalog : esm_datastore
+        Catalog being written.
+    name : str
+        Name of catalog. The catalog is written to
+        ``{directory}/{name}.parquet``.
+    directory : str or path-like, optional
+        Directory that catalog is written to. Default is the current
+        directory.
+
+    Returns
+    -------
+    str
+        Path of written file.
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed.
+    """
+    pa = import_optional("pyarrow", "parquet")
+    pq = import_optional("pyarrow.parquet", "parquet")
+
+    esmcat_spec = _get_esmcat_spec(catalog)
+    aggregation_control = esmcat_spec.get("aggregation_control") or {}
+    variable_column = aggregation_control.get("variable_column_name")
+    groupby_attrs = aggregation_control.get("groupby_attrs") or []
+
+    arrays = {}
+    columns: Dict[str, Dict[str, str]] = {}
+    for column, series in catalog.df.items():
+        if column == variable_column and any(
+            isinstance(value, (list, tuple, np.ndarray)) for value in series
+        ):
+            kind = "list"
+            array = pa.array(
+                [_as_list(value) for value in series], type=pa.list_(pa.string())
+            )
+        elif series.dtype == object and is_date_column(series):
+            kind = "date"
+            array = pa.array(
+                [None if is_missing(value) else value for value in series],
+                type=pa.date32(),
+            )
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # categories are stored in order, so that the dtype is unchanged
+            kind = "category"
+            codes = series.cat.codes.to_numpy(dtype=np.int32)
+            array = pa.DictionaryArray.from_arrays(
+                pa.array(codes, mask=codes == -1),
+                pa.array(series.cat.categories, type=pa.string()),
+            )
+        elif column in groupby_attrs and not pd.api.types.is_numeric_dtype(series):
+            kind = "category"
+            array = pa.Array.from_pandas(series, type=pa.string()).dictionary_encode()
+        else:
+            kind = "default"
+            array = pa.Array.from_pandas(series)
+        arrays[column] = array
+        columns[column] = {"kind": kind, "dtype": str(series.dtype)}
+
+    metadata = {"esmcat": esmcat_spec, "columns": columns}
+    table = pa.table(arrays).replace_schema_metadata(
+        {_METADATA_KEY: json.dumps(metadata, default=str)}
+    )
+    if directory is None:
+        directory = os.getcwd()
+    path = os.path.join(directory, f"{name}{_PARQUET_SUFFIX}")
+    pq.write_table(table, path)
+    return path
+
+
+def read_catalog_parquet(
+    path: Union[str, PathLike], columns: Optional[Sequence[str]] = None
+) -> esm_datastore:
+    """
+    Read catalog written by :py:func:`write_catalog_parquet`.
+
+    Requires pyarrow, which is installed with the ``parquet`` extra, i.e.,
+    ``pip install esm_catalog_utils[parquet]``.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of Parquet file.
+    columns : sequence of str, optional
+        Columns to read. The catalog's path column, variable column, and
+        columns of its ``groupby_attrs`` are always read, because they are
+        needed by the catalog. By default, all columns are read.
+
+    Returns
+    -------
+    esm_datastore
+
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed.
+    """
+    pq = import_optional("pyarrow.parquet", "parquet")
+
+    metadata = json.loads(pq.read_schema(path).metadata[_METADATA_KEY])
+    esmcat_spec = metadata["esmcat"]
+    if columns is not None:
+        required = _required_columns(esmcat_spec)
+        columns = [
+            column
+            for column in metadata["columns"]
+            if column in columns or column in required
+        ]
+    table = pq.read_table(path, columns=columns)
+
+    df = pd.DataFrame(
+        {
+            column: _to_series(table.column(column), metadata["columns"][column])
+            for column in table.column_names
+        }
+    )
+    return _to_esm_datastore(df, esmcat_spec)
+
+
+def _to_series(column: Any, column_metadata: Dict[str, str]) -> pd.Series:
+    """Convert column of pyarrow Table to pandas Series of its original dtype."""
+    kind, dtype = column_metadata["kind"], column_metadata["dtype"]
+    array = column.combine_chunks()
+    if kind == "list":
+        offsets = array.offsets.to_numpy().tolist()
+        values = array.values.to_numpy(zero_copy_only=False).tolist()
+        is_null = array.is_null().to_numpy(zero_copy_only=False)
+        return pd.Series(
+            [
+                None if null else values[start:stop]
+                for start, stop, null in zip(offsets[:-1], offsets[1:], is_null)
+            ],
+            dtype=object,
+        )
+    if kind == "date":
+        return pd.Series(array.to_pandas(date_as_object=True), dtype=object)
+    if kind == "category" and dtype != "category":
+        array = array.dictionary_decode()
+    series = array.to_pandas()
+    if dtype == "object":
+        series = series.astype(object)
+        return series.where(series.notna(), None)
+    if str(series.dtype) != dtype:
+        series = series.astype(dtype)
+    return series
+
+
+def _required_columns(esmcat_spec: Dict[str, Any]) -> List[str]:
+    """Return columns needed by catalog of esmcat_spec."""
+    aggregation_control = esmcat_spec.get("aggregation_control") or {}
+    required = [esmcat_spec["assets"]["column_name"]]
+    if aggregation_control.get("variable_column_name"):
+        required.append(aggregation_control["variable_column_name"])
+    required.extend(aggregation_control.get("groupby_attrs") or [])
+    return required
+
+
+def _as_list(value: Any) -> Optional[List[str]]:
+    """Return entry of variable column as a list."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    if isinstance(value, str):
+        return [value]
+    return None
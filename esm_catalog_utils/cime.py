@@ -1,11 +1,33 @@
 """Utilities to access CIME functionality."""
 
+import os
+import re
 import subprocess
+import xml.etree.ElementTree as ET
 from os import PathLike
-from typing import Union
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
+# references to environment variables, shell commands, and other variables,
+# in values of CIME XML variables
+_ENV_REFERENCE_RE = re.compile(r"\$ENV\{(\w+)\}")
+_SHELL_REFERENCE_RE = re.compile(r"\$SHELL\{")
+_REFERENCE_RE = re.compile(r"\$\{?(\w+)\}?")
 
-def cime_xmlquery(caseroot: Union[str, PathLike], varname: str) -> str:
+
+class _CaseXml(NamedTuple):
+    """Values of variables in a caseroot's env_*.xml files."""
+
+    file_stats: Tuple[Tuple[str, int, int], ...]
+    values: Dict[str, str]
+
+
+# variables of caseroots, keyed by real path of caseroot
+_case_xml_cache: Dict[str, _CaseXml] = {}
+
+
+def cime_xmlquery(
+    caseroot: Union[str, PathLike], varname: str, native: bool = True
+) -> str:
     """
     Query a CIME XML variable for its value.
 
@@ -15,20 +37,136 @@ def cime_xmlquery(caseroot: Union[str, PathLike], varname: str) -> str:
         Caseroot directory of case being queried.
     varname : str
         Name of variable being queried.
+    native : bool, optional
+        If True, the value is determined with :py:func:`case_xml_value`,
+        which reads the caseroot's env_*.xml files directly. If that does not
+        determine the value, e.g., because the variable is not found, or its
+        value depends on a shell command, then the value is queried with
+        ``./xmlquery`` in `caseroot`, as it is if `native` is False. Default
+        is True.
 
     Returns
     -------
     str
         Value corresponding to `varname`.
     """
+    if native:
+        value = case_xml_value(caseroot, varname)
+        if value is not None:
+            return value
     try:
-        value = subprocess.check_output(
+        value_bytes = subprocess.check_output(
             ["./xmlquery", "-N", "--value", varname],
             stderr=subprocess.STDOUT,
             cwd=caseroot,
         )
     except subprocess.CalledProcessError:
-        value = subprocess.check_output(
+        value_bytes = subprocess.check_output(
             ["./xmlquery", "--value", varname], stderr=subprocess.STDOUT, cwd=caseroot
         )
-    return value.decode()
+    return value_bytes.decode()
+
+
+def case_xml_value(caseroot: Union[str, PathLike], varname: str) -> Optional[str]:
+    """
+    Return the resolved value of a CIME XML variable, from the caseroot's
+    env_*.xml files.
+
+    The files are parsed once, and their variables are cached until one of
+    the files changes. References in values to other variables, e.g.,
+    ``$CASE`` or ``${CIME_OUTPUT_ROOT}``, and to environment variables, e.g.,
+    ``$ENV{HOME}``, are resolved. References to variables that are not
+    defined are left unchanged, as they are by CIME.
+
+    Parameters
+    ----------
+    caseroot : str or path-like
+        Caseroot directory of case being queried.
+    varname : str
+        Name of variable being queried.
+
+    Returns
+    -------
+    str or None
+        Value corresponding to `varname`. None if the value cannot be
+        determined from the files, e.g., because the variable is not found,
+        its value depends on a shell command or an undefined environment
+        variable, or it has a value per component.
+    """
+    values = _case_xml_values(caseroot)
+    if values is None:
+        return None
+    return _resolve(varname, values, set())
+
+
+def _case_xml_values(caseroot: Union[str, PathLike]) -> Optional[Dict[str, str]]:
+    """Return unresolved values of variables in env_*.xml files of caseroot."""
+    key = os.path.realpath(caseroot)
+    try:
+        paths = [
+            os.path.join(key, name)
+            for name in sorted(os.listdir(key))
+            if name.startswith("env_") and name.endswith(".xml")
+        ]
+        file_stats = tuple(
+            (path, stat_result.st_size, stat_result.st_mtime_ns)
+            for path, stat_result in zip(paths, map(os.stat, paths))
+        )
+    except OSError:
+        return None
+    if not paths:
+        return None
+    cached = _case_xml_cache.get(key)
+    if cached is not None and cached.file_stats == file_stats:
+        return cached.values
+
+    values: Dict[str, str] = {}
+    for path in paths:
+        try:
+            root = ET.parse(path).getroot()
+        except (ET.ParseError, OSError):
+            return None
+        for entry in root.iter("entry"):
+            varname = entry.get("id")
+            value = entry.get("value")
+            if varname is not None and value is not None:
+                values.setdefault(varname, value)
+    _case_xml_cache[key] = _CaseXml(file_stats, values)
+    return values
+
+
+def _resolve(
+    varname: str, values: Dict[str, str], resolving: Set[str]
+) -> Optional[str]:
+    """
+    Return value of varname, with references resolved.
+
+    None is returned if the value cannot be resolved. `resolving` contains
+    variables whose values are being resolved, to detect circular references.
+    """
+    if varname not in values or varname in resolving:
+        return None
+    value = values[varname]
+    if _SHELL_REFERENCE_RE.search(value):
+        return None
+
+    for match in _ENV_REFERENCE_RE.finditer(value):
+        env_value = os.environ.get(match.group(1))
+        if env_value is None:
+            return None
+        value = value.replace(match.group(), env_value)
+
+    resolved_parts: List[str] = []
+    pos = 0
+    for match in _REFERENCE_RE.finditer(value):
+        ref_varname = match.group(1)
+        if ref_varname in values:
+            ref_value = _resolve(ref_varname, values, resolving | {varname})
+            if ref_value is None:
+                return None
+        else:
+            ref_value = match.group()
+        resolved_parts.extend([value[pos : match.start()], ref_value])
+        pos = match.end()
+    resolved_parts.append(value[pos:])
+    return "".join(resolved_parts)
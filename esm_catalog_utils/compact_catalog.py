@@ -0,0 +1,517 @@
+"""Memory-compact representation of catalogs."""
+
+import datetime
+import hashlib
+import itertools
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from intake_esm.core import esm_datastore
+
+from ._column_values import is_date_column, is_missing
+from .catalog_gen import (
+    DATE_ORDINAL_MISSING,
+    _get_esmcat_spec,
+    _to_esm_datastore,
+    case_metadata_to_esm_datastore,
+    date_ordinals,
+)
+
+# kinds of entries of variable columns
+_VARIABLE_LIST = 0
+_VARIABLE_STR = 1
+_VARIABLE_MISSING = 2
+
+
+class _StringColumn(NamedTuple):
+    """Strings stored as concatenated UTF-8 bytes, with offsets of each string."""
+
+    data: np.ndarray
+    offsets: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.offsets.nbytes
+
+
+class _PathColumn(NamedTuple):
+    """Paths stored as directory codes, and basenames."""
+
+    directories: pd.Categorical
+    basenames: _StringColumn
+
+    @property
+    def nbytes(self) -> int:
+        return _categorical_nbytes(self.directories) + self.basenames.nbytes
+
+
+class _VariableColumn(NamedTuple):
+    """Entries of variable column, stored as codes into a table of names."""
+
+    names: np.ndarray
+    codes: np.ndarray
+    offsets: np.ndarray
+    kinds: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        names_nbytes = sum(len(name.encode()) for name in self.names)
+        return (
+            names_nbytes + self.codes.nbytes + self.offsets.nbytes + self.kinds.nbytes
+        )
+
+
+class CompactCatalog:
+    """
+    Memory-compact representation of a catalog.
+
+    Instances are created with :py:func:`compact_catalog`, or generated with
+    :py:func:`case_metadata_to_compact_catalog`. Columns are stored in the
+    following forms:
+
+    - The path column is stored as codes into a table of unique directories,
+      and the UTF-8 bytes of the basenames.
+    - Entries of the variable column are stored as codes into a table of
+      unique variable names, with offsets of each entry's codes.
+    - Columns of dates are stored as integer ordinal days, as returned by
+      :py:func:`~esm_catalog_utils.date_ordinals`.
+    - Other columns of strings are stored as ``pandas.Categorical``.
+    - Remaining columns, e.g., numeric columns, are stored unchanged.
+
+    Compact catalogs can be passed to ``catalog_methods.catalog_sel_to_df``
+    and ``catalog_methods.catalog_sel_to_ds`` in place of an esm_datastore.
+    Their index is built from the stored codes and ordinals, and only the
+    selected rows are expanded to the standard form.
+
+    Attributes
+    ----------
+    esmcat_spec : dict
+        esmcat spec of catalog.
+    """
+
+    def __init__(
+        self,
+        esmcat_spec: Dict[str, Any],
+        columns: Dict[str, Any],
+        dtypes: Dict[str, str],
+        n_rows: int,
+    ):
+        self.esmcat_spec = esmcat_spec
+        self._columns = columns
+        self._dtypes = dtypes
+        self._len = n_rows
+        self._fingerprint: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactCatalog with {self._len} rows, {len(self._columns)} columns,"
+            f" {self.memory_usage()} bytes"
+        )
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of columns."""
+        return list(self._columns)
+
+    def memory_usage(self) -> int:
+        """
+        Return number of bytes used by columns.
+
+        Returns
+        -------
+        int
+            Size of arrays storing columns, including the UTF-8 encoded size
+            of tables of unique strings.
+        """
+        nbytes = 0
+        for column in self._columns.values():
+            if isinstance(column, pd.Categorical):
+                nbytes += _categorical_nbytes(column)
+            elif isinstance(column, (_PathColumn, _VariableColumn)):
+                nbytes += column.nbytes
+            else:
+                nbytes += int(pd.Series(column).memory_usage(index=False, deep=True))
+        return nbytes
+
+    def date_ordinals(self, column: str) -> np.ndarray:
+        """
+        Return integer ordinal days of a column of dates.
+
+        Parameters
+        ----------
+        column : str
+            Name of column of dates.
+
+        Returns
+        -------
+        numpy.ndarray
+            Ordinals of dates, with ``DATE_ORDINAL_MISSING`` for missing
+            dates.
+        """
+        if self._dtypes[column] != "date":
+            raise ValueError(f"{column} is not a column of dates")
+        return self._columns[column]
+
+    def variable_codes(self, column: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return codes of the entries of the variable column.
+
+        Parameters
+        ----------
+        column : str
+            Name of variable column.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Table of unique variable names, codes into the table, and offsets,
+            such that the codes of the entry in row ``ind`` are
+            ``codes[offsets[ind]:offsets[ind+1]]``. Missing entries have no
+            codes.
+        """
+        if not self._dtypes[column].startswith("variable:"):
+            raise ValueError(f"{column} is not a variable column")
+        variables = self._columns[column]
+        return variables.names, variables.codes, variables.offsets
+
+    def categorical(self, column: str) -> pd.Categorical:
+        """
+        Return values of a column as a ``pandas.Categorical``.
+
+        Columns that are stored as categoricals are returned without being
+        expanded, so they can be grouped by their codes.
+
+        Parameters
+        ----------
+        column : str
+            Name of column.
+
+        Returns
+        -------
+        pandas.Categorical
+        """
+        if isinstance(self._columns[column], pd.Categorical):
+            return self._columns[column]
+        return pd.Categorical(self.column(column))
+
+    def column(self, column: str) -> pd.Series:
+        """
+        Return values of a column, in the standard form.
+
+        Parameters
+        ----------
+        column : str
+            Name of column.
+
+        Returns
+        -------
+        pandas.Series
+        """
+        return pd.Series(
+            _expand_column(self._columns[column], self._dtypes[column]), name=column
+        )
+
+    def take(self, positions: np.ndarray) -> pd.DataFrame:
+        """
+        Return DataFrame of rows of catalog, in the standard form.
+
+        Only the requested rows are expanded, so this is cheaper than
+        ``to_df().iloc[positions]``.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            Integer positions of rows.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Rows of catalog, indexed by their positions.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        df = pd.DataFrame(
+            {
+                name: _expand_column(
+                    _take_column(column, positions), self._dtypes[name]
+                )
+                for name, column in self._columns.items()
+            },
+            columns=list(self._columns),
+        )
+        df.index = pd.Index(positions)
+        return df
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of the catalog's contents.
+
+        The hash is of the stored arrays of the columns "path", "date_start",
+        and "date_end", and of columns derived from ``os.stat``, e.g.,
+        "size", if present. It is computed when first accessed.
+        """
+        if self._fingerprint is None:
+            sha256 = hashlib.sha256()
+            for name in ["path", "date_start", "date_end", "size", "mtime", "inode"]:
+                if name in self._columns:
+                    sha256.update(name.encode())
+                    for array in _column_arrays(self._columns[name]):
+                        sha256.update(pd.util.hash_array(array).tobytes())
+            self._fingerprint = sha256.hexdigest()
+        return self._fingerprint
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Return DataFrame of catalog, in the standard form.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame equal to the DataFrame that the compact catalog was
+            created from.
+        """
+        return pd.DataFrame(
+            {
+                name: _expand_column(column, self._dtypes[name])
+                for name, column in self._columns.items()
+            },
+            columns=list(self._columns),
+        )
+
+    def to_esm_datastore(self) -> esm_datastore:
+        """
+        Return catalog as an esm_datastore.
+
+        Returns
+        -------
+        esm_datastore
+        """
+        return _to_esm_datastore(self.to_df(), self.esmcat_spec)
+
+
+def case_metadata_to_compact_catalog(
+    case_metadata: Dict[str, Any], **kwargs: Any
+) -> CompactCatalog:
+    """
+    Generate memory-compact catalog for files of a case.
+
+    This is the compact mode of
+    :py:func:`~esm_catalog_utils.case_metadata_to_esm_datastore`. The catalog
+    is generated in the standard form, converted with
+    :py:func:`compact_catalog`, and the standard form is released, so the
+    compact form is what is held while the catalog is used.
+
+    Parameters
+    ----------
+    case_metadata : dict
+        Metadata of case, see ``case_metadata_to_esm_datastore``.
+    **kwargs
+        Passed to ``case_metadata_to_esm_datastore``.
+
+    Returns
+    -------
+    CompactCatalog
+    """
+    return compact_catalog(case_metadata_to_esm_datastore(case_metadata, **kwargs))
+
+
+def compact_catalog(catalog: esm_datastore) -> CompactCatalog:
+    """
+    Return memory-compact representation of a catalog.
+
+    Parameters
+    ----------
+    catalog : esm_datastore
+        Catalog being represented.
+
+    Returns
+    -------
+    CompactCatalog
+        Compact representation of `catalog`. Its ``to_esm_datastore`` method
+        returns an esm_datastore equal to `catalog`.
+    """
+    esmcat_spec = _get_esmcat_spec(catalog)
+    aggregation_control = esmcat_spec.get("aggregation_control") or {}
+    path_column = esmcat_spec["assets"]["column_name"]
+    variable_column = aggregation_control.get("variable_column_name")
+
+    columns: Dict[str, Any] = {}
+    dtypes: Dict[str, str] = {}
+    for name, series in catalog.df.items():
+        dtypes[name] = str(series.dtype)
+        values = series.to_numpy(dtype=object)
+        if name == path_column and all(isinstance(value, str) for value in values):
+            columns[name] = _compact_paths(values)
+            dtypes[name] = f"path:{series.dtype}"
+        elif name == variable_column:
+            columns[name] = _compact_variables(values)
+            dtypes[name] = f"variable:{series.dtype}"
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            columns[name] = series.array
+        elif series.dtype == object and is_date_column(series):
+            columns[name] = date_ordinals(values)
+            dtypes[name] = "date"
+        elif pd.api.types.is_numeric_dtype(series) or not _is_categorizable(values):
+            columns[name] = series.to_numpy()
+        else:
+            columns[name] = pd.Categorical(values)
+    return CompactCatalog(esmcat_spec, columns, dtypes, len(catalog.df))
+
+
+def _compact_paths(paths: np.ndarray) -> _PathColumn:
+    """Return paths stored as directory codes and basenames."""
+    directories = []
+    basenames = []
+    for path in paths:
+        directory, sep, basename = path.rpartition(os.sep)
+        directories.append(directory + sep)
+        basenames.append(basename)
+    return _PathColumn(pd.Categorical(directories), _compact_strings(basenames))
+
+
+def _compact_strings(values: List[str]) -> _StringColumn:
+    """Return strings stored as concatenated UTF-8 bytes."""
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return _StringColumn(data, offsets)
+
+
+def _compact_variables(values: np.ndarray) -> _VariableColumn:
+    """Return entries of variable column stored as codes into a table of names."""
+    kinds = np.full(len(values), _VARIABLE_LIST, dtype=np.int8)
+    entries: List[Any] = []
+    for ind, value in enumerate(values):
+        if isinstance(value, str):
+            kinds[ind] = _VARIABLE_STR
+            value = [value]
+        elif is_missing(value):
+            kinds[ind] = _VARIABLE_MISSING
+            value = []
+        entries.append(value)
+    offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+    np.cumsum([len(entry) for entry in entries], out=offsets[1:])
+    flat_names = np.empty(offsets[-1], dtype=object)
+    flat_names[:] = list(itertools.chain.from_iterable(entries))
+    # factorize hashes names in a single pass, and assigns codes in order of
+    # first appearance
+    codes, names = pd.factorize(flat_names)
+    names = np.asarray(names, dtype=object)
+    return _VariableColumn(names, codes.astype(np.int32), offsets, kinds)
+
+
+def _expand_column(column: Any, dtype: str) -> Any:
+    """Return values of column in standard form."""
+    if dtype.startswith("variable:"):
+        names = column.names.tolist()
+        codes = column.codes.tolist()
+        offsets = column.offsets.tolist()
+        values: List[Any] = []
+        for start, stop, kind in zip(offsets[:-1], offsets[1:], column.kinds):
+            if kind == _VARIABLE_LIST:
+                values.append([names[code] for code in codes[start:stop]])
+            elif kind == _VARIABLE_STR:
+                values.append(names[codes[start]])
+            else:
+                values.append(None)
+        return pd.Series(values, dtype=dtype[len("variable:") :])
+    if dtype == "date":
+        return pd.Series(
+            [
+                (
+                    None
+                    if ordinal == DATE_ORDINAL_MISSING
+                    else datetime.date.fromordinal(ordinal)
+                )
+                for ordinal in column.tolist()
+            ],
+            dtype=object,
+        )
+    if dtype.startswith("path:"):
+        data = column.basenames.data.tobytes()
+        offsets = column.basenames.offsets.tolist()
+        paths = [
+            directory + data[start:stop].decode()
+            for directory, start, stop in zip(
+                np.asarray(column.directories), offsets[:-1], offsets[1:]
+            )
+        ]
+        return pd.Series(paths, dtype=dtype[len("path:") :])
+    if isinstance(column, pd.Categorical):
+        if dtype == "category":
+            return pd.Series(column)
+        categorical_values = np.asarray(column, dtype=object)
+        categorical_values[column.codes == -1] = None
+        if dtype == "object":
+            return pd.Series(categorical_values, dtype=object)
+        return pd.Series(categorical_values).astype(pd.api.types.pandas_dtype(dtype))
+    return column
+
+
+def _take_column(column: Any, positions: np.ndarray) -> Any:
+    """Return rows of a stored column, in the same stored form."""
+    if isinstance(column, _PathColumn):
+        return _PathColumn(
+            column.directories.take(positions),
+            _take_strings(column.basenames, positions),
+        )
+    if isinstance(column, _VariableColumn):
+        codes, offsets = _take_ranges(column.codes, column.offsets, positions)
+        return _VariableColumn(column.names, codes, offsets, column.kinds[positions])
+    if isinstance(column, pd.Categorical):
+        return column.take(positions)
+    return np.asarray(column)[positions]
+
+
+def _take_strings(strings: _StringColumn, positions: np.ndarray) -> _StringColumn:
+    """Return strings at positions of a string column."""
+    return _StringColumn(*_take_ranges(strings.data, strings.offsets, positions))
+
+
+def _take_ranges(
+    values: np.ndarray, offsets: np.ndarray, positions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return concatenated ranges of values at positions, and their offsets."""
+    starts = offsets[positions]
+    lengths = offsets[positions + 1] - starts
+    offsets_out = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets_out[1:])
+    inds = np.repeat(starts - offsets_out[:-1], lengths) + np.arange(offsets_out[-1])
+    return values[inds], offsets_out
+
+
+def _column_arrays(column: Any) -> List[np.ndarray]:
+    """Return arrays that a stored column consists of, for hashing."""
+    if isinstance(column, _PathColumn):
+        return [
+            np.asarray(column.directories.categories, dtype=object),
+            column.directories.codes,
+            column.basenames.data,
+            column.basenames.offsets,
+        ]
+    if isinstance(column, pd.Categorical):
+        return [np.asarray(column.categories, dtype=object), column.codes]
+    return [np.asarray(column)]
+
+
+def _is_categorizable(values: np.ndarray) -> bool:
+    """Return whether values are hashable, so they can be categories."""
+    try:
+        pd.unique(values)
+    except TypeError:
+        return False
+    return True
+
+
+def _categorical_nbytes(categorical: pd.Categorical) -> int:
+    """Return size of codes and categories, counting strings as their UTF-8 size."""
+    return categorical.codes.nbytes + sum(
+        len(category.encode()) if isinstance(category, str) else 8
+        for category in categorical.categories
+    )
@@ -0,0 +1,233 @@
+"""In-process cache of Datasets opened from catalogs."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import xarray as xr
+
+from .catalog_index import get_catalog_index
+
+
+class _Entry(NamedTuple):
+    """Cached Dataset, with the state of its files when it was opened."""
+
+    ds: xr.Dataset
+    # Dataset passed to put, which is closed when the entry is removed if
+    # close_evicted is True
+    source: xr.Dataset
+    paths: Tuple[str, ...]
+    file_stats: Tuple[Tuple[int, int], ...]
+    nbytes: int
+
+
+class DatasetCache:
+    """
+    In-process cache of lazily loaded Datasets opened from catalogs.
+
+    Entries are keyed on a selection of catalog rows, e.g., by
+    ``catalog_methods.catalog_sel_to_ds``, and on a fingerprint of the
+    catalog's contents. They are only used if the size and modification time
+    of each file in the Dataset match the values recorded when the Dataset
+    was opened. Datasets are returned as shallow copies, so modifying a
+    returned Dataset's attributes does not modify the cached Dataset.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of entries in the cache. When this is exceeded, the
+        least recently used entries are evicted.
+    max_nbytes : int, optional
+        Maximum total of the ``nbytes`` attribute of cached Datasets, i.e.,
+        the size of their data if it were loaded. When this is exceeded, the
+        least recently used entries are evicted. By default, there is no
+        limit.
+    close_evicted : bool, optional
+        If True, the Dataset passed to ``put`` is closed when its entry is
+        removed, i.e., when it is evicted, invalidated, replaced, or cleared.
+        This is for caches that own the Datasets that they store. Default is
+        False.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        max_nbytes: Optional[int] = None,
+        close_evicted: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.max_nbytes = max_nbytes
+        self.close_evicted = close_evicted
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"DatasetCache(max_entries={self.max_entries},"
+            f" max_nbytes={self.max_nbytes}, close_evicted={self.close_evicted})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Total ``nbytes`` of cached Datasets."""
+        return self._nbytes
+
+    def get(self, key: Hashable) -> Optional[xr.Dataset]:
+        """
+        Look up cached Dataset.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of Dataset, e.g., from :py:func:`selection_key`.
+
+        Returns
+        -------
+        xarray.Dataset or None
+            Copy of cached Dataset, if an up to date one is present.
+            None otherwise. Out of date entries are removed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if file_stats(entry.paths) != entry.file_stats:
+            self.invalidate(key)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry.ds.copy()
+
+    def put(
+        self,
+        key: Hashable,
+        paths: Sequence[str],
+        ds: xr.Dataset,
+        stats: Optional[Tuple[Tuple[int, int], ...]] = None,
+    ) -> None:
+        """
+        Store Dataset.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of Dataset, e.g., from :py:func:`selection_key`.
+        paths : sequence of str
+            Paths of files that `ds` was opened from.
+        ds : xarray.Dataset
+            Dataset being stored.
+        stats : tuple, optional
+            Sizes and modification times of `paths`, from before `ds` was
+            opened, as returned by :py:func:`file_stats`. By default, they
+            are determined when `ds` is stored.
+        """
+        if stats is None:
+            stats = file_stats(paths)
+        entry = _Entry(ds.copy(), ds, tuple(paths), stats, ds.nbytes)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._nbytes += entry.nbytes
+            self._evict()
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove entry, if it is present.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of entry being removed.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            for entry in self._entries.values():
+                self._close(entry)
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove entry, if it is present. The lock must be held."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+            self._close(entry)
+
+    def _close(self, entry: _Entry) -> None:
+        """Close Dataset of removed entry, if close_evicted is True."""
+        if self.close_evicted:
+            entry.source.close()
+
+    def _evict(self) -> None:
+        """Evict least recently used entries in excess of limits."""
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_nbytes is not None and self._nbytes > self.max_nbytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._nbytes -= entry.nbytes
+            self._close(entry)
+
+
+def selection_key(catalog: Any, *selection: Any) -> Tuple[Hashable, ...]:
+    """
+    Return cache key of a selection from a catalog.
+
+    Parameters
+    ----------
+    catalog : esm_datastore
+        Catalog that selection is from.
+    *selection
+        Arguments specifying selection, e.g., date_range, case, scomp,
+        stream, and varname. Lists are converted to tuples.
+
+    Returns
+    -------
+    tuple
+        Fingerprint of catalog contents, followed by `selection`.
+    """
+    fingerprint = get_catalog_index(catalog).fingerprint
+    return (fingerprint,) + tuple(_hashable(value) for value in selection)
+
+
+def file_stats(paths: Sequence[str]) -> Tuple[Tuple[int, int], ...]:
+    """
+    Return sizes and modification times of files.
+
+    Parameters
+    ----------
+    paths : sequence of str
+        Paths of files.
+
+    Returns
+    -------
+    tuple of tuple of int
+        (size, modification time in nanoseconds) of each file. Files that do
+        not exist have (-1, -1).
+    """
+    stats: List[Tuple[int, int]] = []
+    for path in paths:
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            stats.append((-1, -1))
+        else:
+            stats.append((stat_result.st_size, stat_result.st_mtime_ns))
+    return tuple(stats)
+
+
+def _hashable(value: Any) -> Hashable:
+    """Return value, with lists converted to tuples."""
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
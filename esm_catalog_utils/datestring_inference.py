@@ -0,0 +1,194 @@
+"""Functions to infer file attributes of history file streams from datestrings."""
+
+import datetime
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# pattern for datestrings of a single date, YYYY[-MM[-DD[-SSSSS]]], where the
+# separators can also be underscores
+_DATESTRING_RE = re.compile(
+    r"([0-9]{4,})(?:[-_]([0-9]{2})(?:[-_]([0-9]{2})(?:[-_]([0-9]{5}))?)?)?"
+)
+
+# days in year preceding the start of each month, in a 365 day calendar
+_DAYS_BEFORE_MONTH = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+
+
+def parse_datestring(datestring: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Convert datestring of a single date to a tuple of integers.
+
+    Parameters
+    ----------
+    datestring : str
+        Datestring portion of a filename, e.g., "0001", "0001-02",
+        "0001-02-03", or "0001-02-03-03600".
+
+    Returns
+    -------
+    tuple of int or None
+        (year, month, day, seconds) corresponding to `datestring`, with
+        missing month and day set to 1, and missing seconds set to 0.
+        None if `datestring` is not the datestring of a single date, e.g.,
+        if it is a date range.
+    """
+    match = _DATESTRING_RE.fullmatch(datestring)
+    if match is None:
+        return None
+    year, month, day, seconds = match.groups()
+    return (int(year), int(month or 1), int(day or 1), int(seconds or 0))
+
+
+def sample_indices(n_files: int, sample_size: int) -> List[int]:
+    """
+    Return indices of files in a stream that are sampled.
+
+    Parameters
+    ----------
+    n_files : int
+        Number of files in stream.
+    sample_size : int
+        Number of files to sample. The first and last files are always
+        sampled, so this is at least 2.
+
+    Returns
+    -------
+    list of int
+        Sorted, evenly spaced, indices of sampled files.
+    """
+    sample_size = max(2, min(sample_size, n_files))
+    return sorted(set(np.linspace(0, n_files - 1, sample_size).round().astype(int)))
+
+
+def infer_stream_file_attrs(
+    datestrings: Sequence[str], sampled_attrs: Dict[int, Dict[str, Any]]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Infer file attributes for all files of a history file stream.
+
+    Files in the stream are assumed to be contiguous in time, and their
+    datestrings are assumed to be either the start date or the end date of
+    each file. For the former, "date_end" of each file is inferred from the
+    datestring of the next file. For the latter, "date_start" of each file is
+    inferred from the datestring of the previous file. All other attributes
+    are assumed to be the same for every file in the stream.
+
+    These assumptions are checked against the attributes of sampled files, and
+    the spacing of datestrings is required to be approximately uniform.
+
+    Parameters
+    ----------
+    datestrings : sequence of str
+        Datestrings of files in stream, sorted in increasing order.
+    sampled_attrs : dict
+        Attributes, as returned by a file parser, of sampled files, keyed by
+        index into `datestrings`. The first and last files must be sampled.
+
+    Returns
+    -------
+    list of dict or None
+        Inferred attributes for each file in stream. None if the attributes
+        cannot be inferred, or if inferred attributes disagree with the
+        attributes of a sampled file.
+    """
+    n_files = len(datestrings)
+    if n_files < 2 or {0, n_files - 1} - sampled_attrs.keys():
+        return None
+
+    date_tuples = []
+    for datestring in datestrings:
+        date_tuple = parse_datestring(datestring)
+        if date_tuple is None:
+            return None
+        date_tuples.append(date_tuple)
+    try:
+        dates = [datetime.date(*date_tuple[:3]) for date_tuple in date_tuples]
+    except ValueError:
+        return None
+    if not _is_uniformly_spaced(datestrings, date_tuples):
+        return None
+
+    # determine if datestrings are start or end dates, using first sample
+    first_attrs = sampled_attrs[0]
+    date_start: List[Any]
+    date_end: List[Any]
+    if first_attrs.get("date_start") == dates[0]:
+        date_start = dates
+        date_end = dates[1:] + [sampled_attrs[n_files - 1].get("date_end")]
+    elif first_attrs.get("date_end") == dates[0]:
+        date_start = [first_attrs.get("date_start")] + dates[:-1]
+        date_end = dates
+    else:
+        return None
+
+    # other attributes are taken from the first sample
+    other_attrs = {
+        key: value
+        for key, value in first_attrs.items()
+        if key not in ["date_start", "date_end"]
+    }
+    inferred_attrs = [
+        {
+            **_copy_values(other_attrs),
+            "date_start": date_start[ind],
+            "date_end": date_end[ind],
+        }
+        for ind in range(n_files)
+    ]
+
+    for ind, attrs in sampled_attrs.items():
+        if inferred_attrs[ind] != attrs:
+            return None
+    return inferred_attrs
+
+
+def _is_uniformly_spaced(
+    datestrings: Sequence[str], date_tuples: Sequence[Tuple[int, int, int, int]]
+) -> bool:
+    """
+    Return True if datestrings are increasing, with approximately uniform spacing.
+
+    For datestrings without a day component, and for datestrings that are all
+    on the same day of the month and time of day, e.g., monthly files dated
+    YYYY-MM-01, spacing is measured in months and must be uniform. Otherwise,
+    spacing is measured in days, in a 365 day calendar, and is allowed to vary
+    by a tenth of the typical spacing, up to 2 days, to accommodate other
+    calendars, or by 3 days if the typical spacing is at least a month, to
+    accommodate the varying lengths of months.
+    """
+    if len({len(datestring) for datestring in datestrings}) > 1:
+        return False
+    has_day = len(re.split("[-_]", datestrings[0])) >= 3
+    # spacing of dates on the same day of each month varies with month lengths
+    if len({(day, seconds) for _, _, day, seconds in date_tuples}) == 1:
+        has_day = False
+    if has_day:
+        offsets = np.array(
+            [
+                365 * year + _DAYS_BEFORE_MONTH[month - 1] + day + seconds / 86400
+                for year, month, day, seconds in date_tuples
+            ]
+        )
+    else:
+        offsets = np.array([12 * year + month for year, month, _, _ in date_tuples])
+    spacing = np.diff(offsets)
+    if (spacing <= 0).any():
+        return False
+    typical_spacing = np.median(spacing)
+    if not has_day:
+        tol = 0.0
+    elif typical_spacing >= 28:
+        tol = 3.0
+    else:
+        tol = min(2.0, typical_spacing // 10)
+    return bool((abs(spacing - typical_spacing) <= tol).all())
+
+
+def _copy_values(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    """Return copy of attrs, with list values copied, so rows do not share lists."""
+    return {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in attrs.items()
+    }
@@ -7,6 +7,13 @@ from typing import Any, Dict, Union
 import cftime
 from netCDF4 import Dataset
 
+from .instrumentation import phase
+from .netcdf_header import open_netcdf_header
+
+# Versions of the parsers in this module, used to invalidate cached parse results.
+# Increment a parser's version whenever the values that it returns change.
+PARSER_VERSIONS = {"parse_file_cesm": "1", "parse_file_cesm_header": "1"}
+
 
 def parse_file_cesm(path: Union[str, PathLike]) -> Dict[str, Any]:
     """
@@ -35,6 +42,62 @@ def parse_file_cesm(path: Union[str, PathLike]) -> Dict[str, Any]:
     Uses netCDF4 API instead of xarray API for improved performance.
     """
 
+    with phase("netcdf_open"):
+        fptr = Dataset(path, mode="r")
+    with fptr:
+        fptr.set_auto_mask(False)
+        return _parse_cesm_dataset(path, fptr)
+
+
+def parse_file_cesm_header(path: Union[str, PathLike]) -> Dict[str, Any]:
+    """
+    Extract attributes from a CESM netCDF output file, reading only metadata.
+
+    The returned dictionary is the same as the one returned by
+    :py:func:`parse_file_cesm`. Files are opened with
+    :py:func:`~esm_catalog_utils.netcdf_header.open_netcdf_header`, so the
+    headers of classic format files are read directly, and netCDF-4 files
+    are read with h5py, if it is installed. Only the metadata and time
+    values that are needed are read, which reduces the time to parse files
+    with many variables.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file being parsed.
+
+    Returns
+    -------
+    dict
+
+    See Also
+    --------
+    parse_file_cesm
+    """
+
+    with phase("netcdf_open"):
+        fptr = open_netcdf_header(path)
+    with fptr:
+        return _parse_cesm_dataset(path, fptr)
+
+
+def _parse_cesm_dataset(path: Union[str, PathLike], fptr: Any) -> Dict[str, Any]:
+    """
+    Extract attributes from an open CESM netCDF output file.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file being parsed, used in error messages.
+    fptr : netCDF4.Dataset or object with the same API
+        Open file being parsed. Values of variables must not be masked.
+
+    Returns
+    -------
+    dict
+        See :py:func:`parse_file_cesm`.
+    """
+
     # TODO: figure out how/if to handle ww3 files, that have no time variable
 
     attr_dict: Dict[str, Any] = {}
@@ -42,57 +105,55 @@ def parse_file_cesm(path: Union[str, PathLike]) -> Dict[str, Any]:
     time = "time"
     tb_name = ""
 
-    with Dataset(path, mode="r") as fptr:
-        fptr.set_auto_mask(False)
-
-        if time not in fptr.variables:
-            attr_dict["date_start"] = datetime.date(1, 1, 1)
-            attr_dict["date_end"] = datetime.date(1, 1, 1)
-            attr_dict["varname"] = list(fptr.variables)
-            attr_dict["frequency"] = "unknown"
-            return attr_dict
-
-        names_omit = [time]
-        if "bounds" in fptr.variables[time].ncattrs():
-            tb_name = fptr.variables[time].bounds
-            if tb_name not in fptr.variables:
-                raise RuntimeError("specified bounds variable not found in %s" % path)
-            names_omit.append(tb_name)
-
+    if time not in fptr.variables:
+        attr_dict["date_start"] = datetime.date(1, 1, 1)
+        attr_dict["date_end"] = datetime.date(1, 1, 1)
+        attr_dict["varname"] = list(fptr.variables)
+        attr_dict["frequency"] = "unknown"
+        return attr_dict
+
+    names_omit = [time]
+    if "bounds" in fptr.variables[time].ncattrs():
+        tb_name = fptr.variables[time].bounds
+        if tb_name not in fptr.variables:
+            raise RuntimeError("specified bounds variable not found in %s" % path)
+        names_omit.append(tb_name)
+
+    attr_dict["varname"] = [
+        name
+        for name, var in fptr.variables.items()
+        if time in var.dimensions and name not in names_omit
+    ]
+
+    # if no time-varying variables exist, then include all non-coordinate variables
+    if not attr_dict["varname"]:
         attr_dict["varname"] = [
-            name
-            for name, var in fptr.variables.items()
-            if time in var.dimensions and name not in names_omit
+            name for name in fptr.variables if name not in fptr.dimensions
         ]
 
-        # if no time-varying variables exist, then include all non-coordinate variables
-        if not attr_dict["varname"]:
-            attr_dict["varname"] = [
-                name for name in fptr.variables if name not in fptr.dimensions
-            ]
-
-        if "time_period_freq" in fptr.ncattrs():
-            attr_dict["frequency"] = fptr.time_period_freq
-
-        units = fptr.variables[time].units
-        calendar = fptr.variables[time].calendar.lower()
-        tlen = len(fptr.dimensions["time"])
-        if tb_name:
-            date_start = fptr.variables[tb_name][0, 0]
-            date_end = fptr.variables[tb_name][tlen - 1, 1]
-        else:
-            date_start = fptr.variables[time][0]
-            date_end = fptr.variables[time][tlen - 1]
+    if "time_period_freq" in fptr.ncattrs():
+        attr_dict["frequency"] = fptr.time_period_freq
+
+    units = fptr.variables[time].units
+    calendar = fptr.variables[time].calendar.lower()
+    tlen = fptr.variables[time].shape[0]
+    if tb_name:
+        date_start = fptr.variables[tb_name][0, 0]
+        date_end = fptr.variables[tb_name][tlen - 1, 1]
+    else:
+        date_start = fptr.variables[time][0]
+        date_end = fptr.variables[time][tlen - 1]
 
     # convert model time values into date objects
-    cftime_obj = cftime.num2date(date_start, units=units, calendar=calendar)
-    attr_dict["date_start"] = datetime.date(
-        cftime_obj.year, cftime_obj.month, cftime_obj.day
-    )
-    cftime_obj = cftime.num2date(date_end, units=units, calendar=calendar)
-    attr_dict["date_end"] = datetime.date(
-        cftime_obj.year, cftime_obj.month, cftime_obj.day
-    )
+    with phase("num2date"):
+        cftime_obj = cftime.num2date(date_start, units=units, calendar=calendar)
+        attr_dict["date_start"] = datetime.date(
+            cftime_obj.year, cftime_obj.month, cftime_obj.day
+        )
+        cftime_obj = cftime.num2date(date_end, units=units, calendar=calendar)
+        attr_dict["date_end"] = datetime.date(
+            cftime_obj.year, cftime_obj.month, cftime_obj.day
+        )
 
     if "frequency" not in attr_dict:
         attr_dict["frequency"] = cesm_infer_freq(
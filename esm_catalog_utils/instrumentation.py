@@ -0,0 +1,251 @@
+"""Instrumentation of catalog generation."""
+
+import contextlib
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# report that phases of the current thread are recorded in, if any
+_local = threading.local()
+
+
+class BuildReport:
+    """
+    Report of where time is spent when generating a catalog.
+
+    Reports are generated by
+    :py:func:`~esm_catalog_utils.case_metadata_to_esm_datastore` when its
+    `report_callback` argument is provided.
+
+    Attributes
+    ----------
+    wall_times : dict
+        Wall clock time, in seconds, of the top-level phases of catalog
+        generation: "scan_and_parse", the search for files and parsing of
+        them, which overlap; "scan", the part of "scan_and_parse" spent
+        waiting for the search for files; "concat", combining parsed rows into
+        a DataFrame; "update", updating the DataFrame of `esm_datastore_in`;
+        "esm_datastore", constructing the returned esm_datastore; and
+        "references", writing references, if `references_directory` is
+        provided.
+    phase_times : dict
+        Time, in seconds, spent in phases of parsing files, summed over files
+        and over parallel workers: "stat", calling ``os.stat`` and appending
+        rows; "path_parser" and "file_parser", calling the path and file
+        parsers. Phases within file parsers, such as "netcdf_open" and
+        "num2date" in :py:func:`~esm_catalog_utils.parse_file_cesm`, are
+        included if the file parser records them with
+        :py:func:`~esm_catalog_utils.instrumentation.phase`.
+    file_times : dict
+        Time, in seconds, spent generating the row for each file, keyed by
+        path.
+    bytes_read : int or None
+        Number of bytes read by read system calls while parsing files, from
+        ``/proc/self/io``. None if this is unavailable. With threaded dask
+        workers, concurrently parsed chunks are counted in each other's
+        totals, so this is an upper bound.
+    references_skipped : dict
+        Reasons that references were not generated for groups of catalog
+        rows, keyed by the group's values of ``groupby_attrs``, joined by
+        ".". See :py:func:`~esm_catalog_utils.write_references`.
+    """
+
+    def __init__(self) -> None:
+        self.wall_times: Dict[str, float] = defaultdict(float)
+        self.phase_times: Dict[str, float] = defaultdict(float)
+        self.file_times: Dict[str, float] = {}
+        self.bytes_read: Optional[int] = None
+        self.references_skipped: Dict[str, str] = {}
+
+    def __repr__(self) -> str:
+        lines = [f"BuildReport for {len(self.file_times)} files"]
+        for label, times in [("wall", self.wall_times), ("phase", self.phase_times)]:
+            for key, value in times.items():
+                lines.append(f"  {label} {key}: {value:.3f} s")
+        if self.bytes_read is not None:
+            lines.append(f"  bytes read: {self.bytes_read}")
+        for path, seconds in self.slowest_files(5):
+            lines.append(f"  slow file: {path}: {seconds:.3f} s")
+        for key, reason in self.references_skipped.items():
+            lines.append(f"  references skipped: {key}: {reason}")
+        return "\n".join(lines)
+
+    def merge(self, other: "BuildReport") -> None:
+        """
+        Add times and bytes read from another report into this report.
+
+        Parameters
+        ----------
+        other : BuildReport
+            Report being merged in, e.g., from a parallel worker.
+        """
+        for key, value in other.wall_times.items():
+            self.wall_times[key] += value
+        for key, value in other.phase_times.items():
+            self.phase_times[key] += value
+        self.file_times.update(other.file_times)
+        if other.bytes_read is not None:
+            self.bytes_read = (self.bytes_read or 0) + other.bytes_read
+        self.references_skipped.update(other.references_skipped)
+
+    def slowest_files(self, n: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return the files that took the longest time to parse.
+
+        Parameters
+        ----------
+        n : int, optional
+            Number of files returned.
+
+        Returns
+        -------
+        list of tuple of (str, float)
+            Paths and times, in seconds, sorted by decreasing time.
+        """
+        return sorted(self.file_times.items(), key=lambda item: -item[1])[:n]
+
+    def latency_histogram(
+        self, bins: Optional[Sequence[float]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return histogram of per-file parse times.
+
+        Parameters
+        ----------
+        bins : sequence of float, optional
+            Edges of histogram bins, in seconds. Default is logarithmically
+            spaced edges, from 1 microsecond to 100 seconds, with 4 bins per
+            factor of 10.
+
+        Returns
+        -------
+        tuple of (numpy.ndarray, numpy.ndarray)
+            Number of files in each bin, and bin edges.
+        """
+        bin_edges = np.logspace(-6, 2, 33) if bins is None else np.asarray(bins)
+        return np.histogram(list(self.file_times.values()), bins=bin_edges)
+
+    def to_dict(self, n_slowest: int = 10) -> Dict[str, Any]:
+        """
+        Return report as a dictionary of built-in types.
+
+        Parameters
+        ----------
+        n_slowest : int, optional
+            Number of slowest files included.
+
+        Returns
+        -------
+        dict
+        """
+        counts, edges = self.latency_histogram()
+        return {
+            "n_files": len(self.file_times),
+            "wall_times": dict(self.wall_times),
+            "phase_times": dict(self.phase_times),
+            "bytes_read": self.bytes_read,
+            "latency_histogram": {
+                "counts": counts.tolist(),
+                "edges": edges.tolist(),
+            },
+            "slowest_files": self.slowest_files(n_slowest),
+            "references_skipped": dict(self.references_skipped),
+        }
+
+
+class BuildProgress(NamedTuple):
+    """
+    Progress of generating catalogs of multiple cases.
+
+    Passed to the `progress_callback` argument of
+    :py:func:`~esm_catalog_utils.cases_metadata_to_esm_datastore` each time a
+    chunk of files has been parsed.
+
+    Attributes
+    ----------
+    case : str
+        Case of files in the chunk that was parsed.
+    n_files_parsed : int
+        Number of files parsed so far, over all cases.
+    n_files_found : int
+        Number of files found so far, over all cases.
+    scan_complete : bool
+        Whether the search for files of all cases is complete. If it is,
+        `n_files_found` is the total number of files.
+    """
+
+    case: str
+    n_files_parsed: int
+    n_files_found: int
+    scan_complete: bool
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Record time spent in a phase of parsing files.
+
+    The time is added to ``phase_times[name]`` of the report that is being
+    recorded in the current thread, if any, so file parsers can be
+    instrumented at no cost when no report is being generated.
+
+    Parameters
+    ----------
+    name : str
+        Name of phase.
+    """
+    report = getattr(_local, "report", None)
+    if report is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.phase_times[name] += time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def recording(report: BuildReport) -> Iterator[BuildReport]:
+    """
+    Record phases of the current thread, and bytes read, in a report.
+
+    Parameters
+    ----------
+    report : BuildReport
+        Report being recorded in.
+    """
+    report_prev = getattr(_local, "report", None)
+    _local.report = report
+    bytes_read_start = read_bytes()
+    try:
+        yield report
+    finally:
+        _local.report = report_prev
+        bytes_read_end = read_bytes()
+        if bytes_read_start is not None and bytes_read_end is not None:
+            report.bytes_read = (report.bytes_read or 0) + (
+                bytes_read_end - bytes_read_start
+            )
+
+
+def read_bytes() -> Optional[int]:
+    """
+    Return number of bytes read by this process with read system calls.
+
+    Returns
+    -------
+    int or None
+        Value of rchar in ``/proc/self/io``. None if it is unavailable.
+    """
+    try:
+        with open("/proc/self/io") as fptr:
+            for line in fptr:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,600 @@
+"""Lightweight readers of netCDF file metadata."""
+
+import functools
+import math
+import mmap
+import struct
+from os import PathLike
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from netCDF4 import Dataset
+
+from ._optional_imports import import_optional
+
+# numpy dtypes of netCDF external types, keyed by nc_type
+_NC_DTYPES = {
+    1: np.dtype(">i1"),
+    2: np.dtype("S1"),
+    3: np.dtype(">i2"),
+    4: np.dtype(">i4"),
+    5: np.dtype(">f4"),
+    6: np.dtype(">f8"),
+    7: np.dtype(">u1"),
+    8: np.dtype(">u2"),
+    9: np.dtype(">u4"),
+    10: np.dtype(">i8"),
+    11: np.dtype(">u8"),
+}
+
+# nc_type of characters
+_NC_CHAR = 2
+
+# tags for lists in header of classic format files
+_NC_DIMENSION = 10
+_NC_VARIABLE = 11
+_NC_ATTRIBUTE = 12
+
+_UINT32 = struct.Struct(">I")
+_UINT64 = struct.Struct(">Q")
+
+# numrecs value indicating that numrecs is to be determined from the file size
+_STREAMING = 0xFFFFFFFF
+
+# attributes of HDF5 objects used to implement netCDF-4, that are not netCDF
+# attributes
+_H5_HIDDEN_ATTRS = frozenset(
+    [
+        "CLASS",
+        "DIMENSION_LIST",
+        "NAME",
+        "REFERENCE_LIST",
+        "_NCProperties",
+        "_Netcdf4Coordinates",
+        "_Netcdf4Dimid",
+        "_nc3_strict",
+    ]
+)
+
+# prefix of NAME attribute of HDF5 datasets for dimensions without a variable
+_H5_DIM_ONLY_NAME = b"This is a netCDF dimension but not a netCDF variable"
+
+
+def open_netcdf_header(path: Union[str, PathLike]) -> Any:
+    """
+    Open netCDF file for reading metadata and individual values.
+
+    The returned object supports the subset of the ``netCDF4.Dataset`` API
+    used by :py:func:`~esm_catalog_utils.parse_file_cesm`, i.e., the
+    ``dimensions`` and ``variables`` dictionaries, ``ncattrs``, attribute
+    access, and integer indexing of variables. It is a context manager.
+
+    Files in the classic and 64-bit offset formats, and the CDF-5 format,
+    are read with :py:class:`ClassicHeader`, which reads the header directly
+    from a memory map of the file. Files in the netCDF-4 format are read with
+    :py:class:`H5Header` if h5py, from the ``hdf5`` extra, is installed.
+    Other files are opened with ``netCDF4.Dataset``.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file being opened.
+
+    Returns
+    -------
+    ClassicHeader or H5Header or netCDF4.Dataset
+    """
+    with open(path, "rb") as file:
+        magic = file.read(4)
+    if magic in [b"CDF\x01", b"CDF\x02", b"CDF\x05"]:
+        return ClassicHeader(path)
+    if magic == b"\x89HDF":
+        try:
+            return H5Header(path)
+        except ImportError:
+            pass
+    dataset = Dataset(path, mode="r")
+    dataset.set_auto_mask(False)
+    return dataset
+
+
+class _Attributes:
+    """Mixin providing netCDF4 style access to attributes stored in _attrs."""
+
+    _attrs: Dict[str, Any]
+
+    def ncattrs(self) -> List[str]:
+        return list(self._attrs)
+
+    def getncattr(self, name: str) -> Any:
+        try:
+            return self._attrs[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._attrs[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class ClassicHeader(_Attributes):
+    """
+    Reader of netCDF files in the classic, 64-bit offset, and CDF-5 formats.
+
+    The header is parsed from a read-only memory map of the file, and
+    variable values are read from the memory map on demand, so only pages of
+    the file that are accessed are read.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file being read.
+    """
+
+    def __init__(self, path: Union[str, PathLike]):
+        self.path = path
+        with open(path, "rb") as fptr:
+            self._mmap = mmap.mmap(fptr.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "ClassicHeader":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def set_auto_mask(self, value: bool) -> None:
+        """Do nothing, values are never masked."""
+
+    def _parse_header(self) -> None:
+        buf = self._mmap
+        version = buf[3]
+        size_struct = _UINT64 if version == 5 else _UINT32
+        offset_struct = _UINT32 if version == 1 else _UINT64
+        size_unpack, size_nbytes = size_struct.unpack_from, size_struct.size
+        pos = 4
+
+        def read_name() -> str:
+            nonlocal pos
+            (nchars,) = size_unpack(buf, pos)
+            pos += size_nbytes
+            name = buf[pos : pos + nchars].decode("utf-8")
+            pos += (nchars + 3) & ~3
+            return name
+
+        def read_list_header() -> Tuple[int, int]:
+            nonlocal pos
+            (tag,) = _UINT32.unpack_from(buf, pos)
+            (nelems,) = size_unpack(buf, pos + 4)
+            pos += 4 + size_nbytes
+            return tag, nelems
+
+        (numrecs,) = size_unpack(buf, pos)
+        pos += size_nbytes
+
+        dim_names: List[str] = []
+        dim_lens: List[int] = []
+        tag, nelems = read_list_header()
+        if tag == _NC_DIMENSION:
+            for _ in range(nelems):
+                dim_names.append(read_name())
+                (dim_len,) = size_unpack(buf, pos)
+                pos += size_nbytes
+                dim_lens.append(dim_len)
+        self._size_struct = size_struct
+        self.unlimited_dim = dim_names[dim_lens.index(0)] if 0 in dim_lens else None
+
+        self._attrs, pos = _read_classic_attrs(buf, pos, size_struct)
+
+        self.variables: Dict[str, ClassicVariable] = {}
+        tag, nelems = read_list_header()
+        if tag == _NC_VARIABLE:
+            for _ in range(nelems):
+                name = read_name()
+                (ndims,) = size_unpack(buf, pos)
+                pos += size_nbytes
+                dimids = struct.unpack_from(
+                    f">{ndims}{size_struct.format[-1]}", buf, pos
+                )
+                pos += ndims * size_nbytes
+                # attributes of variables are read when they are accessed
+                attrs_pos = pos
+                pos = _read_classic_attrs(buf, pos, size_struct, decode=False)[1]
+                (nc_type,) = _UINT32.unpack_from(buf, pos)
+                # vsize is skipped, it is recomputed because it can overflow
+                pos += 4 + size_nbytes
+                (begin,) = offset_struct.unpack_from(buf, pos)
+                pos += offset_struct.size
+                self.variables[name] = ClassicVariable(
+                    self,
+                    tuple(dim_names[dimid] for dimid in dimids),
+                    tuple(dim_lens[dimid] for dimid in dimids),
+                    _NC_DTYPES[nc_type],
+                    begin,
+                    attrs_pos,
+                )
+
+        # determine size of records, and number of records if not in header
+        record_vars = [var for var in self.variables.values() if var.is_record]
+        if len(record_vars) == 1:
+            self.recsize = record_vars[0].record_nbytes
+        else:
+            self.recsize = sum(_pad4(var.record_nbytes) for var in record_vars)
+        if numrecs == _STREAMING:
+            if record_vars and self.recsize > 0:
+                begin = min(var.begin for var in record_vars)
+                numrecs = (len(buf) - begin) // self.recsize
+            else:
+                numrecs = 0
+        self.numrecs = numrecs
+
+        self.dimensions = {
+            name: numrecs if name == self.unlimited_dim else dim_len
+            for name, dim_len in zip(dim_names, dim_lens)
+        }
+
+
+class ClassicVariable(_Attributes):
+    """Variable of a :py:class:`ClassicHeader`."""
+
+    def __init__(
+        self,
+        header: ClassicHeader,
+        dimensions: Tuple[str, ...],
+        dim_lens: Tuple[int, ...],
+        dtype: np.dtype,
+        begin: int,
+        attrs_pos: int,
+    ):
+        self._header = header
+        self.dimensions = dimensions
+        self.dtype = dtype
+        self.begin = begin
+        self._attrs_pos = attrs_pos
+        self.is_record = len(dim_lens) > 0 and dim_lens[0] == 0
+        self._inner_shape = dim_lens[1:] if self.is_record else dim_lens
+        self.record_nbytes = dtype.itemsize * math.prod(self._inner_shape)
+
+    @functools.cached_property
+    def _attrs(self) -> Dict[str, Any]:  # type: ignore[override]
+        header = self._header
+        return _read_classic_attrs(header._mmap, self._attrs_pos, header._size_struct)[
+            0
+        ]
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        if self.is_record:
+            return (self._header.numrecs,) + self._inner_shape
+        return self._inner_shape
+
+    def __getitem__(self, key: Union[int, Tuple[int, ...]]) -> Any:
+        """Return value at an index, which must have an integer per dimension."""
+        if not isinstance(key, tuple):
+            key = (key,)
+        shape = self.shape
+        if len(key) != len(shape):
+            raise IndexError(f"{len(shape)} indices required, got {len(key)}")
+        indices = []
+        for ind, dim_len in zip(key, shape):
+            ind = int(ind)
+            if ind < 0:
+                ind += dim_len
+            if not 0 <= ind < dim_len:
+                raise IndexError(f"index {ind} out of range for length {dim_len}")
+            indices.append(ind)
+        offset = self.begin
+        if self.is_record:
+            offset += indices[0] * self._header.recsize
+            indices = indices[1:]
+        if indices:
+            offset += self.dtype.itemsize * int(
+                np.ravel_multi_index(indices, self._inner_shape)
+            )
+        return np.frombuffer(
+            self._header._mmap, dtype=self.dtype, count=1, offset=offset
+        )[0]
+
+
+class H5Header(_Attributes):
+    """
+    Reader of netCDF-4 files, using h5py.
+
+    Variables are listed, and their dimensions are determined, from the links
+    in the root group and the references stored with dimension scales, without
+    opening the HDF5 datasets of variables. Datasets are opened, and their
+    attributes read, when they are accessed.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file being read.
+
+    Raises
+    ------
+    ImportError
+        If h5py is not installed. It is installed with the ``hdf5`` extra,
+        i.e., ``pip install esm_catalog_utils[hdf5]``.
+    """
+
+    def __init__(self, path: Union[str, PathLike]):
+        h5py = import_optional("h5py", "hdf5")
+
+        self.path = path
+        self._file = h5py.File(path, "r")
+        try:
+            self._read_metadata()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "H5Header":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def set_auto_mask(self, value: bool) -> None:
+        """Do nothing, values are never masked."""
+
+    def _read_metadata(self) -> None:
+        import h5py
+
+        group_id = self._file.id
+
+        # netCDF variables are listed in creation order, if it is tracked
+        link_names: List[bytes] = []
+        try:
+            group_id.links.iterate(link_names.append, idx_type=h5py.h5.INDEX_CRT_ORDER)
+        except Exception:
+            link_names = []
+            group_id.links.iterate(link_names.append)
+
+        self._attrs = _h5_attrs(self._file)
+        self.dimensions: Dict[str, int] = {}
+        names: List[str] = []
+        names_by_addr: Dict[int, str] = {}
+        for link_name in link_names:
+            info = h5py.h5o.get_info(group_id, link_name)
+            if info.type != h5py.h5o.TYPE_DATASET:
+                continue
+            name = link_name.decode("utf-8")
+            names_by_addr[info.addr] = name
+            if h5py.h5a.exists(group_id, b"CLASS", obj_name=link_name):
+                dataset = self._file[name]
+                if h5py.h5ds.is_scale(dataset.id):
+                    self.dimensions[name] = dataset.shape[0] if dataset.shape else 0
+                    if _as_bytes(dataset.attrs.get("NAME", b"")).startswith(
+                        _H5_DIM_ONLY_NAME
+                    ):
+                        # dimension without a variable
+                        continue
+            names.append(name)
+
+        # dimensions of variables, from the datasets attached to dimension scales
+        # coordinate variables are dimension scales, which are not attached to
+        # themselves
+        var_dims: Optional[Dict[str, Dict[int, str]]] = {
+            name: {0: name} for name in names if name in self.dimensions
+        }
+        for dim_name in self.dimensions:
+            attached = _h5_attached_datasets(self._file[dim_name])
+            if attached is None or var_dims is None:
+                var_dims = None
+                continue
+            for addr, dim_ind in attached:
+                if addr in names_by_addr:
+                    var_dims.setdefault(names_by_addr[addr], {})[dim_ind] = dim_name
+
+        self.variables: Dict[str, H5Variable] = {}
+        for name in names:
+            dimensions: Optional[Tuple[str, ...]] = None
+            if var_dims is not None:
+                dims = var_dims.get(name, {})
+                dimensions = tuple(
+                    dims.get(ind, f"phony_dim_{ind}")
+                    for ind in range(max(dims, default=-1) + 1)
+                )
+            self.variables[name] = H5Variable(self, name, dimensions)
+
+
+class H5Variable(_Attributes):
+    """Variable of a :py:class:`H5Header`."""
+
+    def __init__(
+        self, header: H5Header, name: str, dimensions: Optional[Tuple[str, ...]]
+    ):
+        self._header = header
+        self.name = name
+        self._dimensions = dimensions
+
+    @functools.cached_property
+    def _dataset(self) -> Any:
+        return self._header._file[self.name]
+
+    @functools.cached_property
+    def _attrs(self) -> Dict[str, Any]:  # type: ignore[override]
+        return _h5_attrs(self._dataset)
+
+    @property
+    def dimensions(self) -> Tuple[str, ...]:
+        if self._dimensions is None:
+            # compare object identifiers, because looking up names is slow
+            dim_names = {
+                self._header._file[dim_name].id: dim_name
+                for dim_name in self._header.dimensions
+            }
+            dimensions = [
+                (
+                    dim_names.get(dim[0].id, f"phony_dim_{ind}")
+                    if len(dim) > 0
+                    else f"phony_dim_{ind}"
+                )
+                for ind, dim in enumerate(self._dataset.dims)
+            ]
+            # coordinate variables are dimension scales, which are not attached
+            # to themselves
+            if self.name in self._header.dimensions:
+                dimensions[0] = self.name
+            self._dimensions = tuple(dimensions)
+        return self._dimensions
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._dataset.shape
+
+    def __getitem__(self, key: Union[int, Tuple[int, ...]]) -> Any:
+        return self._dataset[key]
+
+
+def _read_classic_attrs(
+    buf: mmap.mmap, pos: int, size_struct: struct.Struct, decode: bool = True
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Read list of attributes from header of classic format file.
+
+    Parameters
+    ----------
+    buf : mmap.mmap
+        Memory map of file.
+    pos : int
+        Position of list of attributes in `buf`.
+    size_struct : struct.Struct
+        Struct for sizes in `buf`, which depends on the file format.
+    decode : bool, optional
+        If False, attributes are skipped over, and an empty dict is returned.
+
+    Returns
+    -------
+    tuple of (dict, int)
+        Attributes, and position in `buf` after the list of attributes.
+    """
+    attrs: Dict[str, Any] = {}
+    size_unpack, size_nbytes = size_struct.unpack_from, size_struct.size
+    (tag,) = _UINT32.unpack_from(buf, pos)
+    (nelems,) = size_unpack(buf, pos + 4)
+    pos += 4 + size_nbytes
+    if tag != _NC_ATTRIBUTE:
+        return attrs, pos
+    for _ in range(nelems):
+        (nchars,) = size_unpack(buf, pos)
+        name_pos = pos + size_nbytes
+        pos = name_pos + ((nchars + 3) & ~3)
+        (nc_type,) = _UINT32.unpack_from(buf, pos)
+        (nvalues,) = size_unpack(buf, pos + 4)
+        pos += 4 + size_nbytes
+        dtype = _NC_DTYPES[nc_type]
+        nbytes = nvalues * dtype.itemsize
+        if decode:
+            name = buf[name_pos : name_pos + nchars].decode("utf-8")
+            if nc_type == _NC_CHAR:
+                attrs[name] = buf[pos : pos + nbytes].decode("utf-8").rstrip("\x00")
+            else:
+                # copy values, so that they do not reference the memory map
+                attrs[name] = _attr_value(
+                    np.frombuffer(buf, dtype=dtype, count=nvalues, offset=pos).copy()
+                )
+        pos += (nbytes + 3) & ~3
+    return attrs, pos
+
+
+def _h5_attached_datasets(dataset: Any) -> Optional[List[Tuple[int, int]]]:
+    """
+    Return datasets attached to a dimension scale.
+
+    The REFERENCE_LIST attribute of the dimension scale is read without
+    dereferencing the object references in it, which are the addresses of the
+    attached datasets.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        Dimension scale.
+
+    Returns
+    -------
+    list of tuple of (int, int) or None
+        Address of each attached dataset, and the index of the dimension of
+        the dataset that `dataset` is attached to. None if the REFERENCE_LIST
+        attribute does not have the expected layout.
+    """
+    import h5py
+
+    if "REFERENCE_LIST" not in dataset.attrs:
+        return []
+    attr_id = h5py.h5a.open(dataset.id, b"REFERENCE_LIST")
+    file_type = attr_id.get_type()
+    if not (
+        isinstance(file_type, h5py.h5t.TypeCompoundID)
+        and file_type.get_nmembers() == 2
+        and file_type.get_member_class(0) == h5py.h5t.REFERENCE
+        and file_type.get_member_type(0).get_size() == 8
+        and file_type.get_member_class(1) == h5py.h5t.INTEGER
+        and file_type.get_member_type(1).get_size() == 4
+    ):
+        return None
+    values = np.empty(attr_id.shape, dtype=np.dtype(f"V{file_type.get_size()}"))
+    attr_id.read(values, mtype=file_type)
+    values = values.view(
+        np.dtype(
+            {
+                "names": ["addr", "dim_ind"],
+                "formats": ["=u8", "=i4"],
+                "offsets": [file_type.get_member_offset(ind) for ind in range(2)],
+                "itemsize": file_type.get_size(),
+            }
+        )
+    )
+    return list(zip(values["addr"].tolist(), values["dim_ind"].tolist()))
+
+
+def _h5_attrs(obj: Any) -> Dict[str, Any]:
+    """Return netCDF attributes of an HDF5 object."""
+    return {
+        name: _attr_value(value)
+        for name, value in obj.attrs.items()
+        if name not in _H5_HIDDEN_ATTRS
+    }
+
+
+def _attr_value(values: Any) -> Any:
+    """Convert attribute values to the form returned by netCDF4."""
+    if isinstance(values, bytes):
+        return values.decode("utf-8")
+    if isinstance(values, str):
+        return values
+    values = np.asarray(values)
+    if values.dtype.kind == "S":
+        return b"".join(values.ravel().tolist()).decode("utf-8").rstrip("\x00")
+    if values.dtype.kind == "O":
+        values = [_attr_value(value) for value in values.ravel()]
+        return values[0] if len(values) == 1 else values
+    if values.size == 1:
+        return values.ravel()[0]
+    return values
+
+
+def _as_bytes(value: Any) -> bytes:
+    """Return attribute value as bytes."""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return bytes(value)
+
+
+def _pad4(nbytes: int) -> int:
+    """Return nbytes, rounded up to a multiple of 4."""
+    return (nbytes + 3) & ~3
@@ -0,0 +1,365 @@
+"""Persistent cache of results from file parsers."""
+
+import os
+import os.path
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from os import PathLike
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    path TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    result BLOB NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (path, parser)
+);
+CREATE INDEX IF NOT EXISTS parse_cache_last_used ON parse_cache (last_used);
+"""
+
+# number of insertions between checks of the number of entries in the cache
+_EVICTION_CHECK_INTERVAL = 1024
+
+# number of pending updates of last_used that triggers writing them
+_LAST_USED_FLUSH_SIZE = 1024
+
+
+def parser_name(file_parser: Callable) -> str:
+    """
+    Return fully qualified name of a file parser.
+
+    Parameters
+    ----------
+    file_parser : callable
+        File parser being named.
+
+    Returns
+    -------
+    str
+        Name of `file_parser`, including the module it is defined in.
+    """
+    module = getattr(file_parser, "__module__", None) or ""
+    qualname = getattr(file_parser, "__qualname__", None) or repr(file_parser)
+    return f"{module}.{qualname}"
+
+
+def parser_version(file_parser: Callable) -> str:
+    """
+    Return version of a file parser.
+
+    The version is looked up by name in the dictionary ``PARSER_VERSIONS`` of
+    the module where `file_parser` is defined. If the module has no such
+    dictionary, or `file_parser` is not in it, then the version is "".
+
+    Parameters
+    ----------
+    file_parser : callable
+        File parser whose version is being returned.
+
+    Returns
+    -------
+    str
+        Version of `file_parser`.
+    """
+    module = sys.modules.get(getattr(file_parser, "__module__", None) or "")
+    versions = getattr(module, "PARSER_VERSIONS", {})
+    return str(versions.get(getattr(file_parser, "__qualname__", None), ""))
+
+
+class ParseCache:
+    """
+    Persistent cache of results from file parsers, stored in a SQLite database.
+
+    Entries are keyed on a file's path and the name of the parser that
+    generated them, and are only used if the file's size, modification time,
+    and parser version match the values recorded when the entry was stored.
+    The cache can be shared across processes and sessions, and by threads,
+    which each use their own connection to the database.
+
+    The times that entries are used, which determine the order in which they
+    are evicted, are recorded in memory on cache hits, and written to the
+    database in batches, when enough are pending, and by :py:meth:`flush`,
+    :py:meth:`evict`, and :py:meth:`close`. Times that are not written,
+    e.g., by worker processes that exit before a batch is full, only affect
+    the order of eviction.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of SQLite database file. It is created if it does not exist.
+    max_entries : int, optional
+        Maximum number of entries in the cache. When this is exceeded, the
+        least recently used entries are evicted. Excess entries are checked
+        for periodically as entries are stored, and at the end of each
+        catalog build that uses the cache.
+    """
+
+    def __init__(self, path: Union[str, PathLike], max_entries: int = 1_000_000):
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._insert_cnt = 0
+        self._last_used: Dict[Tuple[str, str], int] = {}
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # connections are not picklable, they are reopened on demand
+        return {"path": self.path, "max_entries": self.max_entries}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.path = state["path"]
+        self.max_entries = state["max_entries"]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._insert_cnt = 0
+        self._last_used = {}
+
+    def __repr__(self) -> str:
+        return f"ParseCache({self.path!r}, max_entries={self.max_entries})"
+
+    def __len__(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database, opening it if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(
+        self,
+        path: Union[str, PathLike],
+        stat_result: os.stat_result,
+        name: str,
+        version: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached parse result.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Path of parsed file.
+        stat_result : os.stat_result
+            Current result of ``os.stat`` on `path`.
+        name, version : str
+            Name and version of parser that generated the result.
+
+        Returns
+        -------
+        dict or None
+            Cached parse result, if an up to date one is present.
+            None otherwise.
+        """
+        path = os.path.abspath(path)
+        with self._connection() as conn:
+            entry = conn.execute(
+                "SELECT parser_version, size, mtime_ns, result FROM parse_cache"
+                " WHERE path = ? AND parser = ?",
+                (path, name),
+            ).fetchone()
+        if entry is None or entry[:3] != (
+            version,
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+        ):
+            return None
+        with self._lock:
+            self._last_used[(path, name)] = time.time_ns()
+            flush = len(self._last_used) >= _LAST_USED_FLUSH_SIZE
+        if flush:
+            self.flush()
+        return pickle.loads(entry[3])
+
+    def put(
+        self,
+        path: Union[str, PathLike],
+        stat_result: os.stat_result,
+        name: str,
+        version: str,
+        result: Dict[str, Any],
+    ) -> None:
+        """
+        Store parse result.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Path of parsed file.
+        stat_result : os.stat_result
+            Result of ``os.stat`` on `path`, from before `path` was parsed.
+        name, version : str
+            Name and version of parser that generated `result`.
+        result : dict
+            Parse result being stored.
+        """
+        path = os.path.abspath(path)
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    name,
+                    version,
+                    stat_result.st_size,
+                    stat_result.st_mtime_ns,
+                    blob,
+                    time.time_ns(),
+                ),
+            )
+        with self._lock:
+            # the stored entry's last_used supersedes a pending one
+            self._last_used.pop((path, name), None)
+            self._insert_cnt += 1
+            check = self._insert_cnt % _EVICTION_CHECK_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def flush(self) -> None:
+        """Write pending times that entries were used to the database."""
+        with self._lock:
+            last_used, self._last_used = self._last_used, {}
+        if not last_used:
+            return
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE parse_cache SET last_used = ? WHERE path = ? AND parser = ?",
+                [(value, *key) for key, value in last_used.items()],
+            )
+
+    def close(self) -> None:
+        """
+        Write pending times that entries were used, and close connection.
+
+        Only the connection of the calling thread is closed. The cache can
+        still be used, connections are reopened on demand.
+        """
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def evict(self) -> int:
+        """
+        Evict least recently used entries in excess of `max_entries`.
+
+        Returns
+        -------
+        int
+            Number of evicted entries.
+        """
+        self.flush()
+        with self._connection() as conn:
+            excess = len(self) - self.max_entries
+            if excess <= 0:
+                return 0
+            conn.execute(
+                "DELETE FROM parse_cache WHERE rowid IN (SELECT rowid FROM"
+                " parse_cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        return excess
+
+    def invalidate(
+        self,
+        file_parser: Optional[Callable] = None,
+        keep_version: Optional[str] = None,
+    ) -> int:
+        """
+        Remove entries from the cache.
+
+        Parameters
+        ----------
+        file_parser : callable, optional
+            If provided, only entries generated by `file_parser` are removed.
+            Otherwise, all entries are removed.
+        keep_version : str, optional
+            If provided, entries generated by version `keep_version` of
+            `file_parser` are kept.
+
+        Returns
+        -------
+        int
+            Number of removed entries.
+        """
+        query = "DELETE FROM parse_cache"
+        params: tuple = ()
+        if file_parser is not None:
+            query += " WHERE parser = ?"
+            params = (parser_name(file_parser),)
+            if keep_version is not None:
+                query += " AND parser_version != ?"
+                params += (keep_version,)
+        with self._connection() as conn:
+            return conn.execute(query, params).rowcount
+
+    def wrap(
+        self, file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]]
+    ) -> "CachedFileParser":
+        """
+        Return a file parser that uses this cache.
+
+        Entries generated by other versions of `file_parser` are removed from
+        the cache.
+
+        Parameters
+        ----------
+        file_parser : callable
+            File parser whose results are cached.
+
+        Returns
+        -------
+        CachedFileParser
+        """
+        self.invalidate(file_parser, keep_version=parser_version(file_parser))
+        return CachedFileParser(self, file_parser)
+
+
+class CachedFileParser:
+    """
+    File parser that looks up results in a `ParseCache` before parsing.
+
+    Instances are picklable, so they can be used as a file parser when parsing
+    is performed in parallel.
+
+    Parameters
+    ----------
+    cache : ParseCache
+        Cache where results are looked up and stored.
+    file_parser : callable
+        File parser that is called on cache misses.
+    """
+
+    def __init__(
+        self,
+        cache: ParseCache,
+        file_parser: Callable[[Union[str, PathLike]], Dict[str, Any]],
+    ):
+        self.cache = cache
+        self.file_parser = file_parser
+        self.name = parser_name(file_parser)
+        self.version = parser_version(file_parser)
+
+    def __call__(self, path: Union[str, PathLike]) -> Dict[str, Any]:
+        stat_result = os.stat(path)
+        result = self.cache.get(path, stat_result, self.name, self.version)
+        if result is None:
+            result = self.file_parser(path)
+            self.cache.put(path, stat_result, self.name, self.version, result)
+        return result
@@ -3,7 +3,31 @@
 import os.path
 import re
 from os import PathLike
-from typing import Dict, Union
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+# generic component names, for specific component names
+_CESM_COMPONENTS = {
+    "cpl": "cpl",
+    "cam": "atm",
+    "clm2": "lnd",
+    "clm": "lnd",
+    "cice": "ice",
+    "mom6": "ocn",
+    "pop": "ocn",
+    "mosart": "rof",
+    "rtm": "rof",
+    "cism": "glc",
+    "ww3": "wav",
+}
+
+# pattern for beginning of datestring
+_DATESTRING_START_RE = re.compile("[_.][0-9][0-9]")
+
+# If date ranges are one of YYYY[_-]YYYY, YYYYMM[_-]YYYYMM, YYYYMMDD[_-]YYYYMMDD,
+# then they match this pattern, while a non-range datestring will not.
+_DATE_RANGE_RE = re.compile("[0-9][0-9][0-9][0-9][_-][0-9][0-9][0-9][0-9]")
 
 
 def _cesm_scomp_to_component(scomp: str) -> str:
@@ -21,20 +45,7 @@ def _cesm_scomp_to_component(scomp: str) -> str:
         Generic component name corresponding to `scomp`.
     """
 
-    comp_dict = {
-        "cpl": "cpl",
-        "cam": "atm",
-        "clm2": "lnd",
-        "clm": "lnd",
-        "cice": "ice",
-        "mom6": "ocn",
-        "pop": "ocn",
-        "mosart": "rof",
-        "rtm": "rof",
-        "cism": "glc",
-        "ww3": "wav",
-    }
-    return comp_dict.get(scomp, scomp)
+    return _CESM_COMPONENTS.get(scomp, scomp)
 
 
 def parse_path_cesm(path: Union[str, PathLike], case: str) -> Dict[str, str]:
@@ -86,19 +97,15 @@ def parse_path_cesm(path: Union[str, PathLike], case: str) -> Dict[str, str]:
     attr_dict["component"] = _cesm_scomp_to_component(attr_dict["scomp"])
 
     # look for beginning of datestring, using pattern "[_.][0-9][0-9]"
-    match_obj = re.search("[_.][0-9][0-9]", remainder)
+    match_obj = _DATESTRING_START_RE.search(remainder)
 
     if match_obj is not None:
         attr_dict["datestring"] = remainder[match_obj.start() + 1 :]
         remainder = remainder[: match_obj.start()]
 
         # If the datestring is a date range, infer that this is a single variable file
-        # and that the last "." separated portion of the remainder is a varname. If
-        # date ranges are one of YYYY[_-]YYYY, YYYYMM[_-]YYYYMM, YYYYMMDD[_-]YYYYMMDD,
-        # then they match the pattern [0-9][0-9][0-9][0-9][_-][0-9][0-9][0-9][0-9],
-        # while a non-range datestring will not match this pattern.
-        pattern = "[0-9][0-9][0-9][0-9][_-][0-9][0-9][0-9][0-9]"
-        if re.search(pattern, attr_dict["datestring"]):
+        # and that the last "." separated portion of the remainder is a varname.
+        if _DATE_RANGE_RE.search(attr_dict["datestring"]):
             attr_dict["stream"], _, attr_dict["varname"] = remainder.rpartition(".")
         else:
             # path is a history file, with no varname
@@ -109,3 +116,92 @@ def parse_path_cesm(path: Union[str, PathLike], case: str) -> Dict[str, str]:
         attr_dict["stream"] = remainder
 
     return attr_dict
+
+
+def parse_paths_cesm(paths: Iterable[Union[str, PathLike]], case: str) -> pd.DataFrame:
+    """
+    Separate CESM output file paths into components.
+
+    This is a batch version of :py:func:`parse_path_cesm`, that parses all
+    paths in one pass, appending directly into columns of the result.
+
+    Parameters
+    ----------
+    paths : iterable of str or path-like
+        Paths being separated/parsed.
+    case : str
+        Name of case that generated, and is first component of, `paths`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with a row for each path, and columns "scomp", "component",
+        "stream", "varname", and "datestring". Entries are equal to the values
+        returned by :py:func:`parse_path_cesm`. Entries of "varname" are None
+        for paths where :py:func:`parse_path_cesm` does not return a varname.
+
+    See Also
+    --------
+    parse_path_cesm
+    """
+
+    prefix = case + "."
+    prefix_len = len(prefix)
+    datestring_search = _DATESTRING_START_RE.search
+    range_search = _DATE_RANGE_RE.search
+    components_get = _CESM_COMPONENTS.get
+    fspath, sep, use_basename = os.fspath, os.sep, os.altsep is not None
+
+    columns: Dict[str, List[Optional[str]]] = {
+        key: [] for key in ["scomp", "component", "stream", "varname", "datestring"]
+    }
+    scomp_append = columns["scomp"].append
+    component_append = columns["component"].append
+    stream_append = columns["stream"].append
+    varname_append = columns["varname"].append
+    datestring_append = columns["datestring"].append
+
+    for path in paths:
+        # strip dirname and extension from path
+        # use str methods instead of os.path functions where they are equivalent
+        path = fspath(path)
+        if use_basename:
+            name = os.path.basename(path)
+        else:
+            name = path.rpartition(sep)[2]
+        if name.startswith("."):
+            stem = os.path.splitext(name)[0]
+        else:
+            stem = name.rpartition(".")[0] or name
+
+        # remove {case}. prefix
+        if not stem.startswith(prefix):
+            raise ValueError(f"{stem} does not start with {prefix}")
+
+        # extract scomp
+        scomp, _, remainder = stem[prefix_len:].partition(".")
+        scomp_append(scomp)
+        component_append(components_get(scomp, scomp))
+
+        match_obj = datestring_search(remainder)
+        if match_obj is None:
+            # path is a time-invariant file
+            stream_append(remainder)
+            varname_append(None)
+            datestring_append("")
+            continue
+
+        datestring = remainder[match_obj.start() + 1 :]
+        remainder = remainder[: match_obj.start()]
+        if range_search(datestring):
+            # path is a single variable file
+            stream, _, varname = remainder.rpartition(".")
+            stream_append(stream)
+            varname_append(varname)
+        else:
+            # path is a history file, with no varname
+            stream_append(remainder)
+            varname_append(None)
+        datestring_append(datestring)
+
+    return pd.DataFrame(columns, dtype=object)
@@ -3,6 +3,13 @@ from inspect import signature
 import numpy as np
 import xarray as xr
 
+from .catalog_index import catalog_rows, get_catalog_index
+from .dataset_cache import DatasetCache, file_stats
+
+# static Datasets, e.g., of grid metrics, shared across postprocess calls
+# keyed by (case, path), and closed when they are evicted
+_static_datasets = DatasetCache(max_entries=8, close_evicted=True)
+
 # TODO: add postprocess_cam, which does the following
 #   1) add AREA to ds if not available
 #      Q: Is there a better option for rearth than using CIME's shr value?
@@ -103,13 +110,12 @@ def postprocess_mom6(ds, catalog, case):
         if "cartesian_axis" in ds[coordname].attrs:
             ds[coordname].attrs["axis"] = ds[coordname].attrs["cartesian_axis"]
             del ds[coordname].attrs["cartesian_axis"]
-    df = catalog.df
-    df = df[df["case"] == case]
-    df = df[df["scomp"] == "mom6"]
-    df = df[df["stream"] == "static"]
-    if len(df) == 0:
+    positions = get_catalog_index(catalog).group_positions(case, "mom6", "static")
+    if len(positions) == 0:
         raise ValueError(f"no static stream for {case} found in catalog")
-    ds_static = xr.open_dataset(df["path"].values[0])
+    ds_static = open_static_dataset(
+        case, catalog_rows(catalog, positions[:1])["path"].iloc[0]
+    )
     for varname in ds_static.data_vars:
         ds[varname] = ds_static[varname]
     for varname in ds.data_vars:
@@ -125,3 +131,25 @@ def postprocess_mom6(ds, catalog, case):
             if "yq" in dims:
                 ds[varname].attrs["coordinates"] = "geolat_c geolon_c"
     return ds
+
+
+def open_static_dataset(case, path):
+    """
+    return Dataset of static file for case, e.g., of MOM6's static stream
+    Datasets are cached, and reopened if the file's size or modification time
+    changes. A shallow copy is returned, so modifying its variables' attributes
+    does not modify the cached Dataset.
+    """
+    key = (case, path)
+    ds_static = _static_datasets.get(key)
+    if ds_static is None:
+        stats = file_stats([path])
+        ds_static = xr.open_dataset(path)
+        _static_datasets.put(key, [path], ds_static, stats)
+        ds_static = ds_static.copy()
+    return ds_static
+
+
+def clear_static_cache():
+    """remove and close all cached static Datasets, see open_static_dataset"""
+    _static_datasets.clear()
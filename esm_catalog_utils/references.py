@@ -0,0 +1,405 @@
+"""Kerchunk references to the data in netCDF files of catalogs."""
+
+import json
+import os
+import urllib.parse
+from os import PathLike
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import xarray as xr
+
+from ._optional_imports import import_optional
+from .catalog_gen import DATE_ORDINAL_MISSING, _get_esmcat_spec, date_ordinals
+from .compact_catalog import CompactCatalog
+from .dataset_cache import file_stats
+from .instrumentation import BuildReport
+
+# version of the kerchunk reference specification that is written
+REFERENCES_VERSION = 1
+
+# key of metadata about the referenced files, used in selecting from references
+_FILES_KEY = "esm_catalog_utils"
+
+# package extra that installs the dependencies of references
+_EXTRA = "references"
+
+# leading bytes of netCDF files in the classic formats, and of HDF5 files
+_CLASSIC_MAGIC = b"CDF"
+_HDF5_MAGIC = b"\x89HDF\r\n\x1a\n"
+
+
+def file_references(path: Union[str, PathLike]) -> Dict[str, Any]:
+    """
+    Return kerchunk references to the data of a netCDF file.
+
+    Files in the classic, 64-bit offset, and CDF-5 formats are translated
+    with ``kerchunk.netCDF3.NetCDF3ToZarr``, which requires scipy. Files in
+    the netCDF-4 format are translated with ``kerchunk.hdf.SingleHdf5ToZarr``,
+    which requires h5py.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of netCDF file.
+
+    Returns
+    -------
+    dict
+        References in the kerchunk version 1 format.
+
+    Raises
+    ------
+    ValueError
+        If the file's format is not supported.
+    ImportError
+        If kerchunk, or a dependency of it, is not installed.
+    """
+    with open(path, "rb") as fptr:
+        magic = fptr.read(len(_HDF5_MAGIC))
+    if magic.startswith(_CLASSIC_MAGIC):
+        netcdf3 = import_optional("kerchunk.netCDF3", _EXTRA)
+        return netcdf3.NetCDF3ToZarr(str(path)).translate()
+    if magic == _HDF5_MAGIC:
+        hdf = import_optional("kerchunk.hdf", _EXTRA)
+        return hdf.SingleHdf5ToZarr(str(path)).translate()
+    raise ValueError(f"{path}: format not supported by references")
+
+
+def group_references(
+    slices: Sequence[Sequence[str]], concat_dim: str = "time"
+) -> Dict[str, Any]:
+    """
+    Return references to the data of netCDF files, as one virtual Dataset.
+
+    References of the files of each slice are merged with
+    ``kerchunk.combine.merge_vars``, and slices are concatenated along
+    `concat_dim` with ``kerchunk.combine.MultiZarrToZarr``. Variables without
+    `concat_dim` are taken from the first slice.
+
+    Parameters
+    ----------
+    slices : sequence of sequence of str
+        Paths of files, in the order they are concatenated. The files of each
+        element of `slices` span the same values of `concat_dim`, e.g.,
+        timeseries files of different variables.
+    concat_dim : str, optional
+        Dimension that variables are concatenated along.
+
+    Returns
+    -------
+    dict
+        References in the kerchunk version 1 format. Its extra
+        ``"esm_catalog_utils"`` entry has `concat_dim`, and the path, size,
+        modification time, variables, and range of `concat_dim` of each file.
+
+    Raises
+    ------
+    ValueError
+        If a file is not supported, or the files of a slice have different
+        lengths of `concat_dim`.
+    ImportError
+        If kerchunk, or a dependency of it, is not installed.
+    """
+    combine = import_optional("kerchunk.combine", _EXTRA)
+    slice_refs: List[Dict[str, Any]] = []
+    files: List[Dict[str, Any]] = []
+    offset = 0
+    for slice_paths in slices:
+        file_refs = [file_references(path) for path in slice_paths]
+        lengths = {}
+        for path, refs, (size, mtime_ns) in zip(
+            slice_paths, file_refs, file_stats(slice_paths)
+        ):
+            lengths[path] = _dim_length(refs, concat_dim)
+            files.append(
+                {
+                    "path": path,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "variables": sorted(_variable_dims(refs)),
+                }
+            )
+        slice_lens = {length for length in lengths.values() if length is not None}
+        if len(slice_lens) > 1:
+            raise ValueError(f"lengths of {concat_dim} differ in {list(lengths)}")
+        slice_len = slice_lens.pop() if slice_lens else None
+        for file in files[len(files) - len(slice_paths) :]:
+            if lengths[file["path"]] is None or slice_len is None:
+                file["start"], file["stop"] = None, None
+            else:
+                file["start"], file["stop"] = offset, offset + slice_len
+        slice_refs.append(
+            file_refs[0] if len(file_refs) == 1 else combine.merge_vars(file_refs)
+        )
+        offset += slice_len or 0
+
+    if len(slice_refs) == 1:
+        references = slice_refs[0]
+    else:
+        identical_dims = [
+            name
+            for name, dims in _variable_dims(slice_refs[0]).items()
+            if concat_dim not in dims
+        ]
+        references = combine.MultiZarrToZarr(
+            slice_refs,
+            concat_dims=[concat_dim],
+            identical_dims=identical_dims,
+            remote_protocol="file",
+        ).translate()
+    references[_FILES_KEY] = {"concat_dim": concat_dim, "files": files}
+    return references
+
+
+def write_references(
+    catalog: Any,
+    directory: Union[str, PathLike],
+    concat_dim: Optional[str] = None,
+    report: Optional[BuildReport] = None,
+) -> List[str]:
+    """
+    Write references to the data of each group of aggregatable catalog rows.
+
+    Rows are grouped by the catalog's ``groupby_attrs``, and the references
+    of each group are written to a JSON file in `directory`, in the kerchunk
+    version 1 format. Passing `directory` as the *references* argument of
+    ``catalog_methods.catalog_sel_to_ds`` opens selections from a group as
+    one virtual Zarr Dataset, instead of opening each file. This is also
+    done by :py:func:`~esm_catalog_utils.case_metadata_to_esm_datastore`
+    when its `references_directory` argument is provided.
+
+    Requires kerchunk, see :py:func:`group_references`.
+
+    Parameters
+    ----------
+    catalog : esm_datastore or CompactCatalog
+        Catalog whose references are written.
+    directory : str or path-like
+        Directory that references are written to. It is created if it does
+        not exist.
+    concat_dim : str, optional
+        Dimension that variables are concatenated along. Default is the
+        dimension of the catalog's join_existing aggregation, or ``"time"``.
+    report : BuildReport, optional
+        If provided, groups whose references cannot be generated are skipped,
+        and recorded in its ``references_skipped``. Otherwise, a ValueError
+        is raised for them.
+
+    Returns
+    -------
+    list of str
+        Paths of written references.
+    """
+    groupby_attrs, default_concat_dim = _aggregation_attrs(catalog)
+    if concat_dim is None:
+        concat_dim = default_concat_dim
+    os.makedirs(directory, exist_ok=True)
+    df = catalog.to_df() if isinstance(catalog, CompactCatalog) else catalog.df
+    paths = []
+    for key, group_df in df.groupby(
+        groupby_attrs, dropna=False, observed=True, sort=False
+    ):
+        slices: Dict[Tuple[int, int], List[str]] = {}
+        for date_start, date_end, path in zip(
+            date_ordinals(group_df["date_start"].to_numpy(dtype=object)).tolist(),
+            date_ordinals(group_df["date_end"].to_numpy(dtype=object)).tolist(),
+            group_df["path"],
+        ):
+            slices.setdefault((date_start, date_end), []).append(path)
+        try:
+            references = group_references(
+                [slices[dates] for dates in sorted(slices, key=_slice_sort_key)],
+                concat_dim,
+            )
+        except ValueError as exc:
+            if report is None:
+                raise ValueError(f"references not generated for {key}: {exc}") from exc
+            report.references_skipped[".".join(map(str, key))] = str(exc)
+            continue
+        path = references_path(directory, key)
+        with open(path, "w") as fptr:
+            json.dump(references, fptr)
+        paths.append(path)
+    return paths
+
+
+def references_path(directory: Union[str, PathLike], key: Sequence[Any]) -> str:
+    """
+    Return path of references of a group of catalog rows.
+
+    Parameters
+    ----------
+    directory : str or path-like
+        Directory of references, as passed to :py:func:`write_references`.
+    key : sequence
+        Values of the catalog's ``groupby_attrs`` for the group.
+
+    Returns
+    -------
+    str
+        Path whose basename is the values of `key`, separated by ".". Values
+        are percent-encoded, including ".", so that different keys have
+        different paths.
+    """
+    basename = ".".join(
+        urllib.parse.quote(str(value), safe="").replace(".", "%2E") for value in key
+    )
+    return os.path.join(directory, basename + ".json")
+
+
+def catalog_references_path(
+    catalog: Any, directory: Union[str, PathLike], df: Any
+) -> Optional[str]:
+    """
+    Return path of references of the group containing rows of a catalog.
+
+    Parameters
+    ----------
+    catalog : esm_datastore or CompactCatalog
+        Catalog that rows are from.
+    directory : str or path-like
+        Directory of references, as passed to :py:func:`write_references`.
+    df : pandas.DataFrame
+        Rows of catalog.
+
+    Returns
+    -------
+    str or None
+        Path of references, if the rows are in a single group whose
+        references exist. None otherwise.
+    """
+    groupby_attrs, _ = _aggregation_attrs(catalog)
+    keys = df[groupby_attrs].drop_duplicates()
+    if len(keys) != 1:
+        return None
+    path = references_path(directory, keys.iloc[0].tolist())
+    return path if os.path.exists(path) else None
+
+
+def open_references(
+    references: Union[str, PathLike, Dict[str, Any]],
+    paths: Optional[Sequence[str]] = None,
+    drop_variables: Optional[List[str]] = None,
+) -> xr.Dataset:
+    """
+    Open references as a virtual Zarr Dataset.
+
+    The references are opened through fsspec's ``reference://`` filesystem
+    with xarray's zarr engine, which requires fsspec and zarr.
+
+    Parameters
+    ----------
+    references : str or path-like or dict
+        References, as returned by :py:func:`group_references`, or the path
+        of a JSON file of them.
+    paths : sequence of str, optional
+        Paths of referenced files to select. The Dataset has the variables of
+        these files, and the values of the concatenated dimension that they
+        span. By default, all files are selected.
+    drop_variables : list of str, optional
+        Variables to exclude from the Dataset.
+
+    Returns
+    -------
+    xarray.Dataset
+        Dataset, with CF conventions decoded, and non-index variables as dask
+        arrays, chunked like their references.
+
+    Raises
+    ------
+    ValueError
+        If a file of `paths` is not referenced, or a selected file's size or
+        modification time has changed since the references were generated.
+    ImportError
+        If fsspec or zarr is not installed.
+    """
+    import_optional("fsspec", _EXTRA)
+    import_optional("zarr", _EXTRA)
+    if isinstance(references, dict):
+        references_dict = references
+    else:
+        with open(references) as fptr:
+            references_dict = json.load(fptr)
+    concat_dim = references_dict[_FILES_KEY]["concat_dim"]
+    files = references_dict[_FILES_KEY]["files"]
+
+    if paths is not None:
+        files_by_path = {file["path"]: file for file in files}
+        missing = [path for path in paths if path not in files_by_path]
+        if missing:
+            raise ValueError(f"files not in references, e.g., {missing[0]}")
+        files = [files_by_path[path] for path in paths]
+    stats = file_stats([file["path"] for file in files])
+    for file, stat in zip(files, stats):
+        if stat != (file["size"], file["mtime_ns"]):
+            raise ValueError(f"{file['path']} changed since references were generated")
+
+    ds = xr.open_dataset(
+        "reference://",
+        engine="zarr",
+        chunks={},
+        consolidated=False,
+        storage_options={"fo": references_dict, "remote_protocol": "file"},
+        drop_variables=drop_variables,
+    )
+    if paths is None:
+        return ds
+
+    names = {name for file in files for name in file["variables"]}
+    ds = ds.drop_vars([name for name in ds.variables if name not in names])
+    if concat_dim in ds.dims:
+        inds = [
+            np.arange(file["start"], file["stop"])
+            for file in files
+            if file["start"] is not None
+        ]
+        ds = ds.isel(
+            {concat_dim: np.unique(np.concatenate([np.empty(0, dtype=int)] + inds))}
+        )
+    return ds
+
+
+def _variable_dims(references: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Return dimensions of variables in references, keyed by name."""
+    refs = references["refs"]
+    return {
+        key[: -len("/.zattrs")]: json.loads(refs[key]).get("_ARRAY_DIMENSIONS", [])
+        for key in refs
+        if key.endswith("/.zattrs")
+    }
+
+
+def _dim_length(references: Dict[str, Any], dim: str) -> Optional[int]:
+    """Return length of dimension in references, None if no variable has it."""
+    for name, dims in _variable_dims(references).items():
+        if dim in dims:
+            zarray = json.loads(references["refs"][f"{name}/.zarray"])
+            return zarray["shape"][dims.index(dim)]
+    return None
+
+
+def _slice_sort_key(dates: Tuple[int, int]) -> Tuple[bool, int, bool, int]:
+    """
+    Return key sorting slices by date ordinals of date_start, then date_end.
+
+    Slices with a missing date_start are put last, and, among slices with the
+    same date_start, slices with a missing date_end are put last.
+    """
+    date_start, date_end = dates
+    return (
+        date_start == DATE_ORDINAL_MISSING,
+        date_start,
+        date_end == DATE_ORDINAL_MISSING,
+        date_end,
+    )
+
+
+def _aggregation_attrs(catalog: Any) -> Tuple[List[str], str]:
+    """Return groupby_attrs, and the join_existing dimension, of a catalog."""
+    aggregation_control = _get_esmcat_spec(catalog).get("aggregation_control") or {}
+    concat_dim = "time"
+    for aggregation in aggregation_control.get("aggregations") or []:
+        if aggregation["type"] == "join_existing":
+            concat_dim = (aggregation.get("options") or {}).get("dim", concat_dim)
+    return list(aggregation_control.get("groupby_attrs") or []), concat_dim
@@ -6,6 +6,11 @@ setup(
     maintainer="Keith Lindsay",
     maintainer_email="klindsay@ucar.edu",
     description="utilities to support the usage of catalogs to access ESM output",
+    extras_require={
+        "hdf5": ["h5py"],
+        "parquet": ["pyarrow"],
+        "references": ["fsspec", "h5py", "kerchunk", "scipy", "zarr"],
+    },
     name="esm_catalog_utils",
     packages=find_packages(),
     url="https://github.com/klindsay28/esm_catalog_utils",
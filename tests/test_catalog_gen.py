@@ -1,17 +1,39 @@
 import ast
+import datetime
 import json
 import os.path
+import shutil
+import threading
+import time
 from os import PathLike
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
+import dask
 import intake_esm
+import numpy as np
 import pandas as pd
 import pytest
 from dask.distributed import Client
 from gen_test_input import gen_test_input
 from packaging import version
 
-from esm_catalog_utils import case_metadata_to_esm_datastore, date_parser
+from esm_catalog_utils import (
+    BuildReport,
+    case_metadata_to_esm_datastore,
+    cases_metadata_to_esm_datastore,
+    date_ordinals,
+    date_parser,
+    fill_file_attrs,
+    parse_file_cesm,
+    parse_path_cesm,
+)
+from esm_catalog_utils.catalog_gen import (
+    EsmcolColumns,
+    gen_esmcol_row,
+    get_nc_paths,
+    iter_nc_paths,
+)
+from esm_catalog_utils.instrumentation import BuildProgress
 
 
 def dict_cmp(d1: Dict, d2: Dict, ignore_keys: Optional[List[str]] = None) -> bool:
@@ -36,21 +58,24 @@ def read_catalog_csv(path: Union[str, PathLike]) -> pd.DataFrame:
     )
 
 
-@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize("backend", ["serial", "dask", "processes"])
 @pytest.mark.parametrize("incremental_catalog_gen", [False, True])
-# @pytest.mark.parametrize("parallel", [False])
-# @pytest.mark.parametrize("incremental_catalog_gen", [False])
-def test_gen_esmcol_files(parallel: bool, incremental_catalog_gen: bool) -> None:
+def test_gen_esmcol_files(backend: str, incremental_catalog_gen: bool) -> None:
     repo_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
     generated_dir = os.path.join(repo_root, "tests", "generated")
     baseline_dir = os.path.join(repo_root, "tests", "baselines")
 
     cases_metadata = gen_test_input(generated_dir)
 
-    if parallel:
+    if backend == "dask":
         # avoid threads because of
         # https://github.com/Unidata/netcdf4-python/issues/1192
         client = Client(n_workers=2, threads_per_worker=1)
+    backend_kwargs: Dict[str, Any] = {
+        "use_dask": backend == "dask",
+        "use_processes": backend == "processes",
+        "max_workers": 2,
+    }
 
     for case_metadata in cases_metadata:
         case = case_metadata["case"]
@@ -66,17 +91,17 @@ def test_gen_esmcol_files(parallel: bool, incremental_catalog_gen: bool) -> None
                 }
                 if dir_ind == 0:
                     esm_datastore = case_metadata_to_esm_datastore(
-                        case_metadata_subset, use_dask=parallel
+                        case_metadata_subset, **backend_kwargs
                     )
                 else:
                     esm_datastore = case_metadata_to_esm_datastore(
                         case_metadata_subset,
                         esm_datastore_in=esm_datastore,
-                        use_dask=parallel,
+                        **backend_kwargs,
                     )
         else:
             esm_datastore = case_metadata_to_esm_datastore(
-                case_metadata, use_dask=parallel
+                case_metadata, **backend_kwargs
             )
 
         # write esm_datastore object to disk
@@ -124,5 +149,423 @@ def test_gen_esmcol_files(parallel: bool, incremental_catalog_gen: bool) -> None
             baseline_dict[key] = baseline_dict[key].replace("REPO_ROOT", repo_root)
         assert dict_cmp(baseline_dict, generated_dict, ignore_keys=["last_updated"])
 
-    if parallel:
+    if backend == "dask":
         client.close()
+
+
+def get_nc_paths_os_walk(
+    dir_list: List[Union[str, PathLike]], case: str, exclude_dirs: List[str]
+) -> List[str]:
+    """reference implementation of get_nc_paths, using os.walk"""
+
+    paths = []
+    for dir in dir_list:
+        for root, dirs, files in os.walk(str(dir).rstrip(os.sep)):
+            if os.path.basename(root) in exclude_dirs:
+                continue
+            for file in files:
+                if file.startswith(case) and file.endswith(".nc"):
+                    paths.append(os.path.join(root, file))
+    paths.sort()
+    return paths
+
+
+def test_gen_esmcol_row(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esmcat_data = case_metadata_to_esm_datastore(case_metadata).df
+    column_names = esmcat_data.columns.tolist()
+    path = esmcat_data["path"].iloc[0]
+
+    row = gen_esmcol_row(
+        column_names, path, "case", parse_path_cesm, parse_file_cesm, {}
+    )
+    assert isinstance(row, dict)
+    assert list(row) == column_names
+    assert pd.Series(row).equals(esmcat_data.iloc[0].rename(None))
+
+    # rows are not generated for files with unchanged stat values
+    path_in_stat = {"size": os.stat(path).st_size}
+    assert (
+        gen_esmcol_row(
+            column_names, path, "case", parse_path_cesm, parse_file_cesm, path_in_stat
+        )
+        is None
+    )
+
+    # columns with few unique values are accumulated as codes, but have the
+    # dtypes of a DataFrame of generated rows
+    pd.testing.assert_series_equal(
+        esmcat_data.dtypes, pd.DataFrame([row], columns=column_names).dtypes
+    )
+    for key in ["case", "scomp", "component", "stream", "frequency"]:
+        assert not isinstance(esmcat_data[key].dtype, pd.CategoricalDtype)
+
+
+def test_esmcol_columns() -> None:
+    column_names = ["path", "case", "size", "stream", "varname"]
+    columns = EsmcolColumns(column_names)
+    columns.append("a.nc", "case", {"size": 1}, {"stream": "h0"}, {"varname": "T"})
+
+    # rows with missing columns are rejected before anything is appended
+    with pytest.raises(ValueError, match="unknown column name varname"):
+        columns.append("b.nc", "case", {"size": 2}, {"stream": "h1"}, {})
+    assert len(columns) == 1
+    assert columns.row(0) == {
+        "path": "a.nc",
+        "case": "case",
+        "size": 1,
+        "stream": "h0",
+        "varname": "T",
+    }
+    assert len(columns.to_df()) == 1
+
+    # missing columns are None when fill_missing is True
+    columns = EsmcolColumns(column_names, fill_missing=True)
+    columns.append("a.nc", "case", {"size": 1}, {"stream": "h0"}, {})
+    columns.append("b.nc", "case", {"size": 2}, {}, {"varname": "T"})
+    rows = [
+        {"path": "a.nc", "case": "case", "size": 1, "stream": "h0", "varname": None},
+        {"path": "b.nc", "case": "case", "size": 2, "stream": None, "varname": "T"},
+    ]
+    assert [columns.row(ind) for ind in range(len(columns))] == rows
+    pd.testing.assert_frame_equal(columns.to_df(), pd.DataFrame(rows))
+
+
+def test_get_nc_paths(tmp_path) -> None:
+    case = "case"
+    fnames = [
+        "atm/hist/case.cam.h0.0001-01.nc",
+        "atm/hist/case.cam.h0.0001-02.nc",
+        "atm/hist/other.cam.h0.0001-01.nc",
+        "atm/hist/case.cam.h0.0001-01.nc.tmp",
+        "atm/rest/case.cam.r.0001-01-01-00000.nc",
+        "atm/rest/0002-01-01-00000/case.cam.r.0002-01-01-00000.nc",
+        "ocn/hist/case.pop.h.0001-01.nc",
+        "ocn/hist/nested/deeper/case.pop.h.nday1.0001-01-01.nc",
+        "ocn/tseries/case.pop.h.TEMP.000101-000112.nc",
+    ]
+    for fname in fnames:
+        path = tmp_path / fname
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    (tmp_path / "ocn" / "hist" / "link").symlink_to(tmp_path / "atm" / "hist")
+
+    dir_list: List[Union[str, PathLike]] = [
+        tmp_path / "atm",
+        str(tmp_path / "ocn") + os.sep,
+    ]
+    for exclude_dirs in [[], ["rest"], ["rest", "tseries"]]:
+        expected = get_nc_paths_os_walk(dir_list, case, exclude_dirs)
+        for max_workers in [None, 1, 4]:
+            assert get_nc_paths(dir_list, case, exclude_dirs, max_workers) == expected
+            paths_iter = iter_nc_paths(dir_list, case, exclude_dirs, max_workers)
+            assert sorted(paths_iter) == expected
+
+
+def test_incremental_update(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esm_datastore = case_metadata_to_esm_datastore(case_metadata, track_mtime=True)
+    df = esm_datastore.df
+    assert {"mtime", "inode"} <= set(df.columns)
+
+    # rewrite a file without changing its size, remove a file, add a file
+    path_rewrite, path_remove = df["path"].iloc[0], df["path"].iloc[1]
+    shutil.copyfile(df["path"].iloc[2], path_rewrite)
+    os.remove(path_remove)
+    path_add = path_remove.replace(".nc", "_copy.nc")
+    shutil.copyfile(df["path"].iloc[3], path_add)
+
+    parsed_paths = []
+
+    def file_parser(path):
+        parsed_paths.append(path)
+        return parse_file_cesm(path)
+
+    df_updated = case_metadata_to_esm_datastore(
+        case_metadata, file_parser=file_parser, esm_datastore_in=esm_datastore
+    ).df
+    assert sorted(parsed_paths) == sorted([path_rewrite, path_add])
+    assert not df_updated["path"].duplicated().any()
+    assert path_remove not in set(df_updated["path"])
+
+    # rewritten row is replaced in place, added row is appended
+    assert df_updated["path"].iloc[0] == path_rewrite
+    assert df_updated["path"].iloc[-1] == path_add
+
+    df_expected = case_metadata_to_esm_datastore(case_metadata, track_mtime=True).df
+    df_updated = df_updated.sort_values("path", ignore_index=True)
+    assert df_updated.equals(df_expected)
+
+
+def test_incremental_update_duplicated_paths(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esm_datastore = case_metadata_to_esm_datastore(case_metadata)
+    df_expected = esm_datastore.df
+
+    # catalogs that rows were appended to can have duplicated paths, of which
+    # the last row is the most recent one
+    df_stale = df_expected.iloc[[0]].assign(size=0)
+    esm_datastore = intake_esm.esm_datastore(
+        {
+            "esmcat": esm_datastore.esmcat.dict(),
+            "df": pd.concat([df_stale, df_expected], ignore_index=True),
+        }
+    )
+
+    parsed_paths = []
+
+    def file_parser(path):
+        parsed_paths.append(path)
+        return parse_file_cesm(path)
+
+    df_updated = case_metadata_to_esm_datastore(
+        case_metadata, file_parser=file_parser, esm_datastore_in=esm_datastore
+    ).df
+    assert parsed_paths == []
+    assert df_updated.equals(df_expected)
+
+
+def test_path_only(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esmcat_data_expected = case_metadata_to_esm_datastore(case_metadata).df
+
+    esm_datastore_path_only = case_metadata_to_esm_datastore(
+        case_metadata, file_parser=None
+    )
+    esmcat_data = esm_datastore_path_only.df
+    file_columns = ["frequency", "date_start", "date_end", "varname"]
+    assert esmcat_data[file_columns].isna().all(axis=None)
+    other_columns = [key for key in esmcat_data.columns if key not in file_columns]
+    assert esmcat_data[other_columns].equals(esmcat_data_expected[other_columns])
+
+    parsed_paths = []
+
+    def file_parser(path):
+        parsed_paths.append(path)
+        return parse_file_cesm(path)
+
+    # only files for rows with missing entries are parsed
+    esm_datastore_filled = fill_file_attrs(
+        esm_datastore_path_only, file_parser=file_parser
+    )
+    assert esm_datastore_filled.df.equals(esmcat_data_expected)
+    assert parsed_paths == esmcat_data["path"].tolist()
+
+    parsed_paths.clear()
+    esm_datastore_filled = fill_file_attrs(
+        esm_datastore_filled, file_parser=file_parser
+    )
+    assert esm_datastore_filled.df.equals(esmcat_data_expected)
+    assert parsed_paths == []
+
+
+def test_infer_from_datestrings(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esmcat_data_expected = case_metadata_to_esm_datastore(case_metadata).df
+
+    # remove a file from one stream, so that its entries cannot be inferred
+    stream_rows = esmcat_data_expected.index[
+        (esmcat_data_expected["scomp"] == "cam")
+        & (esmcat_data_expected["stream"] == "h0")
+    ]
+    os.remove(esmcat_data_expected["path"].iloc[stream_rows[5]])
+    esmcat_data_expected = esmcat_data_expected.drop(stream_rows[5]).reset_index(
+        drop=True
+    )
+
+    parsed_paths = []
+
+    def file_parser(path):
+        parsed_paths.append(path)
+        return parse_file_cesm(path)
+
+    esm_datastore_path_only = case_metadata_to_esm_datastore(
+        case_metadata, file_parser=None
+    )
+    esmcat_data = fill_file_attrs(
+        esm_datastore_path_only,
+        file_parser=file_parser,
+        infer_from_datestrings=True,
+        sample_size=4,
+    ).df
+    assert esmcat_data.equals(esmcat_data_expected)
+
+    # 4 files are parsed for each of the other 3 streams
+    n_streams = esmcat_data.groupby(["scomp", "stream"]).ngroups
+    assert len(parsed_paths) == len(stream_rows) - 1 + 4 * (n_streams - 1)
+
+
+@pytest.mark.parametrize("backend", ["serial", "dask", "processes"])
+def test_report_callback(tmp_path, backend: str) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esmcat_data_expected = case_metadata_to_esm_datastore(case_metadata).df
+
+    if backend == "dask":
+        client = Client(n_workers=2, threads_per_worker=1)
+    reports: List[BuildReport] = []
+    esmcat_data = case_metadata_to_esm_datastore(
+        case_metadata,
+        use_dask=backend == "dask",
+        use_processes=backend == "processes",
+        max_workers=2,
+        report_callback=reports.append,
+    ).df
+    if backend == "dask":
+        client.close()
+    assert esmcat_data.equals(esmcat_data_expected)
+
+    assert len(reports) == 1
+    report = reports[0]
+    assert sorted(report.file_times) == esmcat_data["path"].tolist()
+    for key in ["scan_and_parse", "scan", "concat", "esm_datastore"]:
+        assert key in report.wall_times
+    for key in ["stat", "path_parser", "file_parser", "netcdf_open", "num2date"]:
+        assert report.phase_times[key] > 0.0
+    assert report.phase_times["netcdf_open"] < report.phase_times["file_parser"]
+
+    counts, _ = report.latency_histogram()
+    assert counts.sum() == len(esmcat_data)
+    slowest = report.slowest_files(3)
+    assert len(slowest) == 3
+    assert slowest[0][1] == max(report.file_times.values())
+    report_dict = report.to_dict(n_slowest=3)
+    assert report_dict["n_files"] == len(esmcat_data)
+    json.dumps(report_dict)
+
+
+@pytest.mark.parametrize("backend", ["serial", "dask", "processes"])
+def test_cases_metadata_to_esm_datastore(tmp_path, backend: str) -> None:
+    cases_metadata = [
+        gen_test_input(tmp_path / case, case)[0] for case in ["ens.001", "ens.002"]
+    ]
+    esmcat_data_expected = [
+        case_metadata_to_esm_datastore(case_metadata).df
+        for case_metadata in cases_metadata
+    ]
+
+    if backend == "dask":
+        client = Client(n_workers=2, threads_per_worker=1)
+    kwargs: Dict[str, Any] = {
+        "use_dask": backend == "dask",
+        "use_processes": backend == "processes",
+        "max_workers": 2,
+    }
+    progress: List[BuildProgress] = []
+    reports: List[BuildReport] = []
+    esm_datastore = cases_metadata_to_esm_datastore(
+        cases_metadata,
+        progress_callback=progress.append,
+        report_callback=reports.append,
+        **kwargs,
+    )
+    esm_datastores = cases_metadata_to_esm_datastore(
+        cases_metadata, combine=False, **kwargs
+    )
+    if backend == "dask":
+        client.close()
+
+    assert isinstance(esm_datastore, intake_esm.esm_datastore)
+    assert isinstance(esm_datastores, dict)
+    pd.testing.assert_frame_equal(
+        esm_datastore.df, pd.concat(esmcat_data_expected, ignore_index=True)
+    )
+    assert list(esm_datastores) == ["ens.001", "ens.002"]
+    for esm_datastore_case, esmcat_data in zip(
+        esm_datastores.values(), esmcat_data_expected
+    ):
+        pd.testing.assert_frame_equal(esm_datastore_case.df, esmcat_data)
+
+    n_files = len(esm_datastore.df)
+    assert [p.n_files_parsed for p in progress] == sorted(
+        p.n_files_parsed for p in progress
+    )
+    assert progress[-1].n_files_parsed == progress[-1].n_files_found == n_files
+    assert progress[-1].scan_complete
+    assert {p.case for p in progress} == {"ens.001", "ens.002"}
+    assert len(reports) == 1
+    assert len(reports[0].file_times) == n_files
+
+    with pytest.raises(ValueError, match="unique"):
+        cases_metadata_to_esm_datastore(cases_metadata * 2)
+
+
+def test_date_ordinals() -> None:
+    dates = [
+        datetime.date(1, 1, 1),
+        datetime.date(1, 12, 31),
+        datetime.date(4, 2, 29),
+        datetime.date(100, 3, 1),
+        datetime.date(400, 2, 29),
+        datetime.date(1677, 9, 21),
+        datetime.date(2000, 2, 29),
+        datetime.date(9999, 12, 31),
+    ]
+    expected = [date.toordinal() for date in dates]
+    assert date_ordinals([date.isoformat() for date in dates]).tolist() == expected
+    assert date_ordinals(np.array(dates, dtype=object)).tolist() == expected
+
+    # pandas and numpy dates
+    timestamps = pd.to_datetime(["1677-09-22", "2000-02-29", "2262-04-11"])
+    expected = [date.toordinal() for date in timestamps.date]
+    assert date_ordinals(timestamps).tolist() == expected
+    assert date_ordinals(timestamps.to_numpy()).tolist() == expected
+    assert date_ordinals(list(timestamps)).tolist() == expected
+    assert date_ordinals(list(timestamps.to_numpy())).tolist() == expected
+
+    # missing values, and years beyond 9999
+    missing = int(np.iinfo(np.int64).min)
+    actual = date_ordinals(
+        ["0001-01-01", None, float("nan"), pd.NaT, np.datetime64("NaT"), "10000-01-01"]
+    )
+    assert actual.tolist() == [1, missing, missing, missing, missing, 3652060]
+    assert date_ordinals(pd.to_datetime(["2000-01-01", "NaT"])).tolist() == [
+        730120,
+        missing,
+    ]
+    assert date_ordinals([]).tolist() == []
+
+    invalid = ["", "0001-02-29", "0100-02-29", "0001-13-01", "0001-01-00", "1-1-x"]
+    for value in invalid:
+        with pytest.raises(ValueError):
+            date_ordinals([value])
+        with pytest.raises(ValueError):
+            date_ordinals(["0001-01-01", value])
+    unsupported: List[Any] = [1, 1.5, b"0001-01-01", ["0001-01-01"]]
+    for unsupported_value in unsupported:
+        with pytest.raises(TypeError):
+            date_ordinals(["0001-01-01", unsupported_value])
+
+
+def test_dask_without_client(tmp_path) -> None:
+    # files are not parsed, as netCDF4 does not support concurrent access
+    # from threads
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esmcat_data_expected = case_metadata_to_esm_datastore(
+        case_metadata, file_parser=None
+    ).df
+
+    # record the largest number of paths being parsed at the same time
+    lock = threading.Lock()
+    n_active = [0]
+    max_n_active = [0]
+
+    def path_parser(path, case):
+        with lock:
+            n_active[0] += 1
+            max_n_active[0] = max(max_n_active[0], n_active[0])
+        time.sleep(0.01)
+        with lock:
+            n_active[0] -= 1
+        return parse_path_cesm(path, case)
+
+    # without a distributed client, chunks are computed concurrently
+    with dask.config.set(scheduler="threads", num_workers=4):
+        esmcat_data = case_metadata_to_esm_datastore(
+            case_metadata,
+            path_parser=path_parser,
+            file_parser=None,
+            use_dask=True,
+            chunksize=4,
+        ).df
+    assert esmcat_data.equals(esmcat_data_expected)
+    assert max_n_active[0] > 1
@@ -0,0 +1,240 @@
+import datetime
+import gc
+import itertools
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import case_metadata_to_esm_datastore, write_varname_index
+from esm_catalog_utils.catalog_index import (
+    CatalogIndex,
+    VarnameIndex,
+    _catalog_indexes,
+    get_catalog_index,
+    varname_index_path,
+)
+from esm_catalog_utils.catalog_methods import catalog_sel_to_df
+
+
+def catalog_sel_to_df_scan(
+    df: pd.DataFrame, date_range: List[Any], case, scomp, stream, varname
+) -> Optional[pd.DataFrame]:
+    """reference implementation of catalog_sel_to_df, scanning the catalog"""
+    date_mask = (
+        (df["date_start"] < date_range[1]) & (df["date_end"] > date_range[0])
+    ) | (df["date_start"] == df["date_end"])
+    df = df[date_mask]
+    df = df[df["case"] == case]
+    df = df[df["scomp"] == scomp]
+    df = df[df["stream"] == stream]
+    inds = [
+        ind
+        for ind, varnames in enumerate(df["varname"])
+        if varname in ([varnames] if isinstance(varnames, str) else varnames)
+    ]
+    if len(inds) == 0:
+        return None
+    return df.iloc[inds]
+
+
+class Catalog:
+    """minimal stand-in for esm_datastore"""
+
+    def __init__(self, df: pd.DataFrame, catalog_file: Optional[str] = None) -> None:
+        self.df = df
+        self.esmcat = SimpleNamespace(catalog_file=catalog_file)
+
+
+def check_sel(catalog: Any, date_range: List[Any], *args: str) -> None:
+    expected = catalog_sel_to_df_scan(catalog.df, date_range, *args)
+    actual = catalog_sel_to_df(catalog, date_range, *args)
+    if expected is None:
+        assert actual is None
+    else:
+        assert actual.equals(expected)
+
+
+def test_catalog_sel_to_df(tmp_path) -> None:
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata)
+        years = [1, 2, 3, 5]
+        for year_lo, year_hi in itertools.combinations(years, 2):
+            for month in [1, 2, 7]:
+                date_range = [
+                    datetime.date(year_lo, month, 1),
+                    datetime.date(year_hi, month, 15),
+                ]
+                for scomp, comp in [("cam", "atm"), ("clm2", "lnd")]:
+                    for stream in ["h0", "h1", "h2"]:
+                        for varname in [f"{comp}_var1", f"{comp}_var3", "var1"]:
+                            check_sel(
+                                catalog, date_range, "case", scomp, stream, varname
+                            )
+        check_sel(catalog, [datetime.date(1, 1, 1)] * 2, "case", "cam", "h0", "x")
+        check_sel(catalog, [datetime.date(1, 1, 1)] * 2, "other", "cam", "h0", "x")
+
+
+def test_catalog_sel_to_df_date_strings(tmp_path) -> None:
+    # catalogs read without date converters have dates that are strings
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata)
+        df = catalog.df.copy()
+        for column in ["date_start", "date_end"]:
+            df[column] = [date.isoformat() for date in df[column]]
+        catalog_str = Catalog(df)
+        for date_range in [
+            [datetime.date(1, 6, 1), datetime.date(3, 1, 15)],
+            ["0001-06-01", "0003-01-15"],
+        ]:
+            for varname in ["atm_var1", "lnd_var3"]:
+                scomp = "cam" if varname.startswith("atm") else "clm2"
+                args = ("case", scomp, "h0", varname)
+                expected = catalog_sel_to_df(catalog, date_range, *args)
+                actual = catalog_sel_to_df(catalog_str, date_range, *args)
+                assert actual.index.tolist() == expected.index.tolist()
+
+
+def test_overlapping_static_missing() -> None:
+    # rows with overlapping dates, equal dates, and missing dates
+    date_ranges = [
+        (datetime.date(1, 1, 1), datetime.date(10, 1, 1)),
+        (datetime.date(2, 1, 1), datetime.date(3, 1, 1)),
+        (datetime.date(3, 1, 1), datetime.date(4, 1, 1)),
+        (datetime.date(5, 1, 1), datetime.date(5, 1, 1)),
+        (None, None),
+        (datetime.date(4, 1, 1), datetime.date(6, 1, 1)),
+    ]
+    varnames = [["a", "b"], ["a"], ["b"], ["a", "b"], ["a"], "a"]
+    df = pd.DataFrame(
+        {
+            "case": "case",
+            "scomp": "mom6",
+            "stream": "h",
+            "date_start": pd.Series([dr[0] for dr in date_ranges], dtype=object),
+            "date_end": pd.Series([dr[1] for dr in date_ranges], dtype=object),
+            "varname": pd.Series(varnames, dtype=object),
+        },
+        index=np.arange(len(varnames)) * 10,
+    )
+    catalog = Catalog(df)
+    for year_lo, year_hi in itertools.combinations(range(12), 2):
+        date_range = [datetime.date(year_lo + 1, 1, 1), datetime.date(year_hi, 6, 1)]
+        for varname in ["a", "b", "c"]:
+            check_sel(catalog, date_range, "case", "mom6", "h", varname)
+
+
+def test_get_catalog_index() -> None:
+    df = pd.DataFrame(
+        {
+            "case": ["case"],
+            "scomp": ["cam"],
+            "stream": ["h0"],
+            "date_start": [datetime.date(1, 1, 1)],
+            "date_end": [datetime.date(1, 2, 1)],
+            "varname": [["a"]],
+        }
+    )
+    catalog = Catalog(df)
+    catalog_index = get_catalog_index(catalog)
+    assert isinstance(catalog_index, CatalogIndex)
+    assert get_catalog_index(catalog) is catalog_index
+
+    # index is rebuilt if the DataFrame is replaced
+    df_b = df.copy()
+    df_b["varname"] = pd.Series([["b"]], dtype=object)
+    catalog.df = pd.concat([df, df_b], ignore_index=True)
+    assert get_catalog_index(catalog) is not catalog_index
+    date_range = (datetime.date(1, 1, 1), datetime.date(2, 1, 1))
+    positions = get_catalog_index(catalog).select(date_range, "case", "cam", "h0", "b")
+    assert positions.tolist() == [1]
+
+    # index is dropped when the catalog is garbage collected
+    key = id(catalog)
+    assert key in _catalog_indexes
+    del catalog
+    gc.collect()
+    assert key not in _catalog_indexes
+
+
+def test_varname_index(tmp_path, monkeypatch) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    esm_datastore = case_metadata_to_esm_datastore(case_metadata)
+    df = esm_datastore.df
+
+    varname_index = VarnameIndex.from_df(df)
+    for varname in ["atm_var1", "lnd_var2", "var1"]:
+        expected = [ind for ind, entry in enumerate(df["varname"]) if varname in entry]
+        assert varname_index.rows_of(varname).tolist() == expected
+
+    esm_datastore.serialize(name="case", directory=tmp_path, catalog_type="file")
+    path = write_varname_index(esm_datastore, "case", tmp_path)
+    assert path == varname_index_path(f"file://{tmp_path}/case.csv")
+    assert path == varname_index_path(f"{tmp_path}/case.csv.gz")
+
+    # varname index is read, instead of built, for catalogs read from csv files
+    def from_df(df: pd.DataFrame) -> VarnameIndex:
+        raise AssertionError("varname index built")
+
+    catalog = Catalog(df.copy(), f"{tmp_path}/case.csv")
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(VarnameIndex, "from_df", from_df)
+        catalog_index = get_catalog_index(catalog)
+    assert catalog_index.varname_index.varnames.tolist() == sorted(
+        varname_index.varnames
+    )
+    check_sel(
+        catalog,
+        [datetime.date(1, 6, 1), datetime.date(3, 1, 1)],
+        "case",
+        "cam",
+        "h0",
+        "atm_var2",
+    )
+
+    # varname index for a catalog with the same paths, but different varnames,
+    # is not used
+    df_renamed = df.copy()
+    df_renamed["varname"] = [
+        [varname.replace("atm_var2", "atm_var3") for varname in entry]
+        for entry in df["varname"]
+    ]
+    catalog = Catalog(df_renamed, f"{tmp_path}/case.csv")
+    with pytest.raises(ValueError):
+        VarnameIndex.read(path, catalog.df)
+    for varname in ["atm_var2", "atm_var3"]:
+        check_sel(
+            catalog,
+            [datetime.date(1, 6, 1), datetime.date(3, 1, 1)],
+            "case",
+            "cam",
+            "h0",
+            varname,
+        )
+    assert (
+        catalog_sel_to_df(
+            catalog,
+            [datetime.date(1, 6, 1), datetime.date(3, 1, 1)],
+            "case",
+            "cam",
+            "h0",
+            "atm_var2",
+        )
+        is None
+    )
+
+    # varname index for a different catalog is not used
+    catalog = Catalog(df.iloc[1:].reset_index(drop=True), f"{tmp_path}/case.csv")
+    with pytest.raises(ValueError):
+        VarnameIndex.read(path, catalog.df)
+    check_sel(
+        catalog,
+        [datetime.date(1, 6, 1), datetime.date(3, 1, 1)],
+        "case",
+        "clm2",
+        "h1",
+        "lnd_var2",
+    )
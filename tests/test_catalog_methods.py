@@ -0,0 +1,76 @@
+import datetime
+
+import xarray as xr
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import case_metadata_to_esm_datastore
+from esm_catalog_utils.catalog_methods import (
+    catalog_sel_to_df,
+    catalog_sel_to_ds,
+    catalog_sel_to_ds_dict,
+)
+
+
+def test_catalog_sel_to_ds_varnames(tmp_path, monkeypatch) -> None:
+    open_mfdataset_calls = []
+
+    def open_mfdataset(paths, **kwargs):
+        open_mfdataset_calls.append(paths)
+        return xr_open_mfdataset(paths, **kwargs)
+
+    xr_open_mfdataset = xr.open_mfdataset
+    monkeypatch.setattr(xr, "open_mfdataset", open_mfdataset)
+
+    date_range = [datetime.date(1, 6, 1), datetime.date(3, 1, 1)]
+    varnames = ["atm_var1", "atm_var3", "missing_var"]
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata)
+        args = (catalog, date_range, "case", "cam", "h0")
+
+        # rows are the union of rows for each varname
+        df = catalog_sel_to_df(*args, varnames)
+        paths = set()
+        for varname in varnames:
+            df_varname = catalog_sel_to_df(*args, varname)
+            if df_varname is not None:
+                paths.update(df_varname["path"])
+        assert sorted(df["path"]) == sorted(paths)
+        assert catalog_sel_to_df(*args, ["missing_var"]) is None
+
+        # files are opened once for all varnames
+        open_mfdataset_calls.clear()
+        ds = catalog_sel_to_ds(*args, varnames)
+        assert open_mfdataset_calls == [df["path"].to_list()]
+        for varname in varnames[:2]:
+            ds_varname = catalog_sel_to_ds(*args, varname)
+            assert ds[varname].equals(ds_varname[varname])
+
+        open_mfdataset_calls.clear()
+        ds_dict = catalog_sel_to_ds_dict(*args, varnames)
+        assert len(open_mfdataset_calls) == 1
+        assert list(ds_dict) == varnames
+        assert ds_dict["missing_var"] is None
+        assert "atm_var1" in ds_dict["atm_var1"]
+        assert "atm_var3" not in ds_dict["atm_var1"]
+        assert ds_dict["atm_var3"]["atm_var3"].equals(ds["atm_var3"])
+
+
+def test_catalog_sel_to_ds_metadata(tmp_path, monkeypatch) -> None:
+    def open_dataset(*args, **kwargs):
+        raise AssertionError("open_dataset called")
+
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    date_range = [datetime.date(1, 6, 1), datetime.date(3, 1, 1)]
+    args = (catalog, date_range, "case", "clm2", "h1", "lnd_var1")
+    path0 = catalog_sel_to_df(*args)["path"].iloc[0]
+    ds0 = xr.open_dataset(path0)
+
+    # metadata of 1st file is propagated without reopening it
+    monkeypatch.setattr(xr, "open_dataset", open_dataset)
+    ds = catalog_sel_to_ds(*args)
+    assert ds.attrs == ds0.attrs
+    assert ds.encoding["unlimited_dims"] == ds0.encoding["unlimited_dims"]
+    # encodings are propagated for data_vars and time
+    for var in [*ds0.data_vars, "time"]:
+        assert ds[var].encoding == ds0[var].encoding
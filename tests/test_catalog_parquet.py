@@ -0,0 +1,57 @@
+import sys
+
+import pandas as pd
+import pytest
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import (
+    case_metadata_to_esm_datastore,
+    read_catalog_parquet,
+    write_catalog_parquet,
+)
+from esm_catalog_utils.catalog_gen import _get_esmcat_spec
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"file_parser": None}, {"track_mtime": True}])
+def test_catalog_parquet(tmp_path, kwargs) -> None:
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata, **kwargs)
+        path = write_catalog_parquet(catalog, "case", tmp_path)
+        assert path == str(tmp_path / "case.parquet")
+
+        catalog_read = read_catalog_parquet(path)
+        pd.testing.assert_frame_equal(catalog_read.df, catalog.df)
+        assert _get_esmcat_spec(catalog_read) == _get_esmcat_spec(catalog)
+
+        # columns needed by the catalog are read, in addition to columns
+        catalog_read = read_catalog_parquet(path, columns=["size"])
+        columns = ["case", "scomp", "component", "path", "stream", "frequency"]
+        columns += ["varname", "size"]
+        assert catalog_read.df.columns.tolist() == columns
+        pd.testing.assert_frame_equal(catalog_read.df, catalog.df[columns])
+
+
+def test_catalog_parquet_types(tmp_path) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    schema = pq.read_schema(write_catalog_parquet(catalog, "case", tmp_path))
+    assert schema.field("varname").type == pa.list_(pa.string())
+    assert schema.field("date_start").type == pa.date32()
+    assert schema.field("stream").type == pa.dictionary(pa.int32(), pa.string())
+
+
+def test_catalog_parquet_missing_pyarrow(tmp_path, monkeypatch) -> None:
+    catalog = case_metadata_to_esm_datastore(gen_test_input(tmp_path / "case")[0])
+    path = write_catalog_parquet(catalog, "case", tmp_path)
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match=r"esm_catalog_utils\[parquet\]"):
+        write_catalog_parquet(catalog, "other", tmp_path)
+    with pytest.raises(ImportError, match=r"esm_catalog_utils\[parquet\]"):
+        read_catalog_parquet(path)
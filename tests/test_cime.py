@@ -0,0 +1,174 @@
+import os
+import stat
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from esm_catalog_utils import caseroot_to_case_metadata
+from esm_catalog_utils.cime import case_xml_value, cime_xmlquery
+
+ENV_CASE_XML = """<?xml version="1.0"?>
+<file id="env_case.xml" version="2.0">
+  <header>These variables CANNOT BE CHANGED once a case has been created.</header>
+  <group id="case_def">
+    <entry id="CASE" value="b.e21.test">
+      <type>char</type>
+      <desc>case name</desc>
+    </entry>
+    <entry id="CIME_OUTPUT_ROOT" value="{output_root}">
+      <type>char</type>
+    </entry>
+    <entry id="COMP_CLASSES" value="CPL,ATM,LND,ICE,OCN">
+      <type>char</type>
+    </entry>
+  </group>
+</file>
+"""
+
+ENV_RUN_XML = """<?xml version="1.0"?>
+<file id="env_run.xml" version="2.0">
+  <group id="run_desc">
+    <entry id="RUNDIR" value="$CIME_OUTPUT_ROOT/$CASE/run">
+      <type>char</type>
+    </entry>
+    <entry id="HOME_DIR" value="$ENV{{HOME}}/cases">
+      <type>char</type>
+    </entry>
+    <entry id="UNDEFINED_ENV" value="$ENV{{ESM_CATALOG_UTILS_UNDEFINED}}">
+      <type>char</type>
+    </entry>
+    <entry id="FROM_SHELL" value="$SHELL{{echo x}}">
+      <type>char</type>
+    </entry>
+    <entry id="CYCLE_A" value="$CYCLE_B">
+      <type>char</type>
+    </entry>
+    <entry id="CYCLE_B" value="$CYCLE_A">
+      <type>char</type>
+    </entry>
+    <entry id="UNDEFINED_REF" value="$ESM_CATALOG_UTILS_UNDEFINED/x">
+      <type>char</type>
+    </entry>
+    <entry id="NTASKS">
+      <type>integer</type>
+      <values>
+        <value compclass="ATM">36</value>
+        <value compclass="LND">36</value>
+      </values>
+    </entry>
+  </group>
+  <group id="archive">
+    <entry id="DOUT_S" value="{dout_s}">
+      <type>logical</type>
+    </entry>
+    <entry id="DOUT_S_ROOT" value="${{CIME_OUTPUT_ROOT}}/archive/${{CASE}}">
+      <type>char</type>
+    </entry>
+  </group>
+</file>
+"""
+
+XMLQUERY = """#!/bin/sh
+# stand-in for CIME's xmlquery, which echoes the queried variable
+for arg; do :; done
+printf "xmlquery_%s" "$arg"
+"""
+
+
+def write_caseroot(caseroot, output_root, dout_s="TRUE") -> None:
+    os.makedirs(caseroot, exist_ok=True)
+    with open(os.path.join(caseroot, "env_case.xml"), "w") as fptr:
+        fptr.write(ENV_CASE_XML.format(output_root=output_root))
+    with open(os.path.join(caseroot, "env_run.xml"), "w") as fptr:
+        fptr.write(ENV_RUN_XML.format(dout_s=dout_s))
+    xmlquery_path = os.path.join(caseroot, "xmlquery")
+    with open(xmlquery_path, "w") as fptr:
+        fptr.write(XMLQUERY)
+    os.chmod(xmlquery_path, os.stat(xmlquery_path).st_mode | stat.S_IXUSR)
+
+
+def test_case_xml_value(tmp_path, monkeypatch) -> None:
+    caseroot = str(tmp_path / "caseroot")
+    output_root = str(tmp_path / "scratch")
+    write_caseroot(caseroot, output_root)
+    monkeypatch.setenv("HOME", "/home/user")
+
+    assert case_xml_value(caseroot, "CASE") == "b.e21.test"
+    assert case_xml_value(caseroot, "RUNDIR") == f"{output_root}/b.e21.test/run"
+    assert case_xml_value(caseroot, "DOUT_S_ROOT") == (
+        f"{output_root}/archive/b.e21.test"
+    )
+    assert case_xml_value(caseroot, "HOME_DIR") == "/home/user/cases"
+    assert case_xml_value(caseroot, "UNDEFINED_REF") == (
+        "$ESM_CATALOG_UTILS_UNDEFINED/x"
+    )
+
+    # only $ENV{} references are resolved from the environment
+    with monkeypatch.context() as mpatch:
+        mpatch.setenv("ESM_CATALOG_UTILS_UNDEFINED", "/defined")
+        assert case_xml_value(caseroot, "UNDEFINED_ENV") == "/defined"
+        assert case_xml_value(caseroot, "UNDEFINED_REF") == (
+            "$ESM_CATALOG_UTILS_UNDEFINED/x"
+        )
+
+    # values that cannot be determined from the files
+    for varname in [
+        "UNDEFINED_ENV",
+        "FROM_SHELL",
+        "CYCLE_A",
+        "NTASKS",
+        "NOT_A_VARIABLE",
+    ]:
+        assert case_xml_value(caseroot, varname) is None
+    assert case_xml_value(tmp_path, "CASE") is None
+
+
+def test_case_xml_value_cache(tmp_path, monkeypatch) -> None:
+    caseroot = str(tmp_path / "caseroot")
+    write_caseroot(caseroot, str(tmp_path / "scratch"))
+    assert case_xml_value(caseroot, "CASE") == "b.e21.test"
+
+    # files are not parsed again while they are unchanged
+    def parse(*args):
+        raise AssertionError("file parsed")
+
+    with monkeypatch.context() as mpatch:
+        mpatch.setattr(ET, "parse", parse)
+        assert case_xml_value(caseroot, "DOUT_S") == "TRUE"
+
+    path = os.path.join(caseroot, "env_run.xml")
+    with open(path) as fptr:
+        contents = fptr.read()
+    with open(path, "w") as fptr:
+        fptr.write(contents.replace('value="TRUE"', 'value="FALSE"'))
+    os.utime(path, ns=(0, 0))
+    assert case_xml_value(caseroot, "DOUT_S") == "FALSE"
+
+
+def test_cime_xmlquery_fallback(tmp_path) -> None:
+    caseroot = str(tmp_path / "caseroot")
+    write_caseroot(caseroot, str(tmp_path / "scratch"))
+
+    assert cime_xmlquery(caseroot, "CASE") == "b.e21.test"
+    assert cime_xmlquery(caseroot, "CASE", native=False) == "xmlquery_CASE"
+    assert cime_xmlquery(caseroot, "FROM_SHELL") == "xmlquery_FROM_SHELL"
+    assert cime_xmlquery(caseroot, "NTASKS") == "xmlquery_NTASKS"
+
+
+@pytest.mark.parametrize("dout_s", ["TRUE", "FALSE"])
+def test_caseroot_to_case_metadata(tmp_path, dout_s) -> None:
+    caseroot = str(tmp_path / "caseroot")
+    output_root = str(tmp_path / "scratch")
+    write_caseroot(caseroot, output_root, dout_s)
+    dout_s_root = os.path.join(output_root, "archive", "b.e21.test")
+    for comp in ["atm", "ocn"]:
+        os.makedirs(os.path.join(dout_s_root, comp, "hist"))
+
+    case_metadata = caseroot_to_case_metadata(caseroot)
+    assert case_metadata["case"] == "b.e21.test"
+    if dout_s == "TRUE":
+        assert case_metadata["output_dirs"] == [
+            os.path.join(dout_s_root, comp, "hist") for comp in ["atm", "ocn"]
+        ]
+    else:
+        assert case_metadata["output_dirs"] == [f"{output_root}/b.e21.test/run"]
@@ -0,0 +1,109 @@
+import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import (
+    CompactCatalog,
+    case_metadata_to_compact_catalog,
+    case_metadata_to_esm_datastore,
+    compact_catalog,
+)
+from esm_catalog_utils.catalog_gen import DATE_ORDINAL_MISSING, _get_esmcat_spec
+from esm_catalog_utils.catalog_index import get_catalog_index
+from esm_catalog_utils.catalog_methods import catalog_sel_to_df, catalog_sel_to_ds
+from esm_catalog_utils.dataset_cache import selection_key
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"file_parser": None}, {"track_mtime": True}])
+def test_compact_catalog(tmp_path, kwargs) -> None:
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata, **kwargs)
+        catalog_compact = compact_catalog(catalog)
+        assert isinstance(catalog_compact, CompactCatalog)
+        assert len(catalog_compact) == len(catalog.df)
+        assert catalog_compact.columns == catalog.df.columns.tolist()
+        assert catalog_compact.memory_usage() < catalog.df.memory_usage(deep=True).sum()
+
+        pd.testing.assert_frame_equal(catalog_compact.to_df(), catalog.df)
+        catalog_out = catalog_compact.to_esm_datastore()
+        pd.testing.assert_frame_equal(catalog_out.df, catalog.df)
+        assert _get_esmcat_spec(catalog_out) == _get_esmcat_spec(catalog)
+        for column in ["varname", "date_start", "date_end"]:
+            assert catalog_out.df[column].tolist() == catalog.df[column].tolist()
+
+
+def test_compact_catalog_date_ordinals(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    catalog.df.loc[0, "date_start"] = None
+    catalog_compact = compact_catalog(catalog)
+    ordinals = catalog_compact.date_ordinals("date_start")
+    assert ordinals[0] == DATE_ORDINAL_MISSING
+    assert ordinals[1:].tolist() == [
+        date.toordinal() for date in catalog.df["date_start"][1:]
+    ]
+    assert catalog_compact.to_df()["date_start"][0] is None
+    assert isinstance(catalog_compact.to_df()["date_start"][1], datetime.date)
+
+    with pytest.raises(ValueError, match="not a column of dates"):
+        catalog_compact.date_ordinals("datestring")
+
+
+def test_compact_catalog_sel(tmp_path, monkeypatch) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    catalog_compact = case_metadata_to_compact_catalog(case_metadata)
+    pd.testing.assert_frame_equal(catalog_compact.to_df(), catalog.df)
+
+    positions = np.array([3, 0, len(catalog.df) - 1])
+    pd.testing.assert_frame_equal(
+        catalog_compact.take(positions), catalog.df.iloc[positions]
+    )
+    assert catalog_compact.take(positions[:0]).columns.tolist() == (
+        catalog.df.columns.tolist()
+    )
+
+    # the index is built from the stored columns, and selections only expand
+    # the selected rows
+    def to_df(self) -> pd.DataFrame:
+        raise AssertionError("catalog expanded")
+
+    monkeypatch.setattr(CompactCatalog, "to_df", to_df)
+    catalog_index = get_catalog_index(catalog_compact)
+    assert catalog_index.df is None
+    assert get_catalog_index(catalog_compact) is catalog_index
+    assert catalog_index.fingerprint == catalog_compact.fingerprint
+    assert selection_key(catalog_compact, "x") == (catalog_compact.fingerprint, "x")
+
+    for year_lo, year_hi in itertools.combinations([1, 2, 3, 5], 2):
+        date_range = [datetime.date(year_lo, 7, 1), datetime.date(year_hi, 1, 15)]
+        for scomp, comp in [("cam", "atm"), ("clm2", "lnd")]:
+            for stream in ["h0", "h1", "h2"]:
+                for varname in [f"{comp}_var1", f"{comp}_var3", ["var1", "x"]]:
+                    args = (date_range, "case", scomp, stream, varname)
+                    expected = catalog_sel_to_df(catalog, *args)
+                    actual = catalog_sel_to_df(catalog_compact, *args)
+                    if expected is None:
+                        assert actual is None
+                    else:
+                        pd.testing.assert_frame_equal(actual, expected)
+
+    date_range = [datetime.date(1, 1, 1), datetime.date(2, 1, 1)]
+    ds = catalog_sel_to_ds(catalog_compact, date_range, "case", "cam", "h0", "atm_var1")
+    ds_expected = catalog_sel_to_ds(
+        catalog, date_range, "case", "cam", "h0", "atm_var1"
+    )
+    assert ds.identical(ds_expected)
+
+
+def test_compact_catalog_fingerprint(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    fingerprint = compact_catalog(catalog).fingerprint
+    assert compact_catalog(catalog).fingerprint == fingerprint
+    catalog.df.loc[0, "date_end"] = datetime.date(9, 1, 1)
+    assert compact_catalog(catalog).fingerprint != fingerprint
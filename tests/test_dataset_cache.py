@@ -0,0 +1,95 @@
+import datetime
+import os
+from typing import List
+
+import xarray as xr
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import DatasetCache, case_metadata_to_esm_datastore
+from esm_catalog_utils.catalog_methods import catalog_sel_to_df, catalog_sel_to_ds
+
+
+def test_dataset_cache(tmp_path, monkeypatch) -> None:
+    open_mfdataset_calls = []
+
+    def open_mfdataset(paths, **kwargs):
+        open_mfdataset_calls.append(paths)
+        return xr_open_mfdataset(paths, **kwargs)
+
+    xr_open_mfdataset = xr.open_mfdataset
+    monkeypatch.setattr(xr, "open_mfdataset", open_mfdataset)
+
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    date_range = [datetime.date(1, 6, 1), datetime.date(3, 1, 1)]
+    args = (catalog, date_range, "case", "cam", "h0")
+    dataset_cache = DatasetCache(max_entries=2)
+
+    # second call is served from the cache
+    ds = catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 1
+    ds_cached = catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 1
+    assert ds_cached.identical(ds)
+    # returned Datasets are copies
+    ds_cached.attrs["new_attr"] = 1
+    assert "new_attr" not in catalog_sel_to_ds(*args, "atm_var1", dataset_cache).attrs
+
+    # an equal catalog has the same fingerprint
+    catalog_copy = case_metadata_to_esm_datastore(case_metadata)
+    catalog_sel_to_ds(catalog_copy, *args[1:], "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 1
+
+    # least recently used entry is evicted
+    catalog_sel_to_ds(*args, "atm_var2", dataset_cache)
+    catalog_sel_to_ds(*args, ["atm_var1", "atm_var2"], dataset_cache)
+    assert len(open_mfdataset_calls) == 3
+    assert len(dataset_cache) == 2
+    catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 4
+
+    # changing a file invalidates entries containing it
+    path = catalog_sel_to_df(*args, "atm_var1")["path"].iloc[0]
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 5
+    catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert len(open_mfdataset_calls) == 5
+
+    # entries are evicted to satisfy max_nbytes
+    dataset_cache = DatasetCache(max_nbytes=ds.nbytes + 1)
+    catalog_sel_to_ds(*args, "atm_var1", dataset_cache)
+    assert dataset_cache.nbytes == ds.nbytes
+    catalog_sel_to_ds(*args, "atm_var2", dataset_cache)
+    assert len(dataset_cache) == 1
+    dataset_cache.clear()
+    assert len(dataset_cache) == 0 and dataset_cache.nbytes == 0
+
+
+def test_dataset_cache_close_evicted(tmp_path) -> None:
+    closed: List[int] = []
+
+    def closing_dataset(ind: int) -> xr.Dataset:
+        ds = xr.Dataset({"var": ("x", [ind])})
+        ds.set_close(lambda: closed.append(ind))
+        return ds
+
+    # Datasets are not closed by default
+    dataset_cache = DatasetCache(max_entries=1)
+    for ind in range(3):
+        dataset_cache.put(ind, [], closing_dataset(ind))
+    dataset_cache.clear()
+    assert closed == []
+
+    # evicted, replaced, invalidated, and cleared Datasets are closed
+    dataset_cache = DatasetCache(max_entries=2, close_evicted=True)
+    for ind in range(3):
+        dataset_cache.put(ind, [], closing_dataset(ind))
+    assert closed == [0]
+    dataset_cache.put(1, [], closing_dataset(3))
+    assert closed == [0, 1]
+    dataset_cache.invalidate(2)
+    assert closed == [0, 1, 2]
+    dataset_cache.clear()
+    assert closed == [0, 1, 2, 3]
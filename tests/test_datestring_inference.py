@@ -0,0 +1,97 @@
+import datetime
+from typing import Any, Dict, List
+
+import pytest
+
+from esm_catalog_utils.datestring_inference import (
+    _is_uniformly_spaced,
+    infer_stream_file_attrs,
+    parse_datestring,
+    sample_indices,
+)
+
+
+@pytest.mark.parametrize(
+    "datestring, expected",
+    [
+        ("0001", (1, 1, 1, 0)),
+        ("0001-02", (1, 2, 1, 0)),
+        ("1850_02", (1850, 2, 1, 0)),
+        ("0001-02-03", (1, 2, 3, 0)),
+        ("0001-02-03-03600", (1, 2, 3, 3600)),
+        ("000101-000112", None),
+        ("", None),
+    ],
+)
+def test_parse_datestring(datestring: str, expected) -> None:
+    assert parse_datestring(datestring) == expected
+
+
+def test_sample_indices() -> None:
+    assert sample_indices(100, 4) == [0, 33, 66, 99]
+    assert sample_indices(3, 4) == [0, 1, 2]
+    assert sample_indices(10, 1) == [0, 9]
+
+
+def monthly_attrs(year: int, month: int) -> Dict[str, Any]:
+    """attributes of a monthly history file"""
+    year_end, month_end = (year + 1, 1) if month == 12 else (year, month + 1)
+    return {
+        "varname": ["TEMP", "SALT"],
+        "frequency": "month_1",
+        "date_start": datetime.date(year, month, 1),
+        "date_end": datetime.date(year_end, month_end, 1),
+    }
+
+
+def test_infer_stream_file_attrs() -> None:
+    months = [(year, month) for year in range(1, 4) for month in range(1, 13)]
+    datestrings = [f"{year:04d}-{month:02d}" for year, month in months]
+    expected = [monthly_attrs(year, month) for year, month in months]
+    samples = sample_indices(len(months), 4)
+
+    inferred = infer_stream_file_attrs(
+        datestrings, {ind: expected[ind] for ind in samples}
+    )
+    assert inferred == expected
+
+    # missing file
+    del datestrings[5], expected[5]
+    sampled_attrs = {ind: expected[ind] for ind in sample_indices(len(datestrings), 4)}
+    assert infer_stream_file_attrs(datestrings, sampled_attrs) is None
+
+    # sampled file that disagrees with other samples
+    sampled_attrs_list: List[Dict[str, Any]] = [
+        monthly_attrs(year, month) for year, month in months
+    ]
+    sampled_attrs_list[samples[1]]["varname"] = ["TEMP"]
+    datestrings = [f"{year:04d}-{month:02d}" for year, month in months]
+    sampled_attrs = {ind: sampled_attrs_list[ind] for ind in samples}
+    assert infer_stream_file_attrs(datestrings, sampled_attrs) is None
+
+
+def test_infer_stream_file_attrs_monthly_days() -> None:
+    # spacing of monthly datestrings with a day varies from 28 to 31 days
+    months = [(year, month) for year in range(1, 4) for month in range(1, 13)]
+    datestrings = [f"{year:04d}-{month:02d}-01" for year, month in months]
+    expected = [monthly_attrs(year, month) for year, month in months]
+    samples = sample_indices(len(months), 4)
+
+    inferred = infer_stream_file_attrs(
+        datestrings, {ind: expected[ind] for ind in samples}
+    )
+    assert inferred == expected
+
+    # missing file
+    del datestrings[5], expected[5]
+    sampled_attrs = {ind: expected[ind] for ind in sample_indices(len(datestrings), 4)}
+    assert infer_stream_file_attrs(datestrings, sampled_attrs) is None
+
+    # monthly datestrings on varying days of the month
+    datestrings = [f"{year:04d}-{month:02d}-{15 + month % 2}" for year, month in months]
+    date_tuples = [
+        date_tuple
+        for date_tuple in map(parse_datestring, datestrings)
+        if date_tuple is not None
+    ]
+    assert _is_uniformly_spaced(datestrings, date_tuples)
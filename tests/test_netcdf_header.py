@@ -0,0 +1,117 @@
+import os.path
+import sys
+from typing import Any, Dict, List
+
+import netCDF4
+import numpy as np
+import pytest
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import parse_file_cesm, parse_file_cesm_header
+from esm_catalog_utils.netcdf_header import (
+    ClassicHeader,
+    H5Header,
+    open_netcdf_header,
+)
+
+FORMATS = [
+    "NETCDF3_CLASSIC",
+    "NETCDF3_64BIT_OFFSET",
+    "NETCDF3_64BIT_DATA",
+    "NETCDF4_CLASSIC",
+    "NETCDF4",
+]
+
+
+def copy_netcdf(path_in: str, path_out: str, format: Any) -> None:
+    """copy netCDF file, in a specified format"""
+    with netCDF4.Dataset(path_in) as ds_in, netCDF4.Dataset(
+        path_out, "w", format=format
+    ) as ds_out:
+        ds_out.setncatts({name: ds_in.getncattr(name) for name in ds_in.ncattrs()})
+        for name, dim in ds_in.dimensions.items():
+            ds_out.createDimension(name, None if dim.isunlimited() else len(dim))
+        for name, var_in in ds_in.variables.items():
+            var_out = ds_out.createVariable(name, var_in.dtype, var_in.dimensions)
+            var_out.setncatts({key: var_in.getncattr(key) for key in var_in.ncattrs()})
+            var_out[:] = var_in[:]
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory) -> List[str]:
+    root_dir = tmp_path_factory.mktemp("netcdf_header")
+    paths: List[str] = []
+    for case_metadata in gen_test_input(root_dir / "case"):
+        for output_dir in case_metadata["output_dirs"]:
+            for dirpath, _, filenames in os.walk(output_dir):
+                # one file per stream is sufficient
+                streams: Dict[str, str] = {}
+                for filename in sorted(filenames):
+                    streams.setdefault(filename.rsplit(".", 2)[0], filename)
+                paths.extend(os.path.join(dirpath, name) for name in streams.values())
+    return paths
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_parse_file_cesm_header(tmp_path, paths: List[str], format: str) -> None:
+    if format.startswith("NETCDF4"):
+        pytest.importorskip("h5py")
+    for path in paths:
+        path_copy = str(tmp_path / os.path.basename(path))
+        copy_netcdf(path, path_copy, format)
+        assert parse_file_cesm_header(path_copy) == parse_file_cesm(path_copy)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_open_netcdf_header(tmp_path, format: Any) -> None:
+    if format.startswith("NETCDF4"):
+        pytest.importorskip("h5py")
+    path = str(tmp_path / "file.nc")
+    with netCDF4.Dataset(path, "w", format=format) as ds:
+        ds.title = "test file"
+        ds.createDimension("time", None)
+        ds.createDimension("x", 3)
+        ds.createDimension("y", 2)
+        var = ds.createVariable("var", "f4", ("time", "y", "x"))
+        var.units = "m"
+        var.valid_range = np.array([0.0, 100.0], dtype="f4")
+        ds.createVariable("count", "i2", ("time",))
+        ds.createVariable("coord", "f8", ("x",))
+        ds.createVariable("y", "f8", ("y",))
+        ds["var"][:] = np.arange(24).reshape((4, 2, 3))
+        ds["count"][:] = np.arange(4)
+        ds["coord"][:] = [1.0, 2.0, 3.0]
+        ds["y"][:] = [-1.0, 1.0]
+
+    with netCDF4.Dataset(path) as ds, open_netcdf_header(path) as header:
+        ds.set_auto_mask(False)
+        if format.startswith("NETCDF3"):
+            assert isinstance(header, ClassicHeader)
+        assert header.ncattrs() == ds.ncattrs()
+        assert header.title == ds.title
+        assert header.dimensions.keys() == ds.dimensions.keys()
+        assert list(header.variables) == list(ds.variables)
+        for name, var in header.variables.items():
+            assert var.dimensions == ds[name].dimensions
+            assert var.shape == ds[name].shape
+            assert var.ncattrs() == ds[name].ncattrs()
+            for ind in np.ndindex(var.shape):
+                assert var[ind] == ds[name][ind]
+        assert header.variables["var"].units == "m"
+        assert (header.variables["var"].valid_range == [0.0, 100.0]).all()
+        assert header.variables["var"][-1, -1, -1] == 23
+
+
+def test_open_netcdf_header_missing_h5py(tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "file.nc")
+    with netCDF4.Dataset(path, "w", format="NETCDF4") as ds:
+        ds.title = "test file"
+
+    monkeypatch.setitem(sys.modules, "h5py", None)
+    with pytest.raises(ImportError, match=r"esm_catalog_utils\[hdf5\]"):
+        H5Header(path)
+
+    # netCDF-4 files are opened with netCDF4 if h5py is not installed
+    with open_netcdf_header(path) as header:
+        assert isinstance(header, netCDF4.Dataset)
+        assert header.title == "test file"
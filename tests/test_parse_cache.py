@@ -0,0 +1,188 @@
+import os
+import pickle
+import sqlite3
+import threading
+from os import PathLike
+from typing import Any, Dict, List, Union
+
+import pytest
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import (
+    ParseCache,
+    case_metadata_to_esm_datastore,
+    parse_file_cesm,
+)
+
+parsed_paths: List[str] = []
+
+PARSER_VERSIONS = {"counting_parser": "1"}
+
+
+def counting_parser(path: Union[str, PathLike]) -> Dict[str, Any]:
+    """file parser that records paths that it is called on"""
+    parsed_paths.append(str(path))
+    return {"size_mod_7": os.stat(path).st_size % 7}
+
+
+@pytest.fixture
+def files(tmp_path) -> List[str]:
+    paths = []
+    for ind in range(5):
+        path = tmp_path / f"file_{ind}.nc"
+        path.write_bytes(b"x" * ind)
+        paths.append(str(path))
+    return paths
+
+
+def test_parse_cache_hits(tmp_path, files: List[str]) -> None:
+    cache = ParseCache(tmp_path / "cache.sqlite")
+    cached_parser = cache.wrap(counting_parser)
+
+    parsed_paths.clear()
+    results = [cached_parser(path) for path in files]
+    assert parsed_paths == files
+    assert len(cache) == len(files)
+
+    # results are reused, including from a new cache object on the same file
+    parsed_paths.clear()
+    for cache_obj in [cache, ParseCache(tmp_path / "cache.sqlite")]:
+        cached_parser = cache_obj.wrap(counting_parser)
+        assert [cached_parser(path) for path in files] == results
+    assert parsed_paths == []
+
+    # changing a file's modification time triggers reparsing
+    os.utime(files[0], ns=(0, 0))
+    assert cached_parser(files[0]) == results[0]
+    assert parsed_paths == [files[0]]
+
+    # cache objects are picklable
+    cached_parser = pickle.loads(pickle.dumps(cached_parser))
+    assert cached_parser(files[0]) == results[0]
+    assert parsed_paths == [files[0]]
+
+
+def test_parse_cache_parser_version(tmp_path, files: List[str]) -> None:
+    cache = ParseCache(tmp_path / "cache.sqlite")
+    cached_parser = cache.wrap(counting_parser)
+    for path in files:
+        cached_parser(path)
+    assert len(cache) == len(files)
+
+    # entries from other versions of a parser are removed
+    PARSER_VERSIONS["counting_parser"] = "2"
+    try:
+        cached_parser = cache.wrap(counting_parser)
+        assert len(cache) == 0
+        parsed_paths.clear()
+        cached_parser(files[0])
+        assert parsed_paths == [files[0]]
+    finally:
+        PARSER_VERSIONS["counting_parser"] = "1"
+
+    assert cache.invalidate(counting_parser) == 1
+    assert len(cache) == 0
+
+
+def test_parse_cache_evict(tmp_path, files: List[str]) -> None:
+    cache = ParseCache(tmp_path / "cache.sqlite", max_entries=2)
+    cached_parser = cache.wrap(counting_parser)
+    for path in files:
+        cached_parser(path)
+    cached_parser(files[0])
+    assert cache.evict() == len(files) - 2
+
+    # least recently used entries were evicted
+    parsed_paths.clear()
+    for path in [files[0], files[-1]]:
+        cached_parser(path)
+    assert parsed_paths == []
+
+
+def last_used(cache_path: str) -> Dict[str, int]:
+    """return last_used of entries, read directly from the database"""
+    with sqlite3.connect(cache_path) as conn:
+        return dict(conn.execute("SELECT path, last_used FROM parse_cache"))
+
+
+def test_parse_cache_last_used(tmp_path, files: List[str]) -> None:
+    cache_path = str(tmp_path / "cache.sqlite")
+    cache = ParseCache(cache_path)
+    cached_parser = cache.wrap(counting_parser)
+    for path in files:
+        cached_parser(path)
+    stored = last_used(cache_path)
+
+    # hits do not write to the database until pending times are flushed
+    cached_parser(files[0])
+    assert last_used(cache_path) == stored
+    cache.flush()
+    assert last_used(cache_path)[files[0]] > stored[files[0]]
+    assert {path: last_used(cache_path)[path] for path in files[1:]} == {
+        path: stored[path] for path in files[1:]
+    }
+
+    # close flushes pending times, and the cache is reopened on demand
+    stored = last_used(cache_path)
+    cached_parser(files[1])
+    cache.close()
+    assert last_used(cache_path)[files[1]] > stored[files[1]]
+    parsed_paths.clear()
+    cached_parser(files[1])
+    assert parsed_paths == []
+
+
+def test_parse_cache_threads(tmp_path, files: List[str]) -> None:
+    cache = ParseCache(tmp_path / "cache.sqlite")
+    cached_parser = cache.wrap(counting_parser)
+    n_threads = 4
+
+    def parse_files() -> None:
+        for path in files:
+            cached_parser(path)
+
+    parsed_paths.clear()
+    threads = [threading.Thread(target=parse_files) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every miss, in any thread, is counted as an insertion
+    assert cache._insert_cnt == len(parsed_paths) >= len(files)
+    assert len(cache) == len(files)
+    cache.flush()
+    assert cache._last_used == {}
+
+
+def counting_parse_file_cesm(path: Union[str, PathLike]) -> Dict[str, Any]:
+    """parse_file_cesm, recording paths that it is called on"""
+    parsed_paths.append(str(path))
+    return parse_file_cesm(path)
+
+
+def test_case_metadata_to_esm_datastore_parse_cache(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    cache_path = tmp_path / "cache.sqlite"
+
+    df_expected = case_metadata_to_esm_datastore(case_metadata).df
+
+    parsed_paths.clear()
+    for _ in range(2):
+        df = case_metadata_to_esm_datastore(
+            case_metadata, file_parser=counting_parse_file_cesm, parse_cache=cache_path
+        ).df
+        assert df.equals(df_expected)
+        # files are only parsed when the cache is empty
+        assert len(parsed_paths) == len(df)
+    assert len(ParseCache(cache_path)) == len(df)
+
+
+def test_case_metadata_to_esm_datastore_parse_cache_evict(tmp_path) -> None:
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    cache = ParseCache(tmp_path / "cache.sqlite", max_entries=2)
+
+    # excess entries are evicted at the end of the build
+    df = case_metadata_to_esm_datastore(case_metadata, parse_cache=cache).df
+    assert len(df) > 2
+    assert len(cache) == 2
@@ -1,6 +1,8 @@
+import os.path
+
 import pytest
 
-from esm_catalog_utils import parse_path_cesm
+from esm_catalog_utils import parse_path_cesm, parse_paths_cesm
 
 
 @pytest.mark.parametrize("case", ["casename", "case_w_underscore", "case.w.period"])
@@ -83,3 +85,24 @@ def test_parse_path_cesm_tseries(
         "varname": varname,
         "datestring": daterange,
     }
+
+
+@pytest.mark.parametrize("case", ["casename", "case_w_underscore", "case.w.period"])
+def test_parse_paths_cesm(case: str) -> None:
+    filenames = [f"{case}.pop.once.nc", f"{case}.mom6.static.nc"]
+    for stream in ["h", "h.nday1", "h.ecosys.nday1", "h_bgc", "h_bgc_z"]:
+        filenames.append(f"{case}.pop.{stream}.1850-01.nc")
+        filenames.append(f"{case}.mom6.{stream}_1850_01.nc")
+        filenames.append(f"{case}.pop.{stream}.TEMP.185001-189912.nc")
+        filenames.append(f"{case}.mom6.{stream}.FG_CO2_1850_1899.nc")
+    paths = [os.path.join("archive", case, "ocn", name) for name in filenames]
+
+    df = parse_paths_cesm(paths, case)
+    assert len(df) == len(paths)
+    for path, row in zip(paths, df.to_dict("records")):
+        assert row == {"varname": None, **parse_path_cesm(path, case)}
+
+    assert parse_paths_cesm([], case).columns.tolist() == df.columns.tolist()
+
+    with pytest.raises(ValueError):
+        parse_paths_cesm(paths + ["not_case.pop.h.1850-01.nc"], case)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from esm_catalog_utils.postprocess import (
+    clear_static_cache,
+    open_static_dataset,
+    postprocess_mom6,
+)
+
+
+class Catalog:
+    """minimal stand-in for esm_datastore"""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df
+
+
+def mom6_dataset() -> xr.Dataset:
+    ds = xr.Dataset(
+        {
+            "thetao": (("time", "yh", "xh"), np.zeros((2, 2, 3))),
+            "time_bnds": (("time", "nv"), np.zeros((2, 2))),
+        },
+        coords={"time": ("time", [0.5, 1.5], {"bounds": "time_bnds"})},
+    )
+    return ds
+
+
+def test_postprocess_mom6_static(tmp_path, monkeypatch) -> None:
+    static_path = str(tmp_path / "case.mom6.static.nc")
+    xr.Dataset({"geolon": (("yh", "xh"), np.ones((2, 3)))}).to_netcdf(static_path)
+    df = pd.DataFrame(
+        {
+            "case": ["case", "case", "other"],
+            "scomp": ["mom6", "mom6", "mom6"],
+            "stream": ["h", "static", "static"],
+            "date_start": [None] * 3,
+            "date_end": [None] * 3,
+            "varname": [["thetao"], ["geolon"], ["geolon"]],
+            "path": ["case.mom6.h.nc", static_path, "other.mom6.static.nc"],
+        }
+    )
+    catalog = Catalog(df)
+
+    open_dataset_calls = []
+
+    def open_dataset(path, **kwargs):
+        open_dataset_calls.append(path)
+        return xr_open_dataset(path, **kwargs)
+
+    xr_open_dataset = xr.open_dataset
+    monkeypatch.setattr(xr, "open_dataset", open_dataset)
+
+    # static file is opened once
+    clear_static_cache()
+    for _ in range(3):
+        ds = postprocess_mom6(mom6_dataset(), catalog, "case")
+        assert (ds["geolon"] == 1.0).all()
+        assert ds["thetao"].attrs["coordinates"] == "geolat geolon"
+    assert open_dataset_calls == [static_path]
+    # returned Datasets are copies, so modifying them does not modify the cache
+    open_static_dataset("case", static_path)["geolon"].attrs["units"] = "m"
+    assert "units" not in open_static_dataset("case", static_path)["geolon"].attrs
+
+    # static file is reopened if it changes, or if the cache is cleared
+    stat_result = os.stat(static_path)
+    os.utime(static_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1))
+    postprocess_mom6(mom6_dataset(), catalog, "case")
+    assert open_dataset_calls == [static_path] * 2
+    clear_static_cache()
+    postprocess_mom6(mom6_dataset(), catalog, "case")
+    assert open_dataset_calls == [static_path] * 3
+    clear_static_cache()
@@ -0,0 +1,205 @@
+import datetime
+import json
+import os
+import sys
+from typing import Any, List
+
+import numpy as np
+import pytest
+import xarray as xr
+from gen_test_input import gen_test_input
+
+from esm_catalog_utils import (
+    BuildReport,
+    case_metadata_to_esm_datastore,
+    catalog_methods,
+    references,
+    write_references,
+)
+from esm_catalog_utils.catalog_gen import DATE_ORDINAL_MISSING
+from esm_catalog_utils.catalog_methods import catalog_sel_to_ds
+from esm_catalog_utils.references import (
+    _slice_sort_key,
+    group_references,
+    open_references,
+    references_path,
+)
+
+
+def write_files(tmp_path, file_format, unlimited_dims=("time",), encoding=None):
+    """write 3 files of 2 time levels each, return their paths"""
+    paths = []
+    for file_ind in range(3):
+        time = 2.0 * file_ind + np.arange(2)
+        values = np.arange(24, dtype="f4").reshape(2, 3, 4) + 24 * file_ind
+        values[0, 0, 0] = np.nan
+        ds = xr.Dataset(
+            {
+                "var": (("time", "lat", "lon"), values, {"units": "m"}),
+                "date_written": (("time",), [f"day{ind}" for ind in time]),
+                "area": (("lat", "lon"), np.ones((3, 4)), {"units": "m2"}),
+            },
+            coords={
+                "time": ("time", time, {"units": "days since 0001-01-01"}),
+                "lat": ("lat", np.arange(3.0)),
+            },
+            attrs={"title": "test"},
+        )
+        path = str(tmp_path / f"file_{file_ind}.nc")
+        ds.to_netcdf(
+            path, format=file_format, unlimited_dims=unlimited_dims, encoding=encoding
+        )
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize(
+    "file_format, unlimited_dims, encoding",
+    [
+        ("NETCDF3_CLASSIC", ["time"], None),
+        ("NETCDF3_64BIT", [], None),
+        ("NETCDF4", ["time"], None),
+        ("NETCDF4", [], None),
+        (
+            "NETCDF4",
+            ["time"],
+            {
+                "var": {"zlib": True, "shuffle": True, "chunksizes": (1, 3, 2)},
+                "time": {"chunksizes": (1,)},
+            },
+        ),
+        ("NETCDF4", ["time"], {"var": {"zlib": True, "chunksizes": (4, 3, 4)}}),
+    ],
+)
+def test_group_references(tmp_path, file_format, unlimited_dims, encoding) -> None:
+    pytest.importorskip("kerchunk")
+    if file_format.startswith("NETCDF3"):
+        pytest.importorskip("scipy")
+    paths = write_files(tmp_path, file_format, unlimited_dims, encoding)
+    references = group_references([[path] for path in paths])
+    expected = xr.open_mfdataset(
+        paths,
+        combine="by_coords",
+        data_vars="minimal",
+        coords="minimal",
+        compat="override",
+    )
+    actual = open_references(json.loads(json.dumps(references)))
+    xr.testing.assert_identical(actual.load(), expected.load())
+
+    # selection of files
+    actual = open_references(references, paths[1:2])
+    xr.testing.assert_identical(actual.load(), expected.isel(time=[2, 3]))
+    assert actual["var"][1, 1:, ::-2].values.tolist() == (
+        expected["var"][3, 1:, ::-2].values.tolist()
+    )
+
+
+def test_open_references_errors(tmp_path) -> None:
+    pytest.importorskip("kerchunk")
+    paths = write_files(tmp_path, "NETCDF4")
+    references = group_references([[path] for path in paths])
+    with pytest.raises(ValueError, match="not in references"):
+        open_references(references, [str(tmp_path / "other.nc")])
+
+    # files changed since references were generated are not used
+    open_references(references, paths[:1])
+    os.utime(paths[0], ns=(0, 0))
+    with pytest.raises(ValueError, match="changed"):
+        open_references(references, paths[:1])
+
+
+def test_references_path() -> None:
+    # separators in values do not make paths of different keys collide
+    keys = [("a.b", "c"), ("a", "b.c"), ("a%2Eb", "c"), ("a/b", "c")]
+    paths = [references_path("refs", key) for key in keys]
+    assert len(set(paths)) == len(keys)
+    assert all(os.path.dirname(path) == "refs" for path in paths)
+    assert references_path("refs", ["case", "pop", 1]) == "refs/case.pop.1.json"
+
+
+def test_slice_sort_key() -> None:
+    missing = DATE_ORDINAL_MISSING
+    slice_keys = [(2, 3), (1, missing), (missing, 2), (1, 2), (missing, missing)]
+    assert sorted(slice_keys, key=_slice_sort_key) == [
+        (1, 2),
+        (1, missing),
+        (2, 3),
+        (missing, 2),
+        (missing, missing),
+    ]
+
+
+def test_write_references_missing_kerchunk(tmp_path, monkeypatch) -> None:
+    catalog = case_metadata_to_esm_datastore(gen_test_input(tmp_path / "case")[0])
+    monkeypatch.setitem(sys.modules, "kerchunk", None)
+    with pytest.raises(ImportError, match=r"esm_catalog_utils\[references\]"):
+        write_references(catalog, tmp_path / "references")
+
+
+def test_write_references_report(tmp_path, monkeypatch) -> None:
+    # references are written with a stand-in for group_references, that fails
+    # for the clm2 groups
+    def group_references(slices: List[List[str]], concat_dim: str) -> Any:
+        if "clm2" in slices[0][0]:
+            raise ValueError("not supported")
+        return {"version": 1, "refs": {}, "slices": slices}
+
+    monkeypatch.setattr(references, "group_references", group_references)
+    case_metadata = gen_test_input(tmp_path / "case")[0]
+    catalog = case_metadata_to_esm_datastore(case_metadata)
+    directory = tmp_path / "references"
+    with pytest.raises(ValueError, match="not supported"):
+        write_references(catalog, directory)
+
+    report = BuildReport()
+    paths = write_references(catalog, directory, report=report)
+    assert len(paths) == 2
+    assert len(report.references_skipped) == 2
+    assert all(key.startswith("case.clm2.") for key in report.references_skipped)
+    assert set(report.references_skipped.values()) == {"not supported"}
+    assert report.to_dict()["references_skipped"] == report.references_skipped
+
+    # slices are in order of date
+    for path in paths:
+        with open(path) as fptr:
+            slices = json.load(fptr)["slices"]
+        assert slices == sorted(slices)
+
+    # references are written by the catalog generator
+    reports: List[BuildReport] = []
+    directory = tmp_path / "references_gen"
+    case_metadata_to_esm_datastore(
+        case_metadata, report_callback=reports.append, references_directory=directory
+    )
+    assert sorted(os.listdir(directory)) == sorted(map(os.path.basename, paths))
+    assert reports[0].references_skipped == report.references_skipped
+    assert "references" in reports[0].wall_times
+
+
+def test_catalog_sel_to_ds_references(tmp_path, monkeypatch) -> None:
+    pytest.importorskip("kerchunk")
+    date_range = [datetime.date(1, 6, 1), datetime.date(3, 1, 15)]
+    for case_metadata in gen_test_input(tmp_path / "case"):
+        catalog = case_metadata_to_esm_datastore(case_metadata)
+        directory = tmp_path / "references" / case_metadata["output_dirs"][0][-4:]
+        assert len(write_references(catalog, directory)) == 4
+        for scomp, comp in [("cam", "atm"), ("clm2", "lnd")]:
+            for varname in [f"{comp}_var1", [f"{comp}_var1", f"{comp}_var3"]]:
+                args = (catalog, date_range, "case", scomp, "h0", varname)
+                expected = catalog_sel_to_ds(*args)
+
+                # opening files is not needed
+                def _df_to_ds(*args):
+                    raise AssertionError("files opened")
+
+                with monkeypatch.context() as mpatch:
+                    mpatch.setattr(catalog_methods, "_df_to_ds", _df_to_ds)
+                    actual = catalog_sel_to_ds(*args, references=directory)
+                xr.testing.assert_identical(actual.load(), expected.load())
+
+        # selections not covered by references open files
+        actual = catalog_sel_to_ds(
+            catalog, date_range, "case", "cam", "h0", "atm_var1", references=tmp_path
+        )
+        assert actual is not None